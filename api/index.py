@@ -3,8 +3,10 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-import re
+from typing import List
+import asyncio
 import os
+import sys
 
 app = FastAPI()
 
@@ -12,6 +14,12 @@ app = FastAPI()
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 
+# Shared modules live in the repository root
+sys.path.insert(0, parent_dir)
+from rule_engine import build_result, build_results, get_engine
+from bounded_executor import BoundedExecutor
+from batching import QueueFullError
+
 # Mount static files
 app.mount("/static", StaticFiles(directory=os.path.join(parent_dir, "static")), name="static")
 
@@ -22,36 +30,25 @@ class AnalyzeRequest(BaseModel):
     text: str
     url: str = ""
 
-def analyze_text_simple(text):
-    """Simple rule-based analysis for demo purposes"""
-    text_lower = text.lower()
-    
-    # Simple fake news indicators
-    fake_indicators = [
-        'breaking', 'shocking', 'you won\'t believe', 'doctors hate',
-        'one weird trick', 'secret', 'exposed', 'government doesn\'t want',
-        'share before', 'delete', 'urgent', 'must read'
-    ]
-    
-    real_indicators = [
-        'reuters', 'associated press', 'ap news', 'bbc', 'cnn',
-        'according to', 'study shows', 'research', 'university',
-        'published', 'peer-reviewed'
-    ]
-    
-    fake_score = sum(1 for indicator in fake_indicators if indicator in text_lower)
-    real_score = sum(1 for indicator in real_indicators if indicator in text_lower)
-    
-    # Calculate scores
-    total_indicators = max(1, fake_score + real_score)
-    fake_probability = min(90, max(10, (fake_score / total_indicators) * 100 + 20))
-    real_probability = 100 - fake_probability
-    
-    return {
-        'fake_probability': fake_probability,
-        'real_probability': real_probability,
-        'prediction': 0 if fake_probability > real_probability else 1
-    }
+class BatchAnalyzeRequest(BaseModel):
+    items: List[AnalyzeRequest]
+
+# Upper bound on texts accepted by /analyze/batch
+MAX_BATCH_ITEMS = 100
+
+# Scoring runs in a bounded pool so a large request cannot block the event
+# loop; see bounded_executor.py for the ANALYZE_* settings
+analysis_executor = BoundedExecutor.from_env()
+
+async def run_analysis(fn, *args):
+    """Run blocking scoring in the pool; overload becomes 503 and slowness 504"""
+    try:
+        return await analysis_executor.run(fn, *args)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={'Retry-After': str(analysis_executor.retry_after)})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Analysis timed out after {analysis_executor.timeout:g}s")
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -65,47 +62,32 @@ async def analyze(request: AnalyzeRequest):
         if not text:
             raise HTTPException(status_code=400, detail="No text provided for analysis")
         
-        # Simple analysis
-        analysis = analyze_text_simple(text)
-        prediction = analysis['prediction']
-        fake_prob = analysis['fake_probability']
-        real_prob = analysis['real_probability']
-        
-        # Create response matching the expected format
-        result = {
-            'verdict_level': 'HIGH RISK' if prediction == 0 else 'LOW RISK',
-            'verdict_message': 'This content appears to be fake news' if prediction == 0 else 'This content appears to be legitimate news',
-            'risk_score': int(fake_prob),
-            'credibility_score': int(real_prob),
-            'ai_prediction': {
-                'available': True,
-                'prediction': 'Likely Fake' if prediction == 0 else 'Likely Real',
-                'confidence': int(max(fake_prob, real_prob))
-            },
-            'risk_indicators': {
-                'Content Analysis': {
-                    'score': int(fake_prob),
-                    'message': f'Rule-based analysis suggests this is {"fake" if prediction == 0 else "real"} news'
-                }
-            },
-            'linguistic_features': {
-                'word_count': len(text.split()),
-                'sentence_count': text.count('.') + text.count('!') + text.count('?'),
-                'avg_sentence_length': len(text.split()) / max(1, text.count('.') + text.count('!') + text.count('?')),
-                'caps_ratio': sum(1 for c in text if c.isupper()) / max(1, len(text)),
-                'exclamation_count': text.count('!'),
-                'question_count': text.count('?')
-            }
-        }
+        result = await run_analysis(build_result, text)
         
         return result
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items provided for analysis")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    
+    # Analyze the batch against one lexicon snapshot, reporting errors per item
+    results = await run_analysis(build_results, [item.text.strip() for item in request.items])
+    
+    return {'results': results}
+
 @app.get("/health")
 async def health_check():
     return {
         'status': 'healthy',
-        'ai_model_available': True
+        'ai_model_available': True,
+        'rules': get_engine().get_stats(),
+        'executor': analysis_executor.get_stats()
     }
\ No newline at end of file
@@ -1,20 +1,84 @@
 from flask import Flask, render_template, request, jsonify
 from fake_news_detector import AIFakeNewsDetector
+from result_cache import ResultCache
+from cascade import Cascade
+from preload import freeze, process_memory, single_threaded, warm_up
+import atexit
+import hashlib
 import os
 
 app = Flask(__name__)
 
 # Initialize the detector (will try to load AI model)
 detector = None
+result_cache = None
+
+# Upper bound on texts accepted by /analyze/batch
+MAX_BATCH_ITEMS = 100
+
+# Pid of the master that preloaded the detector before forking workers
+preload_pid = None
 
 def init_detector():
-    global detector
+    global detector, result_cache
     if detector is None:
+        # INFERENCE_BACKEND: pytorch, quantized, onnx or onnx-int8
+        backend = os.environ.get('INFERENCE_BACKEND', 'pytorch')
+        model_path = os.environ.get('MODEL_PATH') or None
+        # LONG_DOCUMENTS=1 scores long articles as overlapping windows
+        long_documents = os.environ.get('LONG_DOCUMENTS') == '1'
+        # CASCADE_CONFIG: bands written by `python cascade.py calibrate`
+        cascade_config = os.environ.get('CASCADE_CONFIG') or None
+        cascade = Cascade.from_file(cascade_config) if cascade_config else None
         try:
-            detector = AIFakeNewsDetector(use_pretrained=True)
+            detector = AIFakeNewsDetector(use_pretrained=True, backend=backend, model_path=model_path,
+                                          long_documents=long_documents, cascade=cascade)
         except Exception as e:
             print(f"Error initializing detector: {e}")
-            detector = AIFakeNewsDetector(use_pretrained=False)
+            detector = AIFakeNewsDetector(use_pretrained=False, cascade=cascade)
+        if detector.use_pretrained:
+            model_version = f"{backend}:{model_path or 'distilbert-base-uncased'}"
+            if long_documents:
+                model_version += ':windows'
+        else:
+            model_version = 'rules'
+        if cascade_config:
+            with open(cascade_config, 'rb') as f:
+                model_version += ':cascade-' + hashlib.sha256(f.read()).hexdigest()[:12]
+        result_cache = ResultCache.from_env(model_version)
+        # NEAR_DUPLICATES=1 reuses verdicts for lightly edited copies
+        from near_duplicates import NearDuplicateIndex
+        detector.near_duplicates = NearDuplicateIndex.from_env(model_version)
+        if detector.near_duplicates is not None and detector.near_duplicates.path:
+            atexit.register(save_near_duplicates)
+
+def save_near_duplicates():
+    """At exit: add this process's near-duplicate documents to NEAR_DUP_PATH"""
+    # Forked workers inherit this hook; the preloading master only holds the
+    # startup copy they forked from, and exits last, so it must not write
+    if os.getpid() == preload_pid:
+        return
+    detector.near_duplicates.save(merge=True)
+
+def preload_detector():
+    """Load and warm the detector before the server forks its workers"""
+    global preload_pid
+    preload_pid = os.getpid()
+    # Tokenizer threads started before a fork would be disabled in every worker
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    init_detector()
+    with single_threaded():
+        warm_up(detector)
+    freeze()
+
+def warm_worker():
+    """Per-worker warm-up after fork: starts this worker's thread pools"""
+    init_detector()
+    warm_up(detector)
+
+# PRELOAD_MODEL=1 loads the model at import time (set by gunicorn.conf.py)
+if os.environ.get('PRELOAD_MODEL') == '1':
+    preload_detector()
 
 @app.route('/')
 def index():
@@ -33,10 +97,39 @@ def analyze_text():
         if not text:
             return jsonify({'error': 'No text provided for analysis'}), 400
         
-        # Perform analysis
-        result = detector.analyze(text, url if url else None)
+        # Perform analysis; results depend on the news snapshot, so they are
+        # cached per keyword index fingerprint
+        generation = detector.news_fetcher.get_keyword_index().fingerprint
+        result = result_cache.get_or_compute(text, lambda: detector.analyze(text), generation)
+        
+        return jsonify({**result, 'url': url if url else None})
+    
+    except Exception as e:
+        return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    try:
+        if detector is None:
+            init_detector()
+        
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Expected a non-empty "items" list'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per batch'}), 413
+        
+        texts, urls = [], []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            texts.append(str(item.get('text') or '').strip())
+            urls.append(str(item.get('url') or '').strip() or None)
+        
+        # Perform analysis; per-item errors are reported inline
+        results = detector.analyze_many(texts, urls)
         
-        return jsonify(result)
+        return jsonify({'results': results})
     
     except Exception as e:
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
@@ -45,7 +138,13 @@ def analyze_text():
 def health_check():
     return jsonify({
         'status': 'healthy',
-        'ai_model_available': detector.use_pretrained if detector else False
+        'ai_model_available': detector.use_pretrained if detector else False,
+        'batching': detector.get_batching_stats() if detector else None,
+        'cascade': detector.cascade.get_stats() if detector and detector.cascade else None,
+        'news_cache': detector.news_fetcher.get_refresh_status() if detector else None,
+        'result_cache': result_cache.get_stats() if result_cache else None,
+        'near_duplicates': detector.near_duplicates.get_stats() if detector and detector.near_duplicates else None,
+        'memory': process_memory()
     })
 
 if __name__ == '__main__':
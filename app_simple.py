@@ -1,77 +1,154 @@
 from flask import Flask, render_template, request, jsonify
+from result_cache import ResultCache
+from preprocessing import preprocess_text
+from linear_artifact import DEFAULT_ARTIFACT_DIR, LinearArtifact
+from fast_linear import CompiledLinear
+import hashlib
+import os
 import pickle
-import re
 
 app = Flask(__name__)
 
-# Load model and vectorizer
-with open('model.pkl', 'rb') as f:
-    model = pickle.load(f)
+# Upper bound on texts accepted by /analyze/batch
+MAX_BATCH_ITEMS = 100
 
-with open('vectorizer.pkl', 'rb') as f:
-    vectorizer = pickle.load(f)
+def artifact_version(*paths):
+    """Hash the model artifacts so retraining invalidates cached results"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
 
-def preprocess_text(text):
-    """Clean and preprocess text data"""
-    text = str(text).lower()
-    # Remove URLs, emails, and special characters but keep some punctuation
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text)
-    text = re.sub(r'\S*@\S*\s?', '', text)
-    text = re.sub(r'[^a-zA-Z\s.,!?]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+# MODEL_ARTIFACT: directory written by `python train_simple.py --export`.
+# It is memory-mapped, so it loads faster than the pickles and its pages are
+# shared between worker processes; without it the pickles are used
+MODEL_ARTIFACT = os.environ.get('MODEL_ARTIFACT', DEFAULT_ARTIFACT_DIR)
+
+# COMPILE_LINEAR picks the single-pass scorer (fast_linear.CompiledLinear).
+# The artifact stays memory-mapped unless COMPILE_LINEAR=1: compiling copies
+# its vocabulary into a dict in every worker, giving up the shared pages and
+# fast loads. The pickles are compiled unless COMPILE_LINEAR=0 (sklearn)
+COMPILE_LINEAR = os.environ.get('COMPILE_LINEAR')
+
+if os.path.exists(os.path.join(MODEL_ARTIFACT, 'meta.json')):
+    artifact = LinearArtifact(MODEL_ARTIFACT)
+    scorer = CompiledLinear.from_artifact(artifact) if COMPILE_LINEAR == '1' else artifact
+    classes = scorer.classes_
+    predict_proba = scorer.predict_proba
+    model_version = artifact.version
+else:
+    # Load model and vectorizer
+    with open('model.pkl', 'rb') as f:
+        model = pickle.load(f)
+
+    with open('vectorizer.pkl', 'rb') as f:
+        vectorizer = pickle.load(f)
+
+    classes = model.classes_
+    predict_proba = lambda texts: model.predict_proba(vectorizer.transform(texts))
+    if COMPILE_LINEAR != '0':
+        try:
+            predict_proba = CompiledLinear.from_sklearn(vectorizer, model).predict_proba
+        except ValueError:
+            # Hashed features from `train_simple.py --streaming` stay on sklearn
+            pass
+    model_version = artifact_version('model.pkl', 'vectorizer.pkl')
+
+result_cache = ResultCache.from_env(model_version)
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+def build_result(text, prediction, probability):
+    """Create the response for one text, matching the expected format"""
+    return {
+        'verdict_level': 'HIGH RISK' if prediction == 0 else 'LOW RISK',
+        'verdict_message': 'This content appears to be fake news' if prediction == 0 else 'This content appears to be legitimate news',
+        'risk_score': int(probability[0] * 100),
+        'credibility_score': int(probability[1] * 100),
+        'ai_prediction': {
+            'available': True,
+            'prediction': 'Likely Fake' if prediction == 0 else 'Likely Real',
+            'confidence': int(max(probability) * 100)
+        },
+        'risk_indicators': {
+            'AI Analysis': {
+                'score': int(probability[0] * 100),
+                'message': f'Machine learning model predicts this is {"fake" if prediction == 0 else "real"} news with {max(probability)*100:.1f}% confidence'
+            }
+        },
+        'linguistic_features': {
+            'word_count': len(text.split()),
+            'sentence_count': text.count('.') + text.count('!') + text.count('?'),
+            'avg_sentence_length': len(text.split()) / max(1, text.count('.') + text.count('!') + text.count('?')),
+            'caps_ratio': sum(1 for c in text if c.isupper()) / max(1, len(text)),
+            'exclamation_count': text.count('!'),
+            'question_count': text.count('?')
+        }
+    }
+
+def predict(text):
+    """Run the model on one text"""
+    # Preprocess text
+    processed_text = preprocess_text(text)
+    
+    # Predict
+    probability = predict_proba([processed_text])[0]
+    prediction = classes[probability.argmax()]
+    
+    return build_result(text, prediction, probability)
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
     try:
         data = request.get_json()
         text = data['text']
         
-        # Preprocess text
-        processed_text = preprocess_text(text)
-        
-        # Vectorize
-        text_vec = vectorizer.transform([processed_text])
+        return jsonify(result_cache.get_or_compute(text, lambda: predict(text)))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    try:
+        data = request.get_json()
+        items = data['items']
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Expected a non-empty "items" list'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per batch'}), 413
         
-        # Predict
-        prediction = model.predict(text_vec)[0]
-        probability = model.predict_proba(text_vec)[0]
+        results = [None] * len(items)
+        texts, positions = [], []
+        for i, item in enumerate(items):
+            text = item.get('text') if isinstance(item, dict) else None
+            if not isinstance(text, str) or not text.strip():
+                results[i] = {'error': 'No text provided for analysis'}
+            else:
+                texts.append(text)
+                positions.append(i)
         
-        # Create response matching the expected format
-        result = {
-            'verdict_level': 'HIGH RISK' if prediction == 0 else 'LOW RISK',
-            'verdict_message': 'This content appears to be fake news' if prediction == 0 else 'This content appears to be legitimate news',
-            'risk_score': int(probability[0] * 100),
-            'credibility_score': int(probability[1] * 100),
-            'ai_prediction': {
-                'available': True,
-                'prediction': 'Likely Fake' if prediction == 0 else 'Likely Real',
-                'confidence': int(max(probability) * 100)
-            },
-            'risk_indicators': {
-                'AI Analysis': {
-                    'score': int(probability[0] * 100),
-                    'message': f'Machine learning model predicts this is {"fake" if prediction == 0 else "real"} news with {max(probability)*100:.1f}% confidence'
-                }
-            },
-            'linguistic_features': {
-                'word_count': len(text.split()),
-                'sentence_count': text.count('.') + text.count('!') + text.count('?'),
-                'avg_sentence_length': len(text.split()) / max(1, text.count('.') + text.count('!') + text.count('?')),
-                'caps_ratio': sum(1 for c in text if c.isupper()) / max(1, len(text)),
-                'exclamation_count': text.count('!'),
-                'question_count': text.count('?')
-            }
-        }
+        if texts:
+            # Vectorize and predict the whole batch at once
+            probabilities = predict_proba([preprocess_text(text) for text in texts])
+            predictions = classes[probabilities.argmax(axis=1)]
+            for i, text, prediction, probability in zip(positions, texts, predictions, probabilities):
+                results[i] = build_result(text, prediction, probability)
         
-        return jsonify(result)
+        return jsonify({'results': results})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/health')
+def health_check():
+    return jsonify({
+        'status': 'healthy',
+        'result_cache': result_cache.get_stats()
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, port=8000)
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""
+Offline scoring of JSONL and CSV corpora on a process pool.
+
+    python -m fake_news_detector score data/Fake.csv fake_scores.jsonl --workers 32
+    python -m fake_news_detector score articles.jsonl scores.jsonl --scorer linear --resume
+
+The input is read in chunks of --chunk-size records. Each chunk is parsed
+and scored by one worker process, which loads its model once when the pool
+starts. Results are written as JSONL in input order, one line per record,
+with the record's position (`index`) and `id`. After each chunk is written,
+a checkpoint next to the output records how far the run got, so --resume
+continues an interrupted run without rescoring anything.
+
+The detector and risk scorers check news relevance. Unless NEWS_STORE_PATH
+is set, the feeds are fetched once by the parent into a temporary store
+that every worker reads, instead of once per worker.
+
+Text is taken from the `title`, `text` and `body` fields, joined in that
+order, so both the data/Fake.csv / data/True.csv layout used by
+train_simple.py and {"title": ..., "body": ...} JSONL work unchanged.
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+SCORERS = ('detector', 'linear', 'rules', 'risk')
+
+# Scorers whose detector checks news relevance, so workers need the feeds
+NEWS_SCORERS = ('detector', 'risk')
+
+# Joined with spaces, like train_simple.py's title + ' ' + text
+TEXT_FIELDS = ('title', 'text', 'body')
+ID_FIELDS = ('id', 'request_id')
+
+_scorer = None
+
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_chunks(path, fmt, chunk_size, skip=0):
+    """
+    Yield (start index, raw records, input bytes consumed) for each chunk.
+
+    JSONL records stay unparsed lines so workers do the decoding. CSV rows
+    are split here, since quoted fields may span lines.
+    """
+    if fmt == 'csv':
+        # Article bodies can exceed the default 128KB field limit
+        csv.field_size_limit(sys.maxsize)
+        f = open(path, newline='', encoding='utf-8')
+        records = csv.DictReader(f)
+        position = f.buffer
+    else:
+        f = open(path, 'rb')
+        records = (line for line in f if line.strip())
+        position = f
+
+    with f:
+        records = itertools.islice(records, skip, None)
+        start = skip
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                return
+            yield start, chunk, position.tell()
+            start += len(chunk)
+
+
+def record_text(record, text_fields=TEXT_FIELDS):
+    return ' '.join(str(record[field]) for field in text_fields if record.get(field) not in (None, ''))
+
+
+def record_id(record):
+    for field in ID_FIELDS:
+        if record.get(field) not in (None, ''):
+            return record[field]
+    return None
+
+
+def _init_worker(options):
+    global _scorer
+    # Ctrl-C reaches the whole process group; the parent decides what to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Keep each worker's math libraries to its share of the cores
+    threads = str(options['threads'])
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = threads
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    if options.get('news_store_path'):
+        # Read the snapshot the parent fetched instead of fetching every feed
+        os.environ['NEWS_STORE_PATH'] = options['news_store_path']
+    _scorer = load_scorer(options)
+
+
+def prefetch_news(path):
+    """Fetch the news feeds once into the store at path, for the workers to share."""
+    from news_fetcher import NewsFetcher
+    from news_store import NewsStore
+
+    fetcher = NewsFetcher(background_refresh=False, store=NewsStore(path), relevance_mode='keywords')
+    fetcher.refresh()
+
+
+def load_scorer(options):
+    """Return a function scoring a list of texts into a list of result dicts."""
+    kind = options['scorer']
+    if kind == 'rules':
+        from rule_engine import build_results
+        return build_results
+
+    if kind == 'linear':
+        from cascade import LinearScorer
+        linear = LinearScorer(options['linear_model'], options['linear_vectorizer'])
+
+        def score_linear(texts):
+            results = [{'error': 'No text provided for analysis'}] * len(texts)
+            valid = [i for i, text in enumerate(texts) if text.strip()]
+            if valid:
+                for i, fake in zip(valid, linear.fake_probability([texts[i] for i in valid])):
+                    results[i] = {
+                        'prediction': 'Likely Fake' if fake >= 0.5 else 'Likely Real',
+                        'fake_probability': float(fake)
+                    }
+            return results
+        return score_linear
+
+    if kind == 'risk':
+        from fake_news_detector import AIFakeNewsDetector
+        detector = AIFakeNewsDetector(use_pretrained=False)
+
+        def score_risk(texts):
+            results = [{'error': 'No text provided for analysis'}] * len(texts)
+            valid = [i for i, text in enumerate(texts) if text.strip()]
+            if valid:
+                risk = detector.score_risk_many([texts[i] for i in valid])
+                for i, overall, level in zip(valid, risk.overall.tolist(), risk.verdict_levels().tolist()):
+                    results[i] = {'risk_score': round(overall, 1), 'verdict_level': level}
+            return results
+        return score_risk
+
+    import torch
+    from cascade import Cascade
+    from fake_news_detector import AIFakeNewsDetector
+
+    torch.set_num_threads(options['threads'])
+    cascade = Cascade.from_file(options['cascade']) if options.get('cascade') else None
+    detector = AIFakeNewsDetector(
+        use_batching=False,
+        backend=options['backend'],
+        model_path=options['model_path'],
+        long_documents=options['long_documents'],
+        cascade=cascade
+    )
+    return detector.analyze_many
+
+
+def _score_chunk(start, fmt, records, text_fields):
+    # Runs in a worker: parse, score, and serialize one chunk
+    rows = []
+    for index, raw in enumerate(records, start):
+        if fmt == 'jsonl':
+            try:
+                raw = json.loads(raw)
+            except ValueError as e:
+                rows.append((index, None, None, f"Invalid JSON: {e}"))
+                continue
+            if not isinstance(raw, dict):
+                rows.append((index, None, None, "Each line must be a JSON object"))
+                continue
+        rows.append((index, record_id(raw), record_text(raw, text_fields), None))
+
+    valid = [row for row in rows if row[3] is None]
+    scored = iter(_scorer([text for _, _, text, _ in valid]))
+
+    lines = []
+    for index, rid, _, error in rows:
+        output = {'index': index}
+        if rid is not None:
+            output['id'] = rid
+        output.update(next(scored) if error is None else {'error': error})
+        lines.append(json.dumps(output, default=float) + '\n')
+    return len(rows), ''.join(lines).encode()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class Progress:
+    def __init__(self, total_bytes, done=0, stream=sys.stderr, interval=1.0):
+        self.total_bytes = total_bytes
+        self.start_records = done
+        self.records = done
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self._shown = 0.0
+
+    def update(self, records, position, final=False):
+        self.records = records
+        now = time.monotonic()
+        if not final and now - self._shown < self.interval:
+            return
+        self._shown = now
+        elapsed = now - self.started
+        rate = (records - self.start_records) / max(elapsed, 1e-9)
+        percent = 100 * position / max(self.total_bytes, 1)
+        self.stream.write(f"\r{records:,} records  {percent:5.1f}%  {rate:,.0f} records/s  {elapsed:,.0f}s elapsed")
+        if final:
+            self.stream.write('\n')
+        self.stream.flush()
+
+
+def score_file(input_path, output_path, scorer='detector', workers=None, chunk_size=256, resume=False,
+               fmt=None, text_fields=TEXT_FIELDS, options=None, progress=True):
+    """
+    Score every record of input_path into output_path (JSONL), in input order.
+
+    Args:
+        input_path: JSONL or CSV corpus
+        output_path: JSONL results; a `.checkpoint` file is kept next to it
+            until the run completes
+        scorer: 'detector' (AIFakeNewsDetector), 'linear' (train_simple.py
+            pickles), 'rules' (rule_engine) or 'risk' (the detector's
+            rule-based risk score and verdict only, no transformer)
+        workers: Worker processes (defaults to the CPU count)
+        chunk_size: Records per task sent to a worker
+        resume: Continue from the checkpoint of an interrupted run
+        fmt: 'jsonl' or 'csv' (defaults to the input's extension)
+        text_fields: Record fields joined into the scored text
+        options: Scorer settings (backend, model_path, long_documents,
+            cascade, linear_model, linear_vectorizer, news_store_path)
+        progress: Print progress and throughput to stderr
+
+    Returns the number of records written by this run.
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer {scorer!r}; expected one of {', '.join(SCORERS)}")
+    fmt = fmt or detect_format(input_path)
+    workers = workers or os.cpu_count() or 1
+    options = dict(options or {}, scorer=scorer)
+    options.setdefault('threads', max(1, (os.cpu_count() or 1) // workers))
+    options.setdefault('backend', 'pytorch')
+    options.setdefault('model_path', None)
+    options.setdefault('long_documents', False)
+    options.setdefault('linear_model', 'model.pkl')
+    options.setdefault('linear_vectorizer', 'vectorizer.pkl')
+
+    checkpoint_path = output_path + '.checkpoint'
+    source = _fingerprint(input_path)
+    done = offset = 0
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint['input'] != source or checkpoint['scorer'] != scorer:
+            raise ValueError(f"{checkpoint_path} was written for a different input or scorer")
+        done, offset = checkpoint['records'], checkpoint['output_bytes']
+
+    out = open(output_path, 'r+b' if offset else 'wb')
+    # Drop anything written after the last checkpoint
+    out.truncate(offset)
+    out.seek(offset)
+
+    def save_checkpoint(records):
+        temporary = checkpoint_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'input': source, 'scorer': scorer, 'records': records, 'output_bytes': out.tell()}, f)
+        os.replace(temporary, checkpoint_path)
+
+    meter = Progress(source['size'], done) if progress else None
+    written = done
+    position = 0
+    chunks = read_chunks(input_path, fmt, chunk_size, skip=done)
+    context = multiprocessing.get_context('spawn')
+    news_dir = None
+    if scorer in NEWS_SCORERS and not (options.get('news_store_path') or os.environ.get('NEWS_STORE_PATH')):
+        # The feeds are fetched once here; every worker reads the same store
+        news_dir = tempfile.TemporaryDirectory(prefix='news-store-')
+        options['news_store_path'] = os.path.join(news_dir.name, 'news_store.db')
+        prefetch_news(options['news_store_path'])
+    with out, ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                  initargs=(options,)) as pool:
+        # A few chunks per worker keeps every worker busy while bounding memory
+        pending = deque()
+
+        def write_next():
+            nonlocal written, position
+            future, chunk_position = pending.popleft()
+            count, data = future.result()
+            out.write(data)
+            out.flush()
+            written += count
+            position = chunk_position
+            save_checkpoint(written)
+            if meter:
+                meter.update(written, position)
+
+        try:
+            for start, records, chunk_position in chunks:
+                pending.append((pool.submit(_score_chunk, start, fmt, records, tuple(text_fields)), chunk_position))
+                if len(pending) >= 2 * workers:
+                    write_next()
+            while pending:
+                write_next()
+        except BaseException:
+            # Don't wait for queued chunks; the checkpoint covers what was written
+            for future, _ in pending:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    if news_dir is not None:
+        news_dir.cleanup()
+    if meter:
+        meter.update(written, source['size'], final=True)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return written - done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m fake_news_detector', description='Offline fake news scoring')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    score = subparsers.add_parser('score', help='Score a JSONL or CSV corpus into JSONL')
+    score.add_argument('input', help='JSONL or CSV with title/text/body fields')
+    score.add_argument('output', help='JSONL results, in input order')
+    score.add_argument('--scorer', choices=SCORERS, default='detector')
+    score.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    score.add_argument('--threads', type=int, default=None, help='Math library threads per worker (default: cores / workers)')
+    score.add_argument('--chunk-size', type=int, default=256, help='Records per worker task')
+    score.add_argument('--format', choices=('jsonl', 'csv'), default=None, help='Default: from the input extension')
+    score.add_argument('--text-fields', nargs='+', default=list(TEXT_FIELDS))
+    score.add_argument('--resume', action='store_true', help='Continue an interrupted run from its checkpoint')
+    score.add_argument('--backend', default='pytorch', help='Detector inference backend')
+    score.add_argument('--model-path', default=None, help='Detector model name or exported artifact directory')
+    score.add_argument('--long-documents', action='store_true', help='Score long articles as overlapping windows')
+    score.add_argument('--cascade', default=None, help='Cascade bands from `python cascade.py calibrate`')
+    score.add_argument('--linear-model', default='model.pkl')
+    score.add_argument('--linear-vectorizer', default='vectorizer.pkl')
+    score.add_argument('--quiet', action='store_true', help='No progress output')
+
+    args = parser.parse_args(argv)
+    options = {
+        'backend': args.backend,
+        'model_path': args.model_path,
+        'long_documents': args.long_documents,
+        'cascade': args.cascade,
+        'linear_model': args.linear_model,
+        'linear_vectorizer': args.linear_vectorizer
+    }
+    if args.threads:
+        options['threads'] = args.threads
+
+    started = time.monotonic()
+    try:
+        count = score_file(args.input, args.output, args.scorer, args.workers, args.chunk_size, args.resume,
+                           args.format, args.text_fields, options, progress=not args.quiet)
+    except KeyboardInterrupt:
+        print(f"\n⚠️ Interrupted; rerun with --resume to continue from {args.output}.checkpoint", file=sys.stderr)
+        raise SystemExit(130)
+    elapsed = time.monotonic() - started
+    print(f"✅ Scored {count:,} records in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} records/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
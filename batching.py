@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the batcher queue has reached its maximum depth."""
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10, max_queue_size=256):
+        """
+        Merge concurrent single-item calls into batched calls.
+
+        Args:
+            batch_fn: Callable taking a list of items and returning a list of
+                results in the same order
+            max_batch_size: Upper bound on items per batch
+            max_wait_ms: How long the first item in a batch waits for company
+            max_queue_size: Pending items allowed before submit() rejects
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.max_queue_size = max_queue_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stopped = False
+
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._busy_time = 0.0
+
+    def _ensure_worker(self):
+        # Started lazily so the batcher can be created before a fork
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._stopped = False
+                    self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._worker.start()
+
+    def submit(self, item):
+        """Queue an item and return a Future for its result."""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise QueueFullError(f"Batch queue is full ({self.max_queue_size} pending)")
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Submit an item and block until its result is ready."""
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first item, then gather more until size or time runs out."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                self._stopped = True
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            start = time.perf_counter()
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            with self._lock:
+                self._batches += 1
+                self._items += len(items)
+                self._largest_batch = max(self._largest_batch, len(items))
+                self._busy_time += time.perf_counter() - start
+
+    def stop(self):
+        """Stop the worker thread after the queued items are processed."""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        self._worker = None
+
+    def get_stats(self):
+        """Return batching configuration and counters."""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'max_queue_size': self.max_queue_size,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0,
+                'largest_batch': self._largest_batch,
+                'avg_batch_ms': round(self._busy_time / self._batches * 1000, 2) if self._batches else 0
+            }
+
+
+def bucket_by_length(lengths, max_batch_size, min_efficiency=0.75):
+    """
+    Group item indices into batches of similar length.
+
+    Items are sorted by length and packed greedily; a new bucket starts when
+    it is full or when adding the next (longer) item would drop the bucket's
+    padding efficiency (real tokens / padded tokens) below min_efficiency.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    buckets = []
+    bucket, real = [], 0
+    for index in order:
+        length = lengths[index]
+        if bucket and (len(bucket) >= max_batch_size or
+                       (real + length) / (length * (len(bucket) + 1)) < min_efficiency):
+            buckets.append(bucket)
+            bucket, real = [], 0
+        bucket.append(index)
+        real += length
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+
+class PaddingStats:
+    """Thread-safe running totals of real versus padded tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.naive_padded_tokens = 0
+
+    def record(self, lengths, buckets):
+        """Record one batch: its item lengths and how they were bucketed."""
+        padded = sum(max(lengths[i] for i in bucket) * len(bucket) for bucket in buckets)
+        with self._lock:
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += padded
+            # What padding the whole batch to its longest item would have cost
+            self.naive_padded_tokens += max(lengths, default=0) * len(lengths)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'real_tokens': self.real_tokens,
+                'padded_tokens': self.padded_tokens,
+                'padding_efficiency': round(self.real_tokens / self.padded_tokens, 3) if self.padded_tokens else 1.0,
+                'naive_padding_efficiency': round(self.real_tokens / self.naive_padded_tokens, 3) if self.naive_padded_tokens else 1.0
+            }
@@ -0,0 +1,917 @@
+"""
+Micro-benchmarks for the performance-sensitive parts of the detector.
+
+Usage:
+    python benchmark.py features [--docs 50] [--size 30000]
+    python benchmark.py backends --model-path models/distilbert
+    python benchmark.py workers --model-path models/distilbert [--workers 4]
+    python benchmark.py imports
+    python benchmark.py rules [--docs 200] [--size 2000]
+    python benchmark.py load [--executors inline thread process] [--clients 8]
+    python benchmark.py scoring [--workers 1 2 4 8] [--scorer rules]
+    python benchmark.py preprocess [--docs 20000] [--workers 4]
+    python benchmark.py artifact [--features 10000]
+    python benchmark.py linear [--features 10000]
+    python benchmark.py risk [--rows 1000000]
+    python benchmark.py neardup [--documents 1000000]
+    python benchmark.py semantic [--articles 5000]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+from feature_extractor import (
+    LinguisticFeatureExtractor, SENSATIONAL_WORDS, EMOTIONAL_WORDS, CLICKBAIT_PATTERNS
+)
+
+FILLER_WORDS = [
+    'the', 'government', 'announced', 'on', 'tuesday', 'that', 'officials',
+    'would', 'review', 'policy', 'after', 'reports', 'from', 'several',
+    'regions', 'Minister', 'Council', 'economy', 'week', 'people'
+]
+
+SPICE = SENSATIONAL_WORDS + EMOTIONAL_WORDS + [
+    'said', 'according to', '"quoted words"', 'https://example.com',
+    "you won't believe", '7 reasons', 'BREAKING!', 'really?', 'end.'
+]
+
+
+def make_corpus(docs, size, seed=42):
+    """Generate synthetic articles of roughly `size` characters."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(docs):
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(SPICE) if rng.random() < 0.03 else rng.choice(FILLER_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        corpus.append(' '.join(words))
+    return corpus
+
+
+def legacy_extract_linguistic_features(text):
+    """The original per-call implementation, kept as the benchmark baseline."""
+    features = {}
+    features['length'] = len(text)
+    features['word_count'] = len(text.split())
+    features['avg_word_length'] = np.mean([len(word) for word in text.split()]) if text.split() else 0
+    features['exclamation_count'] = text.count('!')
+    features['question_count'] = text.count('?')
+    features['caps_ratio'] = sum(1 for c in text if c.isupper()) / len(text) if text else 0
+    lower_text = text.lower()
+    features['sensational_count'] = sum(1 for word in SENSATIONAL_WORDS if word in lower_text)
+    features['emotional_count'] = sum(1 for word in EMOTIONAL_WORDS if word in lower_text)
+    features['has_quotes'] = int(bool(re.search(r'"[^"]+"', text)))
+    features['has_attribution'] = int(bool(re.search(r'according to|said|reported|stated', text, re.I)))
+    features['has_url'] = int(bool(re.search(r'https?://', text)))
+    features['clickbait_count'] = sum(1 for p in CLICKBAIT_PATTERNS if re.search(p, text, re.I))
+    sentences = text.split('.')
+    features['sentence_count'] = len(sentences)
+    features['avg_sentence_length'] = features['word_count'] / features['sentence_count'] if features['sentence_count'] > 0 else 0
+    return features
+
+
+LEGACY_FAKE_INDICATORS = [
+    'breaking', 'shocking', 'you won\'t believe', 'doctors hate',
+    'one weird trick', 'secret', 'exposed', 'government doesn\'t want',
+    'share before', 'delete', 'urgent', 'must read'
+]
+
+LEGACY_REAL_INDICATORS = [
+    'reuters', 'associated press', 'ap news', 'bbc', 'cnn',
+    'according to', 'study shows', 'research', 'university',
+    'published', 'peer-reviewed'
+]
+
+
+def legacy_analyze_text_simple(text, fake_indicators=None, real_indicators=None):
+    """The original copy-pasted rule scorer, kept as the benchmark baseline."""
+    text_lower = text.lower()
+    fake_indicators = list(fake_indicators or LEGACY_FAKE_INDICATORS)
+    real_indicators = list(real_indicators or LEGACY_REAL_INDICATORS)
+    fake_score = sum(1 for indicator in fake_indicators if indicator in text_lower)
+    real_score = sum(1 for indicator in real_indicators if indicator in text_lower)
+    total_indicators = max(1, fake_score + real_score)
+    fake_probability = min(90, max(10, (fake_score / total_indicators) * 100 + 20))
+    real_probability = 100 - fake_probability
+    return {
+        'fake_probability': fake_probability,
+        'real_probability': real_probability,
+        'prediction': 0 if fake_probability > real_probability else 1
+    }
+
+
+def legacy_preprocess_text(text):
+    """The original train_simple.py / app_simple.py cleaning, kept as the benchmark baseline."""
+    text = str(text).lower()
+    text = re.sub(r'http\S+|www\S+|https\S+', '', text)
+    text = re.sub(r'\S*@\S*\s?', '', text)
+    text = re.sub(r'[^a-zA-Z\s.,!?]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def legacy_calculate_risk_scores(features, relevance_score):
+    """The original per-text AIFakeNewsDetector._calculate_risk_scores, kept as the benchmark baseline."""
+    indicators = {}
+    sens_score = min(features['sensational_count'] * 15 + features['exclamation_count'] * 5, 100)
+    indicators['sensationalism'] = {
+        'score': sens_score,
+        'message': f"Sensational language: {features['sensational_count']} instances, {features['exclamation_count']} exclamations"
+    }
+    source_indicators = features['has_quotes'] + features['has_attribution'] + features['has_url']
+    source_score = 80 if source_indicators == 0 else 50 if source_indicators == 1 else 20
+    indicators['sources'] = {'score': source_score, 'message': f"Source indicators: {source_indicators}/3 found"}
+    emot_score = min(features['emotional_count'] * 12 + features['caps_ratio'] * 50, 100)
+    indicators['emotional'] = {
+        'score': emot_score,
+        'message': f"Emotional language: {features['emotional_count']} instances, {features['caps_ratio']:.1%} caps"
+    }
+    click_score = min(features['clickbait_count'] * 30, 100)
+    indicators['clickbait'] = {'score': click_score, 'message': f"Clickbait patterns: {features['clickbait_count']} detected"}
+    vague_score = 70 if relevance_score < 5 else 40 if relevance_score < 15 else 10
+    indicators['news_relevance'] = {
+        'score': vague_score,
+        'message': f"News relevance: {relevance_score:.1f}% - {'Low relevance to current events' if vague_score > 50 else 'Related to current news'}"
+    }
+    overall = (sens_score * 0.2 + source_score * 0.25 +
+               emot_score * 0.2 + click_score * 0.15 + vague_score * 0.2)
+    level = 'HIGH RISK' if overall >= 65 else 'MEDIUM RISK' if overall >= 35 else 'LOW RISK'
+    return {'overall': overall, 'indicators': indicators}, level
+
+
+def timed(fn, repeat=3):
+    """Best wall-clock time of `repeat` runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_features(args):
+    corpus = make_corpus(args.docs, args.size)
+    extractor = LinguisticFeatureExtractor()
+
+    mismatches = sum(legacy_extract_linguistic_features(text) != extractor.extract(text) for text in corpus)
+    legacy = timed(lambda: [legacy_extract_linguistic_features(text) for text in corpus])
+    compiled = timed(lambda: [extractor.extract(text) for text in corpus])
+    batch = timed(lambda: extractor.extract_many(corpus))
+
+    per_doc = lambda seconds: seconds / len(corpus) * 1000
+    print(f"Linguistic features: {args.docs} docs x ~{args.size // 1000} KB")
+    print(f"  legacy      {per_doc(legacy):8.3f} ms/doc")
+    print(f"  compiled    {per_doc(compiled):8.3f} ms/doc  ({legacy / compiled:.1f}x)")
+    print(f"  batch       {per_doc(batch):8.3f} ms/doc  ({legacy / batch:.1f}x)")
+    print(f"  mismatches  {mismatches}")
+
+
+def bench_rules(args):
+    import json
+    import tempfile
+    from rule_engine import RuleEngine
+
+    corpus = make_corpus(args.docs, args.size)
+    rng = random.Random(7)
+    # Extra made-up phrases to show how each approach scales with lexicon size
+    extra = [' '.join(rng.choice(FILLER_WORDS) + rng.choice('xyz') for _ in range(2)) for _ in range(args.extra_phrases)]
+
+    print(f"Rule engine: {args.docs} docs x ~{args.size} chars")
+    print(f"  {'lexicon':<10} {'legacy':>12} {'engine':>12} {'batch':>12}  prediction changes")
+    for label, fake, real in (('default', LEGACY_FAKE_INDICATORS, LEGACY_REAL_INDICATORS),
+                              (f'+{len(extra)}', LEGACY_FAKE_INDICATORS + extra, LEGACY_REAL_INDICATORS)):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'fake': fake, 'real': real}, f)
+        try:
+            engine = RuleEngine(f.name, check_interval=None)
+        finally:
+            os.unlink(f.name)
+
+        legacy = timed(lambda: [legacy_analyze_text_simple(text, fake, real) for text in corpus])
+        single = timed(lambda: [engine.analyze(text) for text in corpus])
+        batch = timed(lambda: engine.analyze_many(corpus))
+        # Phrases now match on word boundaries, so a few verdicts may change
+        changes = sum(legacy_analyze_text_simple(text, fake, real)['prediction'] != engine.analyze(text)['prediction']
+                      for text in corpus)
+        per_doc = lambda seconds: seconds / len(corpus) * 1e6
+        print(f"  {label:<10} {per_doc(legacy):9.1f} us {per_doc(single):9.1f} us {per_doc(batch):9.1f} us  {changes}")
+
+
+def bench_preprocess(args):
+    import shutil
+    import tempfile
+    import pandas as pd
+    from preprocessing import preprocess_csv, preprocess_many
+
+    rng = random.Random(3)
+    extras = ['Read more at https://example.com/story?id=42', 'Contact tips@example.org today.',
+              'Caf\u00e9 owners \u2014 \u201cshocked\u201d \u00bd', '']
+    corpus = [text + ' ' + rng.choice(extras) for text in make_corpus(args.docs, args.size)]
+    series = pd.Series(corpus)
+
+    print(f"Preprocessing: {args.docs} docs x ~{args.size} chars")
+    legacy = timed(lambda: series.apply(legacy_preprocess_text), repeat=1)
+    single = timed(lambda: preprocess_many(corpus), repeat=1)
+    parallel = timed(lambda: preprocess_many(corpus, args.workers), repeat=1)
+    identical = list(series.apply(legacy_preprocess_text)) == preprocess_many(corpus, args.workers)
+
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, 'Fake.csv')
+        pd.DataFrame({'title': [f'Headline {i}' for i in range(len(corpus))], 'text': corpus}).to_csv(source, index=False)
+        cache = os.path.join(directory, 'cache')
+        cold = timed(lambda: preprocess_csv(source, workers=args.workers, cache_dir=cache), repeat=1)
+        warm = timed(lambda: preprocess_csv(source, workers=args.workers, cache_dir=cache))
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"  {'legacy .apply':<28} {legacy:8.2f}s")
+    print(f"  {'preprocess_many':<28} {single:8.2f}s  {legacy / single:5.1f}x")
+    print(f"  {f'preprocess_many, {args.workers} workers':<28} {parallel:8.2f}s  {legacy / parallel:5.1f}x")
+    print(f"  {'preprocess_csv, cold':<28} {cold:8.2f}s  (read + clean + cache write)")
+    print(f"  {'preprocess_csv, cached':<28} {warm:8.2f}s  (hash + cache read)")
+    print(f"  Output identical to legacy: {'yes' if identical else 'NO'}")
+    if not identical:
+        raise SystemExit(1)
+
+LOAD_SNIPPETS = {
+    'pickle': (
+        "import pickle\n"
+        "model = pickle.load(open('model.pkl', 'rb'))\n"
+        "vectorizer = pickle.load(open('vectorizer.pkl', 'rb'))\n"
+        "model.predict_proba(vectorizer.transform([TEXT]))\n"
+    ),
+    'artifact': (
+        "from linear_artifact import LinearArtifact\n"
+        "LinearArtifact('model_artifact').predict_proba([TEXT])\n"
+    )
+}
+
+
+def _load_profile(snippet, directory):
+    """Load a model in a fresh interpreter; returns seconds to first prediction and memory."""
+    code = (f"import sys, time, json; sys.path.insert(0, {REPO_DIR!r}); start = time.perf_counter()\n"
+            f"TEXT = 'the senate passed the budget bill on tuesday'\n{snippet}"
+            f"seconds = time.perf_counter() - start\n"
+            f"from preload import process_memory; print(json.dumps(dict(process_memory(), seconds=seconds)))")
+    completed = subprocess.run([sys.executable, '-c', code], cwd=directory, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def synthetic_linear_model(docs, words, features, doc_words=300, seed=5):
+    """A TfidfVectorizer + LogisticRegression pair trained on made-up text, and the corpus."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    # Zipf-distributed made-up words give a vocabulary the size of a real one
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'), rng.integers(3, 10)))
+                           for _ in range(words)])
+    ranks = np.minimum(rng.zipf(1.2, size=(docs, doc_words)), words) - 1
+    corpus = [' '.join(vocabulary[row]) for row in ranks]
+    labels = rng.integers(0, 2, docs)
+
+    # Same settings as train_simple.train_model()
+    vectorizer = TfidfVectorizer(max_features=features, stop_words='english', ngram_range=(1, 2),
+                                 min_df=2, max_df=0.95)
+    model = LogisticRegression(class_weight='balanced', max_iter=1000, random_state=42)
+    model.fit(vectorizer.fit_transform(corpus), labels)
+    return vectorizer, model, corpus
+
+
+def bench_artifact(args):
+    import pickle
+    import shutil
+    import tempfile
+    from linear_artifact import export_artifact
+
+    vectorizer, model, _ = synthetic_linear_model(args.docs, args.words, args.features)
+
+    directory = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(directory, 'model.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+        with open(os.path.join(directory, 'vectorizer.pkl'), 'wb') as f:
+            pickle.dump(vectorizer, f)
+        export_artifact(vectorizer, model, os.path.join(directory, 'model_artifact'))
+
+        print(f"Model load to first prediction: {len(vectorizer.vocabulary_)} terms, best of {args.repeat} fresh interpreters")
+        print(f"  {'format':<9} {'load':>9} {'RSS':>8} {'private':>9}")
+        for name, snippet in LOAD_SNIPPETS.items():
+            runs = [_load_profile(snippet, directory) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run['seconds'])
+            print(f"  {name:<9} {best['seconds'] * 1000:7.0f}ms {best['rss_mb']:6.0f}MB {best['private_mb']:7.0f}MB")
+    finally:
+        shutil.rmtree(directory)
+
+def bench_linear(args):
+    import tempfile
+    from fast_linear import CompiledLinear
+    from linear_artifact import LinearArtifact, export_artifact
+
+    vectorizer, model, corpus = synthetic_linear_model(args.docs, args.words, args.features, doc_words=args.doc_words)
+    compiled = CompiledLinear.from_sklearn(vectorizer, model)
+    with tempfile.TemporaryDirectory() as directory:
+        export_artifact(vectorizer, model, directory)
+        artifact = LinearArtifact(directory)
+
+        def app_simple_legacy(text):
+            # What app_simple.predict() did per request
+            features = vectorizer.transform([text])
+            return model.predict(features)[0], model.predict_proba(features)[0]
+
+        paths = {
+            'sklearn (transform, predict, predict_proba)': app_simple_legacy,
+            'sklearn (transform, predict_proba)': lambda text: model.predict_proba(vectorizer.transform([text]))[0],
+            'memory-mapped artifact': lambda text: artifact.predict_proba([text])[0],
+            'compiled': compiled.positive_probability
+        }
+        requests = corpus[:args.requests]
+        print(f"Linear model, {len(vectorizer.vocabulary_)} terms, ~{args.doc_words}-word documents")
+        print(f"  {'per request':<46} {'latency':>10}")
+        for name, fn in paths.items():
+            seconds = timed(lambda: [fn(text) for text in requests])
+            print(f"  {name:<46} {seconds / len(requests) * 1e6:8.0f}us")
+
+        batch = corpus[:args.batch]
+        print(f"  {f'batch of {len(batch)}':<46} {'per doc':>10}")
+        batch_paths = {
+            'sklearn': lambda: model.predict_proba(vectorizer.transform(batch)),
+            'memory-mapped artifact': lambda: artifact.predict_proba(batch),
+            'compiled': lambda: compiled.predict_proba(batch)
+        }
+        for name, fn in batch_paths.items():
+            print(f"  {name:<46} {timed(fn) / len(batch) * 1e6:8.0f}us")
+
+        expected = model.predict_proba(vectorizer.transform(corpus))
+        worst = max(np.abs(compiled.predict_proba(corpus) - expected).max(),
+                    np.abs(artifact.predict_proba(corpus) - expected).max())
+    print(f"  Max probability difference from sklearn over {len(corpus)} docs: {worst:.1e}")
+    if worst > 1e-9:
+        raise SystemExit(1)
+
+def bench_risk(args):
+    from feature_extractor import features_from_row
+    from risk_scoring import score_risk
+
+    corpus = make_corpus(args.docs, args.size)
+    extractor = LinguisticFeatureExtractor()
+    extract_seconds = timed(lambda: extractor.extract_many(corpus), repeat=1) / len(corpus)
+
+    # Tile the extracted rows up to --rows documents, with varied relevance
+    matrix = np.tile(extractor.extract_many(corpus), (-(-args.rows // len(corpus)), 1))[:args.rows]
+    relevance = np.random.default_rng(0).uniform(0, 30, args.rows)
+    dicts = [features_from_row(row) for row in matrix]
+    relevance_list = relevance.tolist()
+
+    legacy = timed(lambda: [legacy_calculate_risk_scores(f, r) for f, r in zip(dicts, relevance_list)], repeat=1)
+    vectorized = timed(lambda: score_risk(matrix, relevance).verdict_levels())
+    print(f"Risk scoring, {args.rows} documents of ~{args.size} characters")
+    print(f"  {'stage':<34} {'total':>9} {'per doc':>9}")
+    rows = [
+        ('feature extraction (estimated)', extract_seconds * args.rows),
+        ('per-text dicts and messages', legacy),
+        ('vectorized scores and verdicts', vectorized)
+    ]
+    for name, seconds in rows:
+        print(f"  {name:<34} {seconds:8.2f}s {seconds / args.rows * 1e6:7.2f}us")
+    print(f"  Vectorized scoring is {vectorized / (vectorized + extract_seconds * args.rows):.1%} of extraction + scoring")
+
+    risk = score_risk(matrix, relevance)
+    sample = range(0, args.rows, max(1, args.rows // 20000))
+    expected = [legacy_calculate_risk_scores(dicts[i], relevance_list[i]) for i in sample]
+    overall_ok = all(risk.overall[i] == result['overall'] for i, (result, _) in zip(sample, expected))
+    levels = risk.verdict_levels()
+    levels_ok = all(levels[i] == level for i, (_, level) in zip(sample, expected))
+    messages_ok = all(risk.indicators(i) == result['indicators'] for i, (result, _) in zip(sample, expected))
+    print(f"  Parity with the per-text path on {len(expected)} documents: "
+          f"scores {'ok' if overall_ok else 'FAIL'}, verdicts {'ok' if levels_ok else 'FAIL'}, "
+          f"messages {'ok' if messages_ok else 'FAIL'}")
+    if not (overall_ok and levels_ok and messages_ok):
+        raise SystemExit(1)
+
+
+def bench_neardup(args):
+    from near_duplicates import NearDuplicateIndex
+
+    rng = np.random.default_rng(7)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    memory = rss_mb()
+    start = time.perf_counter()
+    for offset in range(0, args.documents, 100000):
+        count = min(100000, args.documents - offset)
+        index.add_signatures(rng.integers(0, 1 << 32, (count, index.num_perm), dtype=np.uint32))
+    build = time.perf_counter() - start
+    print(f"Near-duplicate index, {args.documents} documents, threshold {args.threshold} "
+          f"({index.bands} bands x {index.rows} rows)")
+    print(f"  Bulk indexing: {build:.1f}s, {rss_mb() - memory:.0f} MB")
+
+    # Copies of indexed documents with a share of signature entries changed,
+    # so their expected similarity sits just above the threshold
+    documents = rng.choice(args.documents, args.queries, replace=False)
+    copies = index.signatures[documents].copy()
+    changed = rng.random(copies.shape) < (1 - args.threshold) / 2
+    copies[changed] = rng.integers(0, 1 << 32, changed.sum(), dtype=np.uint32)
+    unrelated = rng.integers(0, 1 << 32, (args.queries, index.num_perm), dtype=np.uint32)
+
+    start = time.perf_counter()
+    matches = [index.query(signature) for signature in copies]
+    query_us = (time.perf_counter() - start) / args.queries * 1e6
+    found = sum(match is not None and match.document == document for match, document in zip(matches, documents))
+    false_matches = sum(index.query(signature) is not None for signature in unrelated)
+    print(f"  Lookup: {query_us:.0f}us per query; near copies found {found}/{args.queries}, "
+          f"unrelated matched {false_matches}/{args.queries}")
+
+    # Signing a query text is part of every lookup, and grows with its length
+    text = ' '.join(f"word{i}" for i in rng.integers(0, 50000, args.words))
+    print(f"  Signature of a {args.words}-word text: {timed(lambda: index.signature(text), repeat=20) * 1e6:.0f}us")
+
+    for _ in range(args.queries):
+        index.add(unrelated[_], 1, 0.9, 50.0)
+    start = time.perf_counter()
+    for signature in unrelated:
+        index.query(signature)
+    print(f"  Lookup with {args.queries} unmerged additions: {(time.perf_counter() - start) / args.queries * 1e6:.0f}us per query")
+
+    # A merge re-sorts every band array; lookups must not wait for it
+    merge = threading.Thread(target=index._merge)
+    start = time.perf_counter()
+    merge.start()
+    latencies = []
+    while merge.is_alive():
+        signature = unrelated[len(latencies) % args.queries]
+        began = time.perf_counter()
+        index.query(signature)
+        latencies.append(time.perf_counter() - began)
+    merge.join()
+    if latencies:
+        print(f"  Merge: {time.perf_counter() - start:.2f}s; {len(latencies)} lookups meanwhile, "
+              f"slowest {max(latencies) * 1e3:.1f}ms, median {np.median(latencies) * 1e6:.0f}us")
+
+
+def bench_semantic(args):
+    from semantic_relevance import SemanticIndex, TfidfSvdEncoder
+
+    def make_articles(count, start):
+        corpus = make_corpus(count, args.size, seed=start)
+        return [{'title': text[:60], 'summary': text, 'link': f"https://example.com/{start + i}"}
+                for i, text in enumerate(corpus)]
+
+    articles = make_articles(args.articles, 0)
+    index = SemanticIndex(TfidfSvdEncoder(dimensions=args.dimensions), top_k=args.top_k)
+    print(f"Semantic relevance, {args.articles} articles, TF-IDF/SVD encoder")
+    print(f"  Initial embedding: {timed(lambda: index.update(articles), repeat=1):.2f}s "
+          f"({index.get_stats()['dimensions']} dimensions)")
+
+    # A refresh where a tenth of the articles expire and as many arrive
+    replaced = articles[args.articles // 10:] + make_articles(args.articles // 10, args.articles)
+    print(f"  Incremental refresh ({args.articles // 10} new): {timed(lambda: index.update(replaced), repeat=1):.2f}s")
+
+    queries = make_corpus(args.queries, 2000, seed=99)
+    encode = timed(lambda: [index.encoder.encode([text]) for text in queries]) / len(queries)
+    single = timed(lambda: [index.query(text) for text in queries]) / len(queries)
+    batch = timed(lambda: index.query_many(queries)) / len(queries)
+    print(f"  Query: {single * 1e3:.2f}ms per text ({encode * 1e3:.2f}ms embedding it), "
+          f"{batch * 1e3:.2f}ms per text in a batch of {len(queries)}")
+
+    # Reference: score every article against the query in a Python loop
+    vectors = index.matrix[index.valid]
+    query = index.encoder.encode(queries[:1])[0]
+    loop = timed(lambda: [float(np.dot(row, query)) for row in vectors])
+    product = timed(lambda: vectors @ query)
+    print(f"  Similarities against {len(vectors)} articles: {loop * 1e3:.2f}ms per-row loop, "
+          f"{product * 1e3:.3f}ms matrix product")
+
+
+# Maximum absolute probability difference from the pytorch backend
+PARITY_TOLERANCE = {'pytorch': 0.0, 'onnx': 1e-4, 'quantized': 0.05, 'onnx-int8': 0.05}
+
+PARITY_TEXTS = [
+    "The Senate passed the budget bill on Tuesday, according to officials.",
+    "SHOCKING!!! You won't believe what this celebrity said about vaccines!",
+    "Researchers at the university published a peer-reviewed study on sleep.",
+    "Breaking: secret government plan exposed, share before it gets deleted",
+]
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux)."""
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def _measure_backend(name, model_path, corpus, queue):
+    # Runs in a fresh process so RSS reflects only this backend
+    from inference_backends import load_backend
+
+    # Includes the framework imports each backend pulls in lazily
+    backend = load_backend(name, model_path)
+    loaded_rss = rss_mb()
+
+    probabilities = backend.predict_proba(PARITY_TEXTS)
+    backend.predict_proba(corpus[:1])  # warm-up
+
+    single = timed(lambda: [backend.predict_proba([text]) for text in corpus], repeat=1) / len(corpus)
+    batched = timed(lambda: backend.predict_proba(corpus), repeat=1) / len(corpus)
+    queue.put({
+        'name': name,
+        'probabilities': probabilities,
+        'loaded_mb': loaded_rss,
+        'peak_mb': rss_mb(),
+        'single_ms': single * 1000,
+        'batched_ms': batched * 1000
+    })
+
+
+def _wait_for_result(process, queue, timeout):
+    """Poll a child's queue until it reports, dies, or times out; returns the result or None."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return queue.get(timeout=1)
+        except Exception:
+            if not process.is_alive():
+                break
+    return None
+
+
+def bench_backends(args):
+    corpus = make_corpus(args.docs, args.size)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in args.backends:
+        queue = context.Queue()
+        process = context.Process(target=_measure_backend, args=(name, args.model_path, corpus, queue))
+        process.start()
+        result = _wait_for_result(process, queue, args.timeout)
+        if result is None:
+            print(f"⚠️ {name}: no result (exit code {process.exitcode})")
+        else:
+            results[name] = result
+        process.join()
+
+    reference = results.get('pytorch')
+    print(f"Inference backends: {args.docs} docs x ~{args.size} chars, model {args.model_path}")
+    print(f"  {'backend':<10} {'single':>10} {'batched':>10} {'load RSS':>10} {'peak RSS':>10} {'max |dp|':>10}  parity")
+    failed = False
+    for name, result in results.items():
+        if reference is not None:
+            diff = float(np.abs(result['probabilities'] - reference['probabilities']).max())
+            ok = diff <= PARITY_TOLERANCE.get(name, 0.05)
+            failed |= not ok
+            parity = f"{diff:10.2e}  {'ok' if ok else 'FAIL'}"
+        else:
+            parity = f"{'n/a':>10}  -"
+        print(f"  {name:<10} {result['single_ms']:8.1f}ms {result['batched_ms']:8.1f}ms "
+              f"{result['loaded_mb']:8.0f}MB {result['peak_mb']:8.0f}MB {parity}")
+    if failed:
+        raise SystemExit(1)
+
+
+def _serve_workers(preload, name, model_path, workers, corpus, timeout, queue):
+    # Runs in a fresh process playing the pre-fork server master
+    from inference_backends import load_backend
+    from preload import freeze, process_memory, single_threaded
+
+    backend = None
+    if preload:
+        backend = load_backend(name, model_path)
+        with single_threaded():
+            backend.predict_proba(PARITY_TEXTS)
+        freeze()
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers + 1, timeout=timeout)
+    reports = context.Queue()
+
+    def serve():
+        worker_backend = backend or load_backend(name, model_path)
+        worker_backend.predict_proba(corpus)
+        # Measure only once every worker has loaded and served
+        barrier.wait()
+        reports.put(process_memory())
+        barrier.wait()
+
+    processes = [context.Process(target=serve) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    master = process_memory()
+    worker_memory = [reports.get(timeout=timeout) for _ in processes]
+    barrier.wait()
+    for process in processes:
+        process.join()
+    queue.put({'master': master, 'workers': worker_memory})
+
+
+def bench_workers(args):
+    corpus = make_corpus(args.docs, args.size)
+    context = multiprocessing.get_context('spawn')
+    print(f"Forked workers: {args.workers} x {args.backend}, model {args.model_path}")
+    print(f"  {'mode':<8} {'master PSS':>11} {'worker PSS':>11} {'worker private':>15} {'total PSS':>10}")
+    for preload in (False, True):
+        queue = context.Queue()
+        process = context.Process(target=_serve_workers, args=(
+            preload, args.backend, args.model_path, args.workers, corpus, args.timeout, queue
+        ))
+        process.start()
+        result = _wait_for_result(process, queue, args.timeout)
+        process.join()
+        mode = 'preload' if preload else 'lazy'
+        if result is None:
+            print(f"⚠️ {mode}: no result (exit code {process.exitcode})")
+            continue
+
+        # Private memory is what each extra worker adds on top of the shared pages
+        worker_pss = np.mean([m['pss_mb'] for m in result['workers']])
+        worker_private = np.mean([m['private_mb'] for m in result['workers']])
+        total = result['master']['pss_mb'] + sum(m['pss_mb'] for m in result['workers'])
+        print(f"  {mode:<8} {result['master']['pss_mb']:9.0f}MB {worker_pss:9.0f}MB "
+              f"{worker_private:13.0f}MB {total:8.0f}MB")
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cold-start import budgets (ms) for modules that must not pull in ML libraries
+IMPORT_BUDGETS = {
+    'index': ('.', 400),              # Vercel entry point (Flask)
+    'api/index': ('api', 900),        # Vercel entry point (FastAPI)
+    'main': ('.', 900),               # FastAPI rule-based server
+    'app_demo': ('.', 400),           # Flask rule-based demo
+    'fake_news_detector': ('.', 300)  # Library import; models load on construction
+}
+
+HEAVY_MODULES = ('torch', 'transformers', 'sklearn', 'numpy', 'pandas', 'feedparser', 'onnxruntime')
+
+
+def import_profile(module, directory):
+    """Import one module in a fresh interpreter under -X importtime.
+
+    Returns (cumulative import ms, loaded heavy modules).
+    """
+    code = (f"import sys; sys.path.insert(0, {os.path.join(REPO_DIR, directory)!r}); "
+            f"import {module}; print(' '.join(sys.modules))")
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    cumulative = None
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].rstrip() == f' {module}':
+            cumulative = int(fields[1]) / 1000
+    loaded = set(completed.stdout.split())
+    return cumulative, [name for name in HEAVY_MODULES if name in loaded]
+
+
+def bench_imports(args):
+    print(f"Import time (best of {args.repeat}, ms)")
+    print(f"  {'module':<20} {'import':>8} {'budget':>8}  heavy modules")
+    failed = False
+    for target, (directory, budget) in IMPORT_BUDGETS.items():
+        module = os.path.basename(target)
+        runs = [import_profile(module, directory) for _ in range(args.repeat)]
+        best = min(ms for ms, _ in runs)
+        heavy = runs[0][1]
+        ok = best <= budget * args.budget_scale and not heavy
+        failed |= not ok
+        print(f"  {target:<20} {best:8.1f} {budget * args.budget_scale:8.0f}  "
+              f"{', '.join(heavy) or '-':<20} {'ok' if ok else 'FAIL'}")
+    if failed:
+        raise SystemExit(1)
+
+
+def _request(url, body=None, timeout=60):
+    """Send one request; returns (status, seconds)."""
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 'error'
+    return status, time.perf_counter() - start
+
+
+def _health_latencies(base, duration, interval=0.02):
+    latencies = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        _, seconds = _request(base + '/health')
+        latencies.append(seconds * 1000)
+        time.sleep(interval)
+    return latencies
+
+
+def _load_server(executor, port, args):
+    """Start main:app under uvicorn with the given executor and wait until it answers."""
+    env = dict(os.environ, ANALYZE_EXECUTOR=executor, ANALYZE_QUEUE=str(args.queue),
+               ANALYZE_TIMEOUT=str(args.request_timeout))
+    if args.workers:
+        env['ANALYZE_WORKERS'] = str(args.workers)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=REPO_DIR, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if _request(f'http://127.0.0.1:{port}/health', timeout=1)[0] == 200:
+            return server
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"Server with {executor} executor did not start")
+
+
+def bench_load(args):
+    base = f'http://127.0.0.1:{args.port}'
+    # Each request gets a distinct text so no layer can answer it from a cache
+    text = make_corpus(1, args.size)[0]
+    print(f"/health latency while {args.clients} clients post {args.size // 1000}KB texts to /analyze")
+    print(f"  {'executor':<9} {'idle p50':>9} {'idle p99':>9} {'busy p50':>9} {'busy p99':>9}  /analyze responses")
+    for executor in args.executors:
+        server = _load_server(executor, args.port, args)
+        try:
+            idle = _health_latencies(base, args.duration / 2)
+
+            stop = threading.Event()
+            statuses = {}
+            lock = threading.Lock()
+
+            def client(worker):
+                sent = 0
+                while not stop.is_set():
+                    body = json.dumps({'text': f"{worker} {sent} {text}"}).encode()
+                    status, _ = _request(base + '/analyze', body)
+                    sent += 1
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+                    if status == 503:
+                        time.sleep(0.05)
+
+            clients = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(args.clients)]
+            for thread in clients:
+                thread.start()
+            time.sleep(0.5)
+            busy = _health_latencies(base, args.duration)
+            stop.set()
+            for thread in clients:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+        pct = lambda values, q: np.percentile(values, q) if values else float('nan')
+        counts = ', '.join(f"{status}: {n}" for status, n in sorted(statuses.items(), key=str))
+        print(f"  {executor:<9} {pct(idle, 50):7.1f}ms {pct(idle, 99):7.1f}ms "
+              f"{pct(busy, 50):7.1f}ms {pct(busy, 99):7.1f}ms  {counts}")
+
+
+def bench_scoring(args):
+    import tempfile
+    from batch_scoring import score_file
+
+    corpus = make_corpus(args.docs, args.size)
+    options = {'model_path': args.model_path, 'backend': args.backend, 'threads': 1}
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'corpus.jsonl')
+        with open(source, 'w') as f:
+            for i, text in enumerate(corpus):
+                f.write(json.dumps({'id': i, 'text': text}) + '\n')
+
+        print(f"Offline scoring: {args.docs} x {args.size // 1000}KB documents, {args.scorer} scorer, "
+              f"{os.cpu_count()} CPUs")
+        print(f"  {'workers':>7} {'records/s':>10} {'speedup':>8} {'efficiency':>11}")
+        baseline = None
+        for workers in args.workers:
+            output = os.path.join(directory, f'scores-{workers}.jsonl')
+            start = time.perf_counter()
+            score_file(source, output, args.scorer, workers, args.chunk_size, options=options, progress=False)
+            rate = args.docs / (time.perf_counter() - start)
+            baseline = baseline or rate / workers
+            print(f"  {workers:>7} {rate:10.1f} {rate / baseline:7.2f}x {rate / baseline / workers:10.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake news detector benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    features = subparsers.add_parser('features', help='Linguistic feature extraction')
+    features.add_argument('--docs', type=int, default=50)
+    features.add_argument('--size', type=int, default=30000, help='Characters per document')
+    features.set_defaults(func=bench_features)
+
+    backends = subparsers.add_parser('backends', help='Transformer inference backends: latency, memory, parity')
+    backends.add_argument('--model-path', required=True, help='Artifact from `python inference_backends.py export`')
+    backends.add_argument('--backends', nargs='+', default=['pytorch', 'quantized', 'onnx', 'onnx-int8'])
+    backends.add_argument('--docs', type=int, default=32)
+    backends.add_argument('--size', type=int, default=1500, help='Characters per document')
+    backends.add_argument('--timeout', type=float, default=600)
+    backends.set_defaults(func=bench_backends)
+
+    workers = subparsers.add_parser('workers', help='Memory per forked server worker, with and without preloading')
+    workers.add_argument('--model-path', default=None, help='Model name or exported artifact directory')
+    workers.add_argument('--backend', default='pytorch')
+    workers.add_argument('--workers', type=int, default=4)
+    workers.add_argument('--docs', type=int, default=8)
+    workers.add_argument('--size', type=int, default=1500, help='Characters per document')
+    workers.add_argument('--timeout', type=float, default=600)
+    workers.set_defaults(func=bench_workers)
+
+    rules = subparsers.add_parser('rules', help='Rule engine against the legacy per-phrase scans')
+    rules.add_argument('--docs', type=int, default=200)
+    rules.add_argument('--size', type=int, default=2000, help='Characters per document')
+    rules.add_argument('--extra-phrases', type=int, default=300, help='Synthetic phrases for the scaling run')
+    rules.set_defaults(func=bench_rules)
+
+    imports = subparsers.add_parser('imports', help='Cold-start import time against per-module budgets')
+    imports.add_argument('--repeat', type=int, default=3)
+    imports.add_argument('--budget-scale', type=float, default=1.0, help='Multiply every budget, e.g. for slow CI machines')
+    imports.set_defaults(func=bench_imports)
+
+    load = subparsers.add_parser('load', help='/health latency under /analyze saturation for each executor kind')
+    load.add_argument('--executors', nargs='+', default=['inline', 'thread', 'process'])
+    load.add_argument('--clients', type=int, default=8)
+    load.add_argument('--size', type=int, default=200000, help='Characters per /analyze text')
+    load.add_argument('--duration', type=float, default=10, help='Seconds of sampling under load')
+    load.add_argument('--workers', type=int, default=0, help='ANALYZE_WORKERS (0 for the CPU count)')
+    load.add_argument('--queue', type=int, default=4, help='ANALYZE_QUEUE')
+    load.add_argument('--request-timeout', type=float, default=10, help='ANALYZE_TIMEOUT')
+    load.add_argument('--port', type=int, default=8765)
+    load.set_defaults(func=bench_load)
+
+    scoring = subparsers.add_parser('scoring', help='Offline scoring throughput as worker processes are added')
+    scoring.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    scoring.add_argument('--scorer', default='rules', choices=('detector', 'linear', 'rules'))
+    scoring.add_argument('--model-path', default=None)
+    scoring.add_argument('--backend', default='pytorch')
+    scoring.add_argument('--docs', type=int, default=20000)
+    scoring.add_argument('--size', type=int, default=2000, help='Characters per document')
+    scoring.add_argument('--chunk-size', type=int, default=256)
+    scoring.set_defaults(func=bench_scoring)
+
+    preprocess = subparsers.add_parser('preprocess', help='Training text preprocessing: legacy, vectorized, parallel, cached')
+    preprocess.add_argument('--docs', type=int, default=20000)
+    preprocess.add_argument('--size', type=int, default=3000, help='Characters per document')
+    preprocess.add_argument('--workers', type=int, default=os.cpu_count())
+    preprocess.set_defaults(func=bench_preprocess)
+
+    artifact = subparsers.add_parser('artifact', help='Linear model load time and memory: pickle vs memory-mapped artifact')
+    artifact.add_argument('--features', type=int, default=10000, help='TfidfVectorizer max_features')
+    artifact.add_argument('--docs', type=int, default=3000)
+    artifact.add_argument('--words', type=int, default=20000, help='Distinct words in the synthetic corpus')
+    artifact.add_argument('--repeat', type=int, default=3)
+    artifact.set_defaults(func=bench_artifact)
+
+    linear = subparsers.add_parser('linear', help='Per-request linear model latency: sklearn vs compiled fast path')
+    linear.add_argument('--features', type=int, default=10000, help='TfidfVectorizer max_features')
+    linear.add_argument('--docs', type=int, default=3000)
+    linear.add_argument('--words', type=int, default=20000, help='Distinct words in the synthetic corpus')
+    linear.add_argument('--doc-words', type=int, default=300, help='Words per document')
+    linear.add_argument('--requests', type=int, default=500)
+    linear.add_argument('--batch', type=int, default=256)
+    linear.set_defaults(func=bench_linear)
+
+    risk = subparsers.add_parser('risk', help='Rule risk scoring: per-text dicts vs vectorized batch')
+    risk.add_argument('--rows', type=int, default=1000000, help='Documents to score')
+    risk.add_argument('--docs', type=int, default=2000, help='Distinct synthetic documents (tiled up to --rows)')
+    risk.add_argument('--size', type=int, default=2000, help='Characters per document')
+    risk.set_defaults(func=bench_risk)
+
+    neardup = subparsers.add_parser('neardup', help='Near-duplicate index: memory, lookup latency and recall')
+    neardup.add_argument('--documents', type=int, default=1000000, help='Indexed documents (random signatures)')
+    neardup.add_argument('--queries', type=int, default=2000)
+    neardup.add_argument('--threshold', type=float, default=0.8)
+    neardup.add_argument('--words', type=int, default=500, help='Words in the text signed for the signature timing')
+    neardup.set_defaults(func=bench_neardup)
+
+    semantic = subparsers.add_parser('semantic', help='Semantic relevance: embedding updates and top-k query latency')
+    semantic.add_argument('--articles', type=int, default=5000)
+    semantic.add_argument('--size', type=int, default=400, help='Characters per article')
+    semantic.add_argument('--dimensions', type=int, default=128)
+    semantic.add_argument('--queries', type=int, default=50)
+    semantic.add_argument('--top-k', type=int, default=3)
+    semantic.set_defaults(func=bench_semantic)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
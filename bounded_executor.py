@@ -0,0 +1,128 @@
+"""
+Run CPU-bound scoring off the asyncio event loop with admission control.
+
+Work goes to a fixed-size thread or process pool. At most max_workers +
+max_queue calls may be in flight; beyond that, run() raises
+QueueFullError immediately so the endpoint can answer 503 instead of
+letting requests pile up behind a saturated pool.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from batching import QueueFullError
+
+EXECUTOR_KINDS = ('thread', 'process', 'inline')
+
+
+class BoundedExecutor:
+    def __init__(self, kind='thread', max_workers=None, max_queue=64, timeout=10.0, retry_after=1):
+        """
+        Bounded pool for blocking calls made from async endpoints.
+
+        Args:
+            kind: 'thread', 'process' (true parallelism for pure-Python
+                scoring; callables and results must be picklable) or
+                'inline' (run on the event loop, the old behaviour)
+            max_workers: Pool size (defaults to the CPU count)
+            max_queue: Calls allowed to wait for a free worker
+            timeout: Seconds a request waits for its result
+            retry_after: Seconds suggested to clients rejected with 503
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor {kind!r}; expected one of {', '.join(EXECUTOR_KINDS)}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(self.max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pool = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build an executor from ANALYZE_EXECUTOR, ANALYZE_WORKERS, ANALYZE_QUEUE, ANALYZE_TIMEOUT and ANALYZE_RETRY_AFTER."""
+        return cls(
+            kind=os.environ.get('ANALYZE_EXECUTOR', 'thread'),
+            max_workers=int(os.environ.get('ANALYZE_WORKERS', 0)) or None,
+            max_queue=int(os.environ.get('ANALYZE_QUEUE', 64)),
+            timeout=float(os.environ.get('ANALYZE_TIMEOUT', 10)),
+            retry_after=int(os.environ.get('ANALYZE_RETRY_AFTER', 1))
+        )
+
+    def _get_pool(self):
+        # Created on first use so importing the app never spawns workers
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.kind == 'process':
+                        self._pool = ProcessPoolExecutor(self.max_workers)
+                    else:
+                        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='analyze')
+        return self._pool
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) in the pool and await its result.
+
+        Raises QueueFullError when the pool and its queue are full, and
+        asyncio.TimeoutError when the result takes longer than timeout.
+        A timed-out call keeps its slot until it actually finishes.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(f"Analysis queue is full ({self.max_workers + self.max_queue} in flight)")
+        with self._lock:
+            self.in_flight += 1
+
+        if self.kind == 'inline':
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'kind': self.kind,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'timeout_seconds': self.timeout,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts
+            }
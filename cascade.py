@@ -0,0 +1,360 @@
+"""
+Cheap-first scoring cascade for AIFakeNewsDetector.
+
+Tiers, in order of cost:
+    rules        Linguistic and news-relevance risk score (always computed)
+    linear       TF-IDF + LogisticRegression from train_simple.py
+    transformer  DistilBERT, only for inputs both earlier tiers are unsure of
+
+A tier decides when its score falls outside its uncertainty band. Pick the
+bands from labeled data, then point the detector at the result:
+    python cascade.py calibrate labeled.jsonl --output cascade.json
+    AIFakeNewsDetector(cascade=Cascade.from_file('cascade.json'))
+
+Labeled JSONL has one {"text": ..., "label": ...} object per line, where the
+label is "fake"/"real" or 1 (fake) / 0 (real).
+"""
+import argparse
+import itertools
+import json
+import pickle
+import threading
+import time
+
+TIERS = ('rules', 'linear', 'transformer')
+
+# A result counts as a "fake" verdict when its risk score reaches this value
+DECISION_THRESHOLD = 50
+
+
+def combine_risk(rule_risk, ai_prediction, ai_confidence):
+    """Blend the rule risk with a model prediction the way the detector does."""
+    if ai_prediction is None:
+        return rule_risk
+    # AI prediction: 1 = fake, 0 = real
+    return ai_prediction * 100 * ai_confidence * 0.5 + rule_risk * 0.5
+
+
+class LinearScorer:
+    def __init__(self, model_path='model.pkl', vectorizer_path='vectorizer.pkl', fake_label=0):
+        """
+        TF-IDF + LogisticRegression artifacts written by train_simple.py.
+
+        Args:
+            model_path: Pickled LogisticRegression
+            vectorizer_path: Pickled TfidfVectorizer
+            fake_label: Class label used for fake news (train_simple uses 0)
+        """
+        from fast_linear import CompiledLinear
+        from preprocessing import preprocess_text
+
+        with open(model_path, 'rb') as f:
+            self.model = pickle.load(f)
+        with open(vectorizer_path, 'rb') as f:
+            self.vectorizer = pickle.load(f)
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        self.preprocess = preprocess_text
+        self.fake_column = list(self.model.classes_).index(fake_label)
+        try:
+            self.compiled = CompiledLinear.from_sklearn(self.vectorizer, self.model)
+        except ValueError:
+            # Hashed features from `train_simple.py --streaming` stay on sklearn
+            self.compiled = None
+
+    def fake_probability(self, texts):
+        """Probability that each text is fake, as a 1-D array."""
+        processed = [self.preprocess(text) for text in texts]
+        if self.compiled is not None:
+            return self.compiled.predict_proba(processed)[:, self.fake_column]
+        return self.model.predict_proba(self.vectorizer.transform(processed))[:, self.fake_column]
+
+
+class Cascade:
+    def __init__(self, rule_band=(15, 75), linear_band=(0.1, 0.9), linear=None):
+        """
+        Route each text to the cheapest tier that is confident about it.
+
+        Args:
+            rule_band: (low, high) rule risk scores; a rule risk at or below
+                low is decided real, at or above high decided fake. None on
+                either side disables that exit.
+            linear_band: (low, high) fake probabilities for the linear tier
+            linear: Optional LinearScorer; without it the linear tier is skipped
+        """
+        self.rule_band = tuple(rule_band)
+        self.linear_band = tuple(linear_band)
+        self.linear = linear
+        self._lock = threading.Lock()
+        self._decided = dict.fromkeys(TIERS, 0)
+
+    @classmethod
+    def from_file(cls, path, load_linear=True):
+        """Load bands (and linear model paths) written by `python cascade.py calibrate`."""
+        with open(path) as f:
+            config = json.load(f)
+        linear = None
+        if load_linear and config.get('linear_model'):
+            linear = LinearScorer(config['linear_model'], config['linear_vectorizer'])
+        return cls(config['rule_band'], config['linear_band'], linear)
+
+    @staticmethod
+    def _outside(value, band):
+        low, high = band
+        return (low is not None and value <= low) or (high is not None and value >= high)
+
+    def route(self, texts, rule_risks, transformer=None):
+        """
+        Score texts tier by tier.
+
+        Args:
+            texts: Texts to score
+            rule_risks: Rule-based overall risk (0-100) per text
+            transformer: Optional callable mapping a list of texts to
+                (prediction, confidence, window_report) tuples
+
+        Returns:
+            (prediction, confidence, window_report, cascade_info) per text
+        """
+        results = [None] * len(texts)
+        pending = []
+        for i, risk in enumerate(rule_risks):
+            if self._outside(risk, self.rule_band):
+                results[i] = (None, None, None, {'tier': 'rules', 'rule_risk': round(risk, 2)})
+            else:
+                pending.append(i)
+
+        linear_scores = {}
+        if pending and self.linear is not None:
+            probabilities = self.linear.fake_probability([texts[i] for i in pending])
+            undecided = []
+            for i, fake in zip(pending, probabilities):
+                linear_scores[i] = float(fake)
+                if self._outside(fake, self.linear_band):
+                    results[i] = self._linear_result(i, fake, rule_risks[i])
+                else:
+                    undecided.append(i)
+            pending = undecided
+
+        if pending:
+            predictions = transformer([texts[i] for i in pending]) if transformer is not None else None
+            for j, i in enumerate(pending):
+                prediction, confidence, windows = predictions[j] if predictions else (None, None, None)
+                if prediction is None and i in linear_scores:
+                    # Transformer unavailable: the linear score is the best we have
+                    results[i] = self._linear_result(i, linear_scores[i], rule_risks[i])
+                    continue
+                if prediction is None:
+                    # No model scored it, so the rule risk alone decides
+                    results[i] = (None, None, None, {'tier': 'rules', 'rule_risk': round(rule_risks[i], 2),
+                                                     'uncertain': True})
+                    continue
+                info = {'tier': 'transformer', 'rule_risk': round(rule_risks[i], 2)}
+                if i in linear_scores:
+                    info['linear_fake_probability'] = round(linear_scores[i], 4)
+                results[i] = (prediction, confidence, windows, info)
+
+        with self._lock:
+            for result in results:
+                self._decided[result[3]['tier']] += 1
+        return results
+
+    @staticmethod
+    def _linear_result(i, fake, rule_risk):
+        prediction = int(fake >= 0.5)
+        info = {'tier': 'linear', 'rule_risk': round(rule_risk, 2), 'linear_fake_probability': round(float(fake), 4)}
+        return prediction, float(max(fake, 1 - fake)), None, info
+
+    def get_stats(self):
+        with self._lock:
+            total = sum(self._decided.values())
+            return {
+                'rule_band': list(self.rule_band),
+                'linear_band': list(self.linear_band),
+                'linear_model': self.linear is not None,
+                'decided': dict(self._decided),
+                'decided_share': {tier: round(count / total, 3) if total else 0 for tier, count in self._decided.items()}
+            }
+
+
+def parse_label(value):
+    """Map "fake"/"real" or 1/0 to the detector's convention (1 = fake)."""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('fake', 'false', '1'):
+            return 1
+        if value in ('real', 'true', '0'):
+            return 0
+        raise ValueError(f"Unknown label {value!r}")
+    return int(bool(value))
+
+
+def read_labeled(path):
+    import numpy as np
+    texts, labels = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record['text'])
+                labels.append(parse_label(record['label']))
+    return texts, np.array(labels)
+
+
+def simulate(rule_band, linear_band, rule_risk, linear_fake, transformer_pred, transformer_conf):
+    """
+    Replay the cascade over precomputed scores.
+
+    Returns (fake_verdicts, reached_linear, reached_transformer) as boolean
+    arrays; mirrors Cascade.route() and combine_risk().
+    """
+    import numpy as np
+
+    def outside(values, band):
+        low, high = band
+        mask = np.zeros(len(values), dtype=bool)
+        if low is not None:
+            mask |= values <= low
+        if high is not None:
+            mask |= values >= high
+        return mask
+
+    reached_linear = ~outside(rule_risk, rule_band)
+    if linear_fake is not None:
+        reached_transformer = reached_linear & ~outside(linear_fake, linear_band)
+        linear_pred = (linear_fake >= 0.5).astype(float)
+        linear_risk = combine_risk(rule_risk, linear_pred, np.maximum(linear_fake, 1 - linear_fake))
+    else:
+        reached_transformer = reached_linear
+        linear_risk = rule_risk
+
+    if transformer_pred is not None:
+        transformer_risk = combine_risk(rule_risk, transformer_pred, transformer_conf)
+    else:
+        transformer_risk = linear_risk
+
+    risk = np.where(reached_transformer, transformer_risk, np.where(reached_linear, linear_risk, rule_risk))
+    return risk >= DECISION_THRESHOLD, reached_linear, reached_transformer
+
+
+def calibrate(rule_risk, linear_fake, transformer_pred, transformer_conf, labels, costs, max_accuracy_drop=0.005):
+    """
+    Grid-search the bands that minimize mean cost per text while keeping
+    accuracy within max_accuracy_drop of always running every tier.
+
+    Args:
+        costs: Mean seconds per text for each tier, keyed by tier name
+    """
+    import numpy as np
+
+    baseline_fake, _, _ = simulate((None, None), (None, None), rule_risk, linear_fake,
+                                   transformer_pred, transformer_conf)
+    baseline_accuracy = float((baseline_fake == labels).mean())
+
+    percentiles = np.percentile(rule_risk, np.arange(0, 101, 5))
+    rule_lows = [None] + sorted(set(np.round(percentiles[:11], 2)))
+    rule_highs = [None] + sorted(set(np.round(percentiles[10:], 2)))
+    linear_edges = [0.02, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45]
+    linear_bands = [(None, None)] + [(edge, 1 - edge) for edge in linear_edges] if linear_fake is not None else [(None, None)]
+
+    best = None
+    for rule_low, rule_high, linear_band in itertools.product(rule_lows, rule_highs, linear_bands):
+        if rule_low is not None and rule_high is not None and rule_low >= rule_high:
+            continue
+        fake, reached_linear, reached_transformer = simulate(
+            (rule_low, rule_high), linear_band, rule_risk, linear_fake, transformer_pred, transformer_conf
+        )
+        accuracy = float((fake == labels).mean())
+        if accuracy < baseline_accuracy - max_accuracy_drop:
+            continue
+        cost = (costs['rules'] + reached_linear.mean() * costs['linear'] +
+                reached_transformer.mean() * costs['transformer'])
+        candidate = (cost, -accuracy, (rule_low, rule_high), linear_band, reached_linear, reached_transformer)
+        if best is None or candidate[:2] < best[:2]:
+            best = candidate
+
+    cost, accuracy, rule_band, linear_band, reached_linear, reached_transformer = best
+    baseline_cost = costs['rules'] + (costs['linear'] if linear_fake is not None else 0) + costs['transformer']
+    return {
+        'rule_band': [None if v is None else float(v) for v in rule_band],
+        'linear_band': list(linear_band),
+        'report': {
+            'samples': int(len(labels)),
+            'baseline_accuracy': round(baseline_accuracy, 4),
+            'accuracy': round(-accuracy, 4),
+            'decided_share': {
+                'rules': round(float(1 - reached_linear.mean()), 4),
+                'linear': round(float(reached_linear.mean() - reached_transformer.mean()), 4),
+                'transformer': round(float(reached_transformer.mean()), 4)
+            },
+            'tier_ms': {tier: round(seconds * 1000, 3) for tier, seconds in costs.items()},
+            'baseline_ms_per_text': round(baseline_cost * 1000, 3),
+            'cascade_ms_per_text': round(cost * 1000, 3)
+        }
+    }
+
+
+def score_tiers(detector, linear, texts):
+    """Run every tier on every text; returns scores and mean seconds per text per tier."""
+    import numpy as np
+
+    start = time.perf_counter()
+    features = [detector.extract_linguistic_features(text) for text in texts]
+    relevance = detector.news_fetcher.check_news_relevance_many(texts)
+    rule_risk = np.array([detector._calculate_risk_scores(f, r)['overall'] for f, r in zip(features, relevance)])
+    costs = {'rules': (time.perf_counter() - start) / len(texts)}
+
+    linear_fake = None
+    costs['linear'] = 0.0
+    if linear is not None:
+        start = time.perf_counter()
+        linear_fake = linear.fake_probability(texts)
+        costs['linear'] = (time.perf_counter() - start) / len(texts)
+
+    transformer_pred = transformer_conf = None
+    costs['transformer'] = 0.0
+    if detector.use_pretrained:
+        start = time.perf_counter()
+        predictions = detector._predict_many(texts)
+        costs['transformer'] = (time.perf_counter() - start) / len(texts)
+        transformer_pred = np.array([p[0] for p in predictions], dtype=float)
+        transformer_conf = np.array([p[1] for p in predictions], dtype=float)
+
+    return rule_risk, linear_fake, transformer_pred, transformer_conf, costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cheap-first cascade tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    cal = subparsers.add_parser('calibrate', help='Pick uncertainty bands from labeled JSONL')
+    cal.add_argument('data', help='JSONL with "text" and "label" fields')
+    cal.add_argument('--output', default='cascade.json')
+    cal.add_argument('--linear-model', default='model.pkl')
+    cal.add_argument('--linear-vectorizer', default='vectorizer.pkl')
+    cal.add_argument('--no-linear', action='store_true', help='Calibrate without the linear tier')
+    cal.add_argument('--backend', default='pytorch')
+    cal.add_argument('--model-path', default=None)
+    cal.add_argument('--max-accuracy-drop', type=float, default=0.005)
+
+    args = parser.parse_args()
+    if args.command == 'calibrate':
+        from fake_news_detector import AIFakeNewsDetector
+
+        texts, labels = read_labeled(args.data)
+        linear = None if args.no_linear else LinearScorer(args.linear_model, args.linear_vectorizer)
+        detector = AIFakeNewsDetector(use_batching=False, backend=args.backend, model_path=args.model_path)
+        scores = score_tiers(detector, linear, texts)
+        result = calibrate(*scores[:4], labels, scores[4], args.max_accuracy_drop)
+        if linear is not None:
+            result['linear_model'] = args.linear_model
+            result['linear_vectorizer'] = args.linear_vectorizer
+
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(json.dumps(result['report'], indent=2))
+        print(f"✅ Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,144 +1,407 @@
-import torch
-import numpy as np
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from sklearn.feature_extraction.text import TfidfVectorizer
-import re
 import warnings
 from news_fetcher import NewsFetcher
+from batching import MicroBatcher, PaddingStats, bucket_by_length
+from feature_extractor import FEATURE_NAMES, LinguisticFeatureExtractor, SENSATIONAL_WORDS, EMOTIONAL_WORDS
+from cascade import combine_risk
 warnings.filterwarnings('ignore')
 
 class AIFakeNewsDetector:
-    def __init__(self, use_pretrained=True):
+    def __init__(self, use_pretrained=True, use_batching=True, batch_size=8,
+                 batch_wait_ms=10, batch_queue_size=256, backend='pytorch', model_path=None,
+                 long_documents=False, window_stride=384, window_batch_size=2,
+                 window_aggregation='max', early_exit_confidence=0.9, max_windows=16, cascade=None,
+                 near_duplicates=None):
         """
         Initialize the AI-powered fake news detector.
         
         Args:
             use_pretrained: Use pre-trained transformer model (requires internet)
+            use_batching: Merge concurrent transformer calls into batched forward passes
+            batch_size: Maximum number of texts per forward pass
+            batch_wait_ms: Maximum time a text waits for a batch to fill
+            batch_queue_size: Maximum number of texts waiting for the model
+            backend: Inference backend: 'pytorch', 'quantized', 'onnx' or 'onnx-int8'
+            model_path: Model name or artifact directory written by
+                `python inference_backends.py export` (required for onnx)
+            long_documents: Score texts longer than the model limit as
+                overlapping windows instead of truncating them
+            window_stride: Tokens between the starts of consecutive windows
+            window_batch_size: Windows scored per forward pass before the
+                early-exit check
+            window_aggregation: Combine window probabilities by 'max' (most
+                suspicious window) or 'mean'
+            early_exit_confidence: Stop scoring windows once the combined
+                confidence reaches this value; under 'max' only a fake
+                probability counts, since a later window can still raise it
+            max_windows: Upper bound on windows per text; longer texts are
+                sampled evenly
+            cascade: Optional cascade.Cascade; the transformer then only runs
+                for texts the rule and linear tiers are unsure of
+            near_duplicates: Optional near_duplicates.NearDuplicateIndex; texts
+                close to an already-scored one reuse its model verdict
         """
+        if window_aggregation not in ('max', 'mean'):
+            raise ValueError(f"window_aggregation must be 'max' or 'mean', got {window_aggregation!r}")
         self.use_pretrained = use_pretrained
         self.news_fetcher = NewsFetcher()
+        self.batch_size = max(1, batch_size)
+        self.backend = None
+        self.batcher = None
+        self.padding_stats = PaddingStats()
+        self.long_documents = long_documents
+        self.window_stride = max(1, window_stride)
+        self.window_batch_size = max(1, window_batch_size)
+        self.window_aggregation = window_aggregation
+        self.early_exit_confidence = early_exit_confidence
+        self.max_windows = max(1, max_windows)
+        self.cascade = cascade
+        self.near_duplicates = near_duplicates
         
         if use_pretrained:
             print("🔄 Loading AI model... This may take a moment on first run.")
             try:
+                # Heavy ML imports happen here, not when the module is imported
+                from inference_backends import load_backend
+                
                 # Using DistilBERT for fake news detection
-                self.tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased")
-                self.model = AutoModelForSequenceClassification.from_pretrained(
-                    "distilbert-base-uncased",
-                    num_labels=2
-                )
-                self.model.eval()
-                print("✅ AI model loaded successfully!")
+                self.backend = load_backend(backend, model_path)
+                self.tokenizer = self.backend.tokenizer
+                self.model = self.backend.model
+                semantic = self.news_fetcher.semantic
+                if (semantic is not None and hasattr(self.backend, 'embed') and
+                        semantic.calibration.covers('transformer')):
+                    # Semantic relevance reuses the loaded encoder (mean pooled);
+                    # concurrent requests' texts are embedded in shared batches
+                    from semantic_relevance import TransformerEncoder
+                    encoder = TransformerEncoder(
+                        self.backend,
+                        batch_size=batch_size,
+                        max_wait_ms=batch_wait_ms if use_batching else None,
+                        max_queue_size=batch_queue_size
+                    )
+                    semantic.set_encoder(encoder, self.news_fetcher.cached_news)
+                if use_batching:
+                    self.batcher = MicroBatcher(
+                        self.get_transformer_predictions,
+                        max_batch_size=batch_size,
+                        max_wait_ms=batch_wait_ms,
+                        max_queue_size=batch_queue_size
+                    )
+                print(f"✅ AI model loaded successfully! (backend: {self.backend.name})")
             except Exception as e:
                 print(f"⚠️ Could not load transformer model: {e}")
                 print("Falling back to traditional ML features only.")
                 self.use_pretrained = False
         
         # Feature extraction
-        self.vectorizer = TfidfVectorizer(max_features=100, stop_words='english')
+        self._vectorizer = None
         
         # Linguistic features
-        self.sensational_words = [
-            'shocking', 'unbelievable', 'mind-blowing', 'devastating',
-            'horrifying', 'incredible', 'jaw-dropping', 'explosive',
-            'bombshell', 'stunning', 'outrageous', 'unprecedented'
-        ]
-        
-        self.emotional_words = [
-            'outrage', 'furious', 'terrifying', 'disgusting', 'alarming',
-            'scary', 'panic', 'crisis', 'disaster', 'threat', 'danger'
-        ]
+        self.sensational_words = list(SENSATIONAL_WORDS)
+        self.emotional_words = list(EMOTIONAL_WORDS)
+        self.feature_extractor = LinguisticFeatureExtractor(self.sensational_words, self.emotional_words)
+
+    @property
+    def vectorizer(self):
+        """TF-IDF vectorizer, built on first use so sklearn is only imported when needed."""
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self._vectorizer = TfidfVectorizer(max_features=100, stop_words='english')
+        return self._vectorizer
 
     def extract_linguistic_features(self, text):
         """Extract linguistic and stylistic features."""
-        features = {}
-        
-        # Basic statistics
-        features['length'] = len(text)
-        features['word_count'] = len(text.split())
-        features['avg_word_length'] = np.mean([len(word) for word in text.split()]) if text.split() else 0
-        
-        # Punctuation analysis
-        features['exclamation_count'] = text.count('!')
-        features['question_count'] = text.count('?')
-        features['caps_ratio'] = sum(1 for c in text if c.isupper()) / len(text) if text else 0
-        
-        # Sensational language
-        lower_text = text.lower()
-        features['sensational_count'] = sum(1 for word in self.sensational_words if word in lower_text)
-        features['emotional_count'] = sum(1 for word in self.emotional_words if word in lower_text)
-        
-        # Source indicators
-        features['has_quotes'] = int(bool(re.search(r'"[^"]+"', text)))
-        features['has_attribution'] = int(bool(re.search(r'according to|said|reported|stated', text, re.I)))
-        features['has_url'] = int(bool(re.search(r'https?://', text)))
-        
-        # Clickbait patterns
-        clickbait_patterns = [
-            r'you won\'t believe', r'what happened next', r'this one trick',
-            r'\d+ (reasons|ways|things)', r'shocking truth'
-        ]
-        features['clickbait_count'] = sum(1 for p in clickbait_patterns if re.search(p, text, re.I))
+        return self.feature_extractor.extract(text)
+
+    def get_transformer_predictions(self, texts):
+        """
+        Run the transformer on a batch of texts.
+        
+        Texts are tokenized once, grouped into buckets of similar token
+        length, and each bucket is padded only to its own longest member, so
+        short claims don't pay for the longest article in the batch. Items
+        may also be token id lists that are already encoded (a long-document
+        window); those are not tokenized again.
+        """
+        token_ids = list(texts)
+        strings = [i for i, item in enumerate(token_ids) if isinstance(item, str)]
+        if strings:
+            for i, ids in zip(strings, self.backend.tokenize([token_ids[i] for i in strings])):
+                token_ids[i] = ids
+        probabilities = self._score_token_ids(token_ids)
+        predictions = probabilities.argmax(axis=1)
+        return [(int(pred), float(row[pred])) for pred, row in zip(predictions, probabilities)]
+
+    def _score_token_ids(self, token_ids):
+        """Return class probabilities (N x 2) for token id lists, bucketed by length."""
+        import numpy as np
+        
+        lengths = [len(ids) for ids in token_ids]
+        buckets = bucket_by_length(lengths, self.batch_size)
+        self.padding_stats.record(lengths, buckets)
+        
+        probabilities = np.empty((len(token_ids), 2))
+        for bucket in buckets:
+            input_ids, attention_mask = self.backend.pad([token_ids[i] for i in bucket])
+            probabilities[bucket] = self.backend.run(input_ids, attention_mask)
+        
+        return probabilities
+
+    def _split_windows(self, texts):
+        """
+        Split each text into overlapping model-sized windows.
+        
+        Returns, per text, a list of (start_token, end_token, token_ids) with
+        special tokens added; a text that fits the model yields one window
+        identical to its normal (truncated) encoding. Every window is
+        returned; _sample_windows() applies max_windows.
+        """
+        size = self.backend.max_length - self.tokenizer.num_special_tokens_to_add()
+        stride = min(self.window_stride, size)
+        encoded = self.tokenizer(
+            list(texts), truncation=True, max_length=self.backend.max_length,
+            stride=size - stride, return_overflowing_tokens=True
+        )
+        
+        split = [[] for _ in texts]
+        for ids, sample in zip(encoded['input_ids'], encoded['overflow_to_sample_mapping']):
+            windows = split[sample]
+            start = len(windows) * stride
+            windows.append((start, start + len(ids) - (self.backend.max_length - size), ids))
+        return split
+
+    def _sample_windows(self, windows):
+        """At most max_windows of a text's windows: the first, the last and the rest spread evenly."""
+        import numpy as np
+        
+        if len(windows) <= self.max_windows:
+            return windows
+        picks = np.linspace(0, len(windows) - 1, self.max_windows).round().astype(int)
+        return [windows[j] for j in sorted(set(picks))]
+
+    def _combine_windows(self, probabilities):
+        """Combine per-window probabilities into one document distribution."""
+        if self.window_aggregation == 'mean':
+            return probabilities.mean(axis=0)
+        return probabilities[probabilities[:, 1].argmax()]
+
+    def _score_windows(self, windows):
+        """
+        Score windows a few at a time, stopping once the combined confidence
+        reaches early_exit_confidence. Returns (prediction, confidence, report);
+        the report's `total` counts every window of the text and `sampled`
+        those kept by max_windows.
+
+        Under 'max' a confidently real prefix decides nothing (an unread
+        window may be the fake passage), so only the fake probability can
+        end scoring early.
+        """
+        import numpy as np
         
-        # Sentence complexity
-        sentences = text.split('.')
-        features['sentence_count'] = len(sentences)
-        features['avg_sentence_length'] = features['word_count'] / features['sentence_count'] if features['sentence_count'] > 0 else 0
+        total = len(windows)
+        windows = self._sample_windows(windows)
+        scored = []
+        combined = None
+        for offset in range(0, len(windows), self.window_batch_size):
+            chunk = windows[offset:offset + self.window_batch_size]
+            scored.extend(self._score_token_ids([ids for _, _, ids in chunk]))
+            combined = self._combine_windows(np.asarray(scored))
+            decided = combined[1] if self.window_aggregation == 'max' else combined.max()
+            if decided >= self.early_exit_confidence:
+                break
         
-        return features
+        prediction = int(combined.argmax())
+        report = {
+            'aggregation': self.window_aggregation,
+            'total': total,
+            'sampled': len(windows),
+            'scored': len(scored),
+            'early_exit': len(scored) < len(windows),
+            'scores': [
+                {'start_token': start, 'end_token': end, 'fake_probability': round(float(probs[1]), 4)}
+                for (start, end, _), probs in zip(windows, scored)
+            ]
+        }
+        return prediction, float(combined[prediction]), report
 
     def get_transformer_prediction(self, text):
-        """Get prediction from transformer model."""
+        """Get prediction from transformer model (for a text or its token ids)."""
         if not self.use_pretrained:
             return None, None
         
         try:
-            # Tokenize and predict
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512, padding=True)
-            
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
-                probabilities = torch.softmax(logits, dim=1)
-                prediction = torch.argmax(probabilities, dim=1).item()
-                confidence = probabilities[0][prediction].item()
-            
-            return prediction, confidence
+            if self.batcher is not None:
+                return self.batcher(text)
+            return self.get_transformer_predictions([text])[0]
         except Exception as e:
             print(f"⚠️ Transformer prediction error: {e}")
             return None, None
 
+    def get_long_document_prediction(self, text):
+        """
+        Get a prediction for text of any length.
+        
+        Texts that fit the model go through the usual (micro-batched) path;
+        longer ones are scored as overlapping windows. Returns
+        (prediction, confidence, window_report), where window_report is None
+        for texts that fit in one window.
+        """
+        if not self.use_pretrained:
+            return None, None, None
+        
+        try:
+            windows = self._split_windows([text])[0]
+            if len(windows) == 1:
+                # Its one window is the normal encoding: batch the ids as they are
+                return (*self.get_transformer_prediction(windows[0][2]), None)
+            return self._score_windows(windows)
+        except Exception as e:
+            print(f"⚠️ Transformer prediction error: {e}")
+            return None, None, None
+
+    def get_batching_stats(self):
+        """Return micro-batching and padding counters, or None without a model."""
+        if not self.use_pretrained:
+            return None
+        stats = self.batcher.get_stats() if self.batcher is not None else {}
+        stats.update(self.padding_stats.get_stats())
+        return stats
+
     def analyze(self, text, url=None):
         """Perform AI-powered analysis on text."""
         if not text.strip():
             return {'error': 'No text provided for analysis'}
         
+        return self._analyze_texts([text], [url])[0]
+
+    def analyze_many(self, texts, urls=None):
+        """
+        Analyze a list of texts, sharing work across the whole batch.
+        
+        Feature extraction runs over the batch, the current news keywords are
+        looked up once, and the transformer runs on length-bucketed batches of
+        up to `batch_size` texts. Results are returned in input order; invalid items
+        get an `error` entry instead of failing the batch.
+        """
+        texts = list(texts)
+        urls = list(urls) if urls is not None else [None] * len(texts)
+        if len(urls) != len(texts):
+            raise ValueError(f"Got {len(urls)} urls for {len(texts)} texts")
+        
+        results = [None] * len(texts)
+        valid = []
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text.strip():
+                results[i] = {'error': 'No text provided for analysis'}
+            else:
+                valid.append(i)
+        
+        if valid:
+            analyses = self._analyze_texts([texts[i] for i in valid], [urls[i] for i in valid])
+            for i, analysis in zip(valid, analyses):
+                results[i] = analysis
+        
+        return results
+
+    def _analyze_texts(self, texts, urls):
+        """Score non-empty texts and build their analyses."""
         # Extract linguistic features
-        linguistic_features = self.extract_linguistic_features(text)
+        linguistic_features = [self.extract_linguistic_features(text) for text in texts]
         
         # Check news relevance
-        news_relevance = self.news_fetcher.check_news_relevance(text)
+        news_relevance = self.news_fetcher.check_news_relevance_many(texts)
+        risk_scores = self._score_risk(linguistic_features, news_relevance)
         
-        # Get AI prediction
-        ai_prediction = None
-        ai_confidence = 0.5
+        # Near-duplicates of scored texts reuse their model verdict
+        if self.near_duplicates is not None:
+            signatures = [self.near_duplicates.signature(text) for text in texts]
+            matches = [self.near_duplicates.query(signature) for signature in signatures]
+        else:
+            signatures = matches = [None] * len(texts)
+        pending = [j for j, match in enumerate(matches) if match is None]
         
-        if self.use_pretrained:
-            pred, conf = self.get_transformer_prediction(text)
-            if pred is not None:
-                ai_prediction = pred
-                ai_confidence = conf
+        # Get AI prediction, from the cheapest confident tier when cascading
+        predictions = [(match.ai_prediction, match.ai_confidence, None, None) if match else None for match in matches]
+        if pending:
+            pending_texts = [texts[j] for j in pending]
+            if self.cascade is not None:
+                transformer = self._predict if self.use_pretrained else None
+                overall = risk_scores.overall.tolist()
+                routed = self.cascade.route(pending_texts, [overall[j] for j in pending], transformer)
+            else:
+                routed = [(*prediction, None) for prediction in self._predict(pending_texts)]
+            for j, prediction in zip(pending, routed):
+                predictions[j] = prediction
+        
+        analyses = [
+            self._build_analysis(linguistic_features[j], news_relevance[j], ai_prediction, ai_confidence,
+                                 urls[j], windows, risk_scores.result(j), cascade_info, matches[j])
+            for j, (ai_prediction, ai_confidence, windows, cascade_info) in enumerate(predictions)
+        ]
+        if self.near_duplicates is not None:
+            for j, analysis in enumerate(analyses):
+                cluster = self.near_duplicates.add(signatures[j], predictions[j][0], predictions[j][1],
+                                                   analysis['risk_score'], matches[j] and matches[j].cluster)
+                if cluster is not None:
+                    analysis.setdefault('near_duplicate', {'matched': False, 'cluster': cluster})
+        return analyses
+
+    def _predict(self, texts):
+        """Transformer (prediction, confidence, window_report) per text."""
+        if not self.use_pretrained:
+            return [(None, None, None)] * len(texts)
+        if len(texts) > 1:
+            return self._predict_many(texts)
+        # Single texts go through the micro-batcher to share forward passes
+        if self.long_documents:
+            return [self.get_long_document_prediction(texts[0])]
+        return [(*self.get_transformer_prediction(texts[0]), None)]
+
+    def _predict_many(self, texts):
+        """
+        Run the transformer over all texts, bucketed by token length.
+        
+        Returns (prediction, confidence, window_report) per text. In
+        long-document mode, texts that fit one window share the bucketed
+        batch and longer ones are scored window by window.
+        """
+        if not self.use_pretrained:
+            return [(None, None, None)] * len(texts)
+        
+        try:
+            if not self.long_documents:
+                return [(pred, conf, None) for pred, conf in self.get_transformer_predictions(texts)]
+            
+            results = [None] * len(texts)
+            split = self._split_windows(texts)
+            short = [i for i, windows in enumerate(split) if len(windows) == 1]
+            if short:
+                probabilities = self._score_token_ids([split[i][0][2] for i in short])
+                for i, probs in zip(short, probabilities):
+                    pred = int(probs.argmax())
+                    results[i] = (pred, float(probs[pred]), None)
+            for i, windows in enumerate(split):
+                if len(windows) > 1:
+                    results[i] = self._score_windows(windows)
+            return results
+        except Exception as e:
+            print(f"⚠️ Transformer prediction error: {e}")
+            return [(None, None, None)] * len(texts)
+
+    def _build_analysis(self, linguistic_features, news_relevance, ai_prediction, ai_confidence, url=None,
+                        windows=None, risk_scores=None, cascade_info=None, near_duplicate=None):
+        """Combine AI and rule-based scores into the analysis response."""
+        if ai_prediction is None:
+            ai_confidence = 0.5
         
         # Calculate risk scores from linguistic features
-        risk_scores = self._calculate_risk_scores(linguistic_features, news_relevance)
+        if risk_scores is None:
+            risk_scores = self._calculate_risk_scores(linguistic_features, news_relevance)
         
         # Combine AI and rule-based scores
-        if ai_prediction is not None:
-            # AI prediction: 1 = fake, 0 = real
-            ai_risk_score = ai_prediction * 100 * ai_confidence
-            combined_risk = (ai_risk_score * 0.5 + risk_scores['overall'] * 0.5)
-        else:
-            combined_risk = risk_scores['overall']
+        combined_risk = combine_risk(risk_scores['overall'], ai_prediction, ai_confidence)
+        if near_duplicate is not None and self.near_duplicates.mode == 'reuse':
+            combined_risk = near_duplicate.risk
         
         credibility_score = 100 - combined_risk
         verdict_level, verdict_message = self._get_verdict(combined_risk)
@@ -158,67 +421,52 @@ class AIFakeNewsDetector:
             'risk_indicators': risk_scores['indicators'],
             'news_relevance': news_relevance
         }
+        if windows is not None:
+            analysis['ai_prediction']['windows'] = windows
+        if cascade_info is not None:
+            analysis['cascade'] = cascade_info
+        if near_duplicate is not None:
+            analysis['near_duplicate'] = {
+                'matched': True,
+                'cluster': near_duplicate.cluster,
+                'document': near_duplicate.document,
+                'similarity': round(near_duplicate.similarity, 3),
+                'mode': self.near_duplicates.mode
+            }
         
         return analysis
 
     def _calculate_risk_scores(self, features, news_relevance):
         """Calculate risk scores from linguistic features and news relevance."""
-        indicators = {}
-        
-        # Sensationalism
-        sens_score = min(features['sensational_count'] * 15 + features['exclamation_count'] * 5, 100)
-        indicators['sensationalism'] = {
-            'score': sens_score,
-            'message': f"Sensational language: {features['sensational_count']} instances, {features['exclamation_count']} exclamations"
-        }
-        
-        # Source credibility
-        source_indicators = features['has_quotes'] + features['has_attribution'] + features['has_url']
-        source_score = 80 if source_indicators == 0 else 50 if source_indicators == 1 else 20
-        indicators['sources'] = {
-            'score': source_score,
-            'message': f"Source indicators: {source_indicators}/3 found"
-        }
-        
-        # Emotional manipulation
-        emot_score = min(features['emotional_count'] * 12 + features['caps_ratio'] * 50, 100)
-        indicators['emotional'] = {
-            'score': emot_score,
-            'message': f"Emotional language: {features['emotional_count']} instances, {features['caps_ratio']:.1%} caps"
-        }
-        
-        # Clickbait
-        click_score = min(features['clickbait_count'] * 30, 100)
-        indicators['clickbait'] = {
-            'score': click_score,
-            'message': f"Clickbait patterns: {features['clickbait_count']} detected"
-        }
-        
-        # News relevance check - vague content gets higher risk
-        relevance_score = news_relevance['relevance_score']
-        if relevance_score < 5:  # Very low relevance to current news
-            vague_score = 70  # High risk for vague content
-        elif relevance_score < 15:
-            vague_score = 40  # Medium risk
-        else:
-            vague_score = 10  # Low risk for news-relevant content
-        
-        indicators['news_relevance'] = {
-            'score': vague_score,
-            'message': f"News relevance: {relevance_score:.1f}% - {'Low relevance to current events' if vague_score > 50 else 'Related to current news'}"
-        }
-        
-        # Calculate overall with news relevance factor
-        overall = (sens_score * 0.2 + source_score * 0.25 + 
-                  emot_score * 0.2 + click_score * 0.15 + vague_score * 0.2)
+        return self._score_risk([features], [news_relevance]).result(0)
+
+    def _score_risk(self, linguistic_features, news_relevance):
+        """risk_scoring.RiskScores for feature dicts and news relevance results."""
+        from risk_scoring import score_risk
+        features = [[f[name] for name in FEATURE_NAMES] for f in linguistic_features]
+        return score_risk(features, [r['relevance_score'] for r in news_relevance])
+
+    def score_risk_many(self, texts):
+        """
+        Rule-based risk scores for many texts, without building analyses.
         
-        return {'overall': overall, 'indicators': indicators}
+        Features go straight into a matrix and every score is computed with
+        array operations; indicator messages are only formatted if
+        RiskScores.indicators(i) is called. Use this for bulk jobs that only
+        need numbers (RiskScores.overall, .verdict_levels()).
+        """
+        from risk_scoring import score_risk
+        texts = list(texts)
+        features = self.feature_extractor.extract_many(texts)
+        relevance = [r['relevance_score'] for r in self.news_fetcher.check_news_relevance_many(texts)]
+        return score_risk(features, relevance)
 
     def _get_verdict(self, score):
         """Determine risk level based on score."""
-        if score >= 65:
-            return 'HIGH RISK', 'Strong indicators of potential misinformation or vague content detected'
-        elif score >= 35:
-            return 'MEDIUM RISK', 'Some indicators of potential misinformation or unclear content detected'
-        else:
-            return 'LOW RISK', 'Content appears credible and relevant to current events'
\ No newline at end of file
+        from risk_scoring import verdict
+        return verdict(score)
+
+if __name__ == '__main__':
+    # python -m fake_news_detector score in.jsonl out.jsonl; see batch_scoring.py
+    from batch_scoring import main
+    main()
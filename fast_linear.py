@@ -0,0 +1,120 @@
+"""
+Per-request fast path for the TF-IDF + logistic regression model.
+
+vectorizer.transform() followed by model.predict_proba() builds a SciPy
+sparse matrix and validates its input for a single document, which costs
+far more than the arithmetic. CompiledLinear folds both models into one
+dict from n-gram to (idf, idf * coef) and scores a text in a single pass:
+tokenize, count n-grams, then accumulate the squared TF-IDF norm and the
+weighted dot product together. The result equals scikit-learn's to
+floating-point rounding (well within 1e-9).
+
+    scorer = CompiledLinear.from_sklearn(vectorizer, model)
+    scorer.predict_proba(texts)    # same columns as model.predict_proba
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+
+def make_analyzer(lowercase, token_pattern, ngram_range, stop_words):
+    """Return text -> list of n-grams, as TfidfVectorizer's word analyzer builds them."""
+    pattern = re.compile(token_pattern)
+    stop_words = frozenset(stop_words or ())
+    min_n, max_n = ngram_range
+
+    def analyze(text):
+        if lowercase:
+            text = text.lower()
+        tokens = [token for token in pattern.findall(text) if token not in stop_words]
+        grams = tokens if min_n == 1 else []
+        if max_n >= 2 and min_n <= 2:
+            grams = grams + [f'{first} {second}' for first, second in zip(tokens, tokens[1:])]
+        for n in range(max(3, min_n), max_n + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    return analyze
+
+
+def _sigmoid(x):
+    # Stable for large |x|, like scipy.special.expit
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    e = math.exp(x)
+    return e / (1.0 + e)
+
+
+class CompiledLinear:
+    def __init__(self, weights, intercept, classes, analyzer):
+        """
+        Single-pass scorer for a binary linear model over TF-IDF features.
+
+        Args:
+            weights: Dict from n-gram to (idf, idf * coef)
+            intercept: Model intercept
+            classes: The model's classes_, in predict_proba column order
+            analyzer: Function from text to its list of n-grams
+        """
+        self.weights = weights
+        self.intercept = intercept
+        self.classes_ = np.asarray(classes)
+        self.analyze = analyzer
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, model):
+        """
+        Compile a fitted TfidfVectorizer and binary linear classifier.
+
+        Raises ValueError for settings the fast path does not reproduce
+        (custom analyzers, accent stripping, sublinear tf, norms other than l2).
+        """
+        if not hasattr(vectorizer, 'vocabulary_') or vectorizer.analyzer != 'word' or vectorizer.tokenizer:
+            raise ValueError("Only a fitted TfidfVectorizer with the default word analyzer can be compiled")
+        if vectorizer.strip_accents or vectorizer.preprocessor or vectorizer.sublinear_tf or vectorizer.norm != 'l2':
+            raise ValueError("Compiling supports strip_accents=None, no preprocessor, sublinear_tf=False and norm='l2'")
+        if len(model.classes_) != 2 or not hasattr(model, 'predict_proba'):
+            raise ValueError("Only binary classifiers with predict_proba can be compiled")
+
+        idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(vectorizer.vocabulary_))
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        weights = {term: (float(idf[column]), float(idf[column] * coef[column]))
+                   for term, column in vectorizer.vocabulary_.items()}
+        analyzer = make_analyzer(vectorizer.lowercase, vectorizer.token_pattern, vectorizer.ngram_range,
+                                 vectorizer.get_stop_words())
+        return cls(weights, float(np.ravel(model.intercept_)[0]), model.classes_, analyzer)
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        """Compile a linear_artifact.LinearArtifact into an in-memory dict."""
+        terms = [term.decode('utf-8') for term in artifact.terms.tolist()]
+        idf = artifact.idf.tolist()
+        weighted = (artifact.idf * artifact.coef).tolist()
+        return cls(dict(zip(terms, zip(idf, weighted))), artifact.intercept, artifact.classes_, artifact.analyze)
+
+    def decision(self, text):
+        """Linear decision value for one (preprocessed) text."""
+        weights = self.weights
+        squared = dot = 0.0
+        for gram, count in Counter(self.analyze(text)).items():
+            weight = weights.get(gram)
+            if weight is not None:
+                idf, weighted_coef = weight
+                squared += (count * idf) ** 2
+                dot += count * weighted_coef
+        return self.intercept + (dot / math.sqrt(squared) if squared else 0.0)
+
+    def positive_probability(self, text):
+        """Probability of classes_[1] for one text."""
+        return _sigmoid(self.decision(text))
+
+    def predict_proba(self, texts):
+        """Class probabilities for many texts, columns in classes_ order."""
+        positive = np.fromiter((_sigmoid(self.decision(text)) for text in texts), dtype=np.float64, count=len(texts))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, texts):
+        decisions = np.fromiter((self.decision(text) for text in texts), dtype=np.float64, count=len(texts))
+        return self.classes_[(decisions > 0).astype(int)]
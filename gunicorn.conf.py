@@ -0,0 +1,21 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The master imports app.py with PRELOAD_MODEL=1, so the model is loaded and
+# warmed once and its weights are shared copy-on-write by every worker.
+import os
+
+os.environ.setdefault('PRELOAD_MODEL', '1')
+# Workers share one article store, so the feeds are fetched once per host
+os.environ.setdefault('NEWS_STORE_PATH', 'news_store.db')
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+timeout = 120
+
+
+def post_worker_init(worker):
+    import app
+    app.warm_worker()
+    worker.log.info("Worker %s memory: %s", worker.pid, app.process_memory())
@@ -0,0 +1,235 @@
+"""
+Pluggable CPU inference backends for the transformer classifier.
+
+Backends:
+    pytorch    Eager PyTorch model (the original path)
+    quantized  PyTorch with Linear layers dynamically quantized to int8
+    onnx       ONNX Runtime session over an exported model
+    onnx-int8  ONNX Runtime session over the int8-quantized export
+
+Export an artifact once, then point the detector at it:
+    python inference_backends.py export --output models/distilbert
+    AIFakeNewsDetector(backend='onnx', model_path='models/distilbert')
+"""
+import argparse
+import inspect
+import os
+import numpy as np
+
+DEFAULT_MODEL = 'distilbert-base-uncased'
+ONNX_FILENAME = 'model.onnx'
+ONNX_INT8_FILENAME = 'model.int8.onnx'
+BACKENDS = ('pytorch', 'quantized', 'onnx', 'onnx-int8')
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class TorchBackend:
+    name = 'pytorch'
+
+    def __init__(self, model_path=DEFAULT_MODEL, max_length=512):
+        """
+        Eager PyTorch sequence classifier.
+
+        Args:
+            model_path: Hugging Face model name or a directory written by export
+            max_length: Maximum tokens per input
+        """
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        self._torch = torch
+        self.model_path = model_path
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_path, num_labels=2)
+        self.model.eval()
+
+    def encode(self, texts, padding=True):
+        """Tokenize texts into NumPy input_ids / attention_mask arrays."""
+        return self.tokenizer(
+            texts, return_tensors='np', truncation=True,
+            max_length=self.max_length, padding=padding
+        )
+
+    def tokenize(self, texts):
+        """Tokenize texts without padding; returns one list of token ids per text."""
+        return self.tokenizer(texts, truncation=True, max_length=self.max_length)['input_ids']
+
+    def pad(self, token_ids):
+        """Pad token id lists to their own longest length."""
+        width = max(len(ids) for ids in token_ids)
+        input_ids = np.full((len(token_ids), width), self.tokenizer.pad_token_id or 0, dtype=np.int64)
+        attention_mask = np.zeros((len(token_ids), width), dtype=np.int64)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        return input_ids, attention_mask
+
+    def run(self, input_ids, attention_mask):
+        """Return class probabilities (N x 2) for already-tokenized inputs."""
+        torch = self._torch
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=torch.from_numpy(np.asarray(input_ids, dtype=np.int64)),
+                attention_mask=torch.from_numpy(np.asarray(attention_mask, dtype=np.int64))
+            )
+        return softmax(outputs.logits.numpy().astype(np.float64))
+
+    def predict_proba(self, texts):
+        encoded = self.encode(texts)
+        return self.run(encoded['input_ids'], encoded['attention_mask'])
+
+    def embed(self, texts, max_length=None):
+        """Mean-pooled last hidden states (N x hidden, float32) of the encoder."""
+        torch = self._torch
+        encoded = self.tokenizer(texts, return_tensors='pt', truncation=True, padding=True,
+                                 max_length=max_length or self.max_length)
+        with torch.no_grad():
+            hidden = self.model.base_model(input_ids=encoded['input_ids'],
+                                           attention_mask=encoded['attention_mask']).last_hidden_state
+        mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        return ((hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)).numpy().astype(np.float32)
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = 'quantized'
+
+    def __init__(self, model_path=DEFAULT_MODEL, max_length=512):
+        """PyTorch model with its Linear layers dynamically quantized to int8."""
+        super().__init__(model_path, max_length)
+        self.model = self._torch.quantization.quantize_dynamic(
+            self.model, {self._torch.nn.Linear}, dtype=self._torch.qint8
+        )
+        self.model.eval()
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, model_path, max_length=512, quantized=False, num_threads=None):
+        """
+        ONNX Runtime session over an artifact written by export_artifact().
+
+        Args:
+            model_path: Directory containing model.onnx and the tokenizer
+            max_length: Maximum tokens per input
+            quantized: Load the int8 model.int8.onnx instead of model.onnx
+            num_threads: intra-op threads (defaults to ONNX Runtime's choice)
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        filename = ONNX_INT8_FILENAME if quantized else ONNX_FILENAME
+        path = os.path.join(model_path, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; run `python inference_backends.py export` first")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.name = 'onnx-int8' if quantized else 'onnx'
+        self.model_path = model_path
+        self.max_length = max_length
+        self.model = None
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    encode = TorchBackend.encode
+    tokenize = TorchBackend.tokenize
+    pad = TorchBackend.pad
+
+    def run(self, input_ids, attention_mask):
+        logits = self.session.run(['logits'], {
+            'input_ids': np.asarray(input_ids, dtype=np.int64),
+            'attention_mask': np.asarray(attention_mask, dtype=np.int64)
+        })[0]
+        return softmax(logits.astype(np.float64))
+
+    predict_proba = TorchBackend.predict_proba
+
+
+def load_backend(name='pytorch', model_path=None, max_length=512):
+    """Create an inference backend by name."""
+    if name == 'pytorch':
+        return TorchBackend(model_path or DEFAULT_MODEL, max_length)
+    if name == 'quantized':
+        return QuantizedTorchBackend(model_path or DEFAULT_MODEL, max_length)
+    if name in ('onnx', 'onnx-int8'):
+        if not model_path:
+            raise ValueError(f"The {name} backend needs model_path pointing at an exported artifact")
+        return OnnxBackend(model_path, max_length, quantized=name == 'onnx-int8')
+    raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+
+
+def export_artifact(output_dir, model_name=DEFAULT_MODEL, quantize=True, opset=14):
+    """
+    Write the PyTorch weights, tokenizer and ONNX graph(s) to output_dir.
+
+    The classification head of the base model is freshly initialized, so the
+    PyTorch weights are saved alongside the ONNX graph: every backend loaded
+    from the same directory then scores with identical weights.
+    """
+    import torch
+
+    backend = TorchBackend(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+    backend.model.save_pretrained(output_dir)
+    backend.tokenizer.save_pretrained(output_dir)
+
+    sample = backend.tokenizer(['export sample'], return_tensors='pt')
+    onnx_path = os.path.join(output_dir, ONNX_FILENAME)
+    # Newer torch defaults to the dynamo exporter (needs onnxscript); the
+    # TorchScript exporter handles dynamic batch/sequence axes fine
+    export_options = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        export_options['dynamo'] = False
+    torch.onnx.export(
+        backend.model,
+        (sample['input_ids'], sample['attention_mask']),
+        onnx_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'}
+        },
+        opset_version=opset,
+        **export_options
+    )
+    written = [onnx_path]
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(output_dir, ONNX_INT8_FILENAME)
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        written.append(int8_path)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inference backend tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help='Write optimized model artifacts')
+    export.add_argument('--output', required=True, help='Artifact directory')
+    export.add_argument('--model', default=DEFAULT_MODEL, help='Source Hugging Face model')
+    export.add_argument('--no-quantize', action='store_true', help='Skip the int8 ONNX model')
+    export.add_argument('--opset', type=int, default=14)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        for path in export_artifact(args.output, args.model, not args.no_quantize, args.opset):
+            print(f"✅ Wrote {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Memory-mappable export of the TF-IDF + linear model from train_simple.py.
+
+A pickled TfidfVectorizer rebuilds its vocabulary dict and pulls in
+scikit-learn and SciPy on load, in every worker process. The exported
+artifact is a directory of plain arrays instead:
+
+    meta.json   Tokenizer settings, stop words, classes, intercept, version
+    terms.npy   Vocabulary as a sorted fixed-width UTF-8 string table
+    idf.npy     IDF weight per term, in terms.npy order (float64)
+    coef.npy    Model coefficient per term, in terms.npy order (float64)
+
+LinearArtifact memory-maps the arrays, so loading takes milliseconds, the
+pages are shared by every process that maps the same files, and only
+NumPy is imported. Terms are found by binary search in the string table
+(np.searchsorted), without building a dict.
+
+    python train_simple.py --export   # model.pkl + vectorizer.pkl -> model_artifact/
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from fast_linear import make_analyzer
+
+ARTIFACT_FORMAT = 1
+DEFAULT_ARTIFACT_DIR = 'model_artifact'
+
+
+def export_artifact(vectorizer, model, directory=DEFAULT_ARTIFACT_DIR):
+    """
+    Write a fitted TfidfVectorizer and binary linear classifier as an artifact.
+
+    Args:
+        vectorizer: Fitted TfidfVectorizer with the default word analyzer
+        model: Fitted binary classifier with coef_, intercept_ and classes_
+            (LogisticRegression, or SGDClassifier with log loss)
+        directory: Output directory, created if needed
+
+    Returns the artifact version (a hash of its contents).
+    """
+    if not hasattr(vectorizer, 'vocabulary_') or vectorizer.analyzer != 'word' or vectorizer.tokenizer:
+        raise ValueError("Only a fitted TfidfVectorizer with the default word analyzer can be exported")
+    if vectorizer.strip_accents or vectorizer.preprocessor or vectorizer.sublinear_tf or vectorizer.norm != 'l2':
+        raise ValueError("Export supports strip_accents=None, no preprocessor, sublinear_tf=False and norm='l2'")
+    if len(model.classes_) != 2:
+        raise ValueError("Only binary classifiers can be exported")
+
+    terms = sorted(vectorizer.vocabulary_, key=lambda term: term.encode('utf-8'))
+    columns = np.array([vectorizer.vocabulary_[term] for term in terms])
+    encoded = [term.encode('utf-8') for term in terms]
+    table = np.array(encoded, dtype=f'S{max(map(len, encoded))}')
+    idf = vectorizer.idf_[columns] if vectorizer.use_idf else np.ones(len(terms))
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()[columns]
+
+    digest = hashlib.sha256()
+    for array in (table, idf, coef):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    meta = {
+        'format': ARTIFACT_FORMAT,
+        'lowercase': vectorizer.lowercase,
+        'token_pattern': vectorizer.token_pattern,
+        'ngram_range': list(vectorizer.ngram_range),
+        'stop_words': sorted(vectorizer.get_stop_words() or ()),
+        'classes': [c.item() if hasattr(c, 'item') else c for c in model.classes_],
+        'intercept': float(np.ravel(model.intercept_)[0])
+    }
+    digest.update(json.dumps(meta, sort_keys=True).encode())
+    meta['version'] = digest.hexdigest()[:16]
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'terms.npy'), table)
+    np.save(os.path.join(directory, 'idf.npy'), idf)
+    np.save(os.path.join(directory, 'coef.npy'), coef)
+    # meta.json last: a directory without it is an incomplete export
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta['version']
+
+
+class LinearArtifact:
+    def __init__(self, directory=DEFAULT_ARTIFACT_DIR, mmap=True):
+        """
+        Score texts with an exported artifact.
+
+        Args:
+            directory: Output of export_artifact()
+            mmap: Map the arrays read-only instead of reading them into memory
+        """
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['format'] != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported artifact format {meta['format']} in {directory}")
+
+        mode = 'r' if mmap else None
+        self.terms = np.load(os.path.join(directory, 'terms.npy'), mmap_mode=mode)
+        self.idf = np.load(os.path.join(directory, 'idf.npy'), mmap_mode=mode)
+        self.coef = np.load(os.path.join(directory, 'coef.npy'), mmap_mode=mode)
+
+        self.directory = directory
+        self.version = meta['version']
+        self.classes_ = np.array(meta['classes'])
+        self.intercept = meta['intercept']
+        self.analyze = make_analyzer(meta['lowercase'], meta['token_pattern'], meta['ngram_range'], meta['stop_words'])
+        self.term_bytes = self.terms.dtype.itemsize
+
+    def lookup(self, grams):
+        """Term indices of the grams present in the vocabulary (repeats kept)."""
+        # Longer strings cannot be terms, and would be truncated by the dtype
+        encoded = [gram.encode('utf-8') for gram in grams]
+        encoded = np.array([gram for gram in encoded if len(gram) <= self.term_bytes], dtype=self.terms.dtype)
+        if not len(encoded):
+            return np.empty(0, dtype=np.intp)
+        positions = np.searchsorted(self.terms, encoded)
+        positions[positions == len(self.terms)] = 0
+        return positions[self.terms[positions] == encoded]
+
+    def decision_function(self, texts):
+        """Linear decision value for each text (already preprocessed)."""
+        scores = np.empty(len(texts))
+        for i, text in enumerate(texts):
+            terms, counts = np.unique(self.lookup(self.analyze(text)), return_counts=True)
+            weights = counts * self.idf[terms]
+            norm = np.sqrt(weights @ weights)
+            scores[i] = self.intercept + (weights @ self.coef[terms] / norm if norm else 0.0)
+        return scores
+
+    def predict_proba(self, texts):
+        """Class probabilities, columns in classes_ order, like LogisticRegression."""
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(texts)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, texts):
+        return self.classes_[(self.decision_function(texts) > 0).astype(int)]
@@ -1,9 +1,16 @@
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-import re
+from typing import List
+from starlette.requests import ClientDisconnect
+import asyncio
+import json
+from result_cache import ResultCache
+from rule_engine import build_result, build_results, get_engine
+from bounded_executor import BoundedExecutor
+from batching import QueueFullError
 
 app = FastAPI()
 
@@ -17,36 +24,30 @@ class AnalyzeRequest(BaseModel):
     text: str
     url: str = ""
 
-def analyze_text_simple(text):
-    """Simple rule-based analysis for demo purposes"""
-    text_lower = text.lower()
-    
-    # Simple fake news indicators
-    fake_indicators = [
-        'breaking', 'shocking', 'you won\'t believe', 'doctors hate',
-        'one weird trick', 'secret', 'exposed', 'government doesn\'t want',
-        'share before', 'delete', 'urgent', 'must read'
-    ]
-    
-    real_indicators = [
-        'reuters', 'associated press', 'ap news', 'bbc', 'cnn',
-        'according to', 'study shows', 'research', 'university',
-        'published', 'peer-reviewed'
-    ]
-    
-    fake_score = sum(1 for indicator in fake_indicators if indicator in text_lower)
-    real_score = sum(1 for indicator in real_indicators if indicator in text_lower)
-    
-    # Calculate scores
-    total_indicators = max(1, fake_score + real_score)
-    fake_probability = min(90, max(10, (fake_score / total_indicators) * 100 + 20))
-    real_probability = 100 - fake_probability
-    
-    return {
-        'fake_probability': fake_probability,
-        'real_probability': real_probability,
-        'prediction': 0 if fake_probability > real_probability else 1
-    }
+class BatchAnalyzeRequest(BaseModel):
+    items: List[AnalyzeRequest]
+
+# Upper bound on texts accepted by /analyze/batch
+MAX_BATCH_ITEMS = 100
+
+# Scoring runs in a bounded pool so a large request cannot block the event
+# loop; see bounded_executor.py for the ANALYZE_* settings
+analysis_executor = BoundedExecutor.from_env()
+
+async def run_analysis(fn, *args):
+    """Run blocking scoring in the pool; overload becomes 503 and slowness 504"""
+    try:
+        return await analysis_executor.run(fn, *args)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={'Retry-After': str(analysis_executor.retry_after)})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Analysis timed out after {analysis_executor.timeout:g}s")
+
+# Bump when the scoring in rule_engine changes; lexicon edits are tracked by
+# the engine's version, which is passed as the cache generation
+RULES_VERSION = 'rules-v2'
+result_cache = ResultCache.from_env(RULES_VERSION)
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -60,49 +61,147 @@ async def analyze(request: AnalyzeRequest):
         if not text:
             raise HTTPException(status_code=400, detail="No text provided for analysis")
         
-        # Simple analysis
-        analysis = analyze_text_simple(text)
-        prediction = analysis['prediction']
-        fake_prob = analysis['fake_probability']
-        real_prob = analysis['real_probability']
-        
-        # Create response matching the expected format
-        result = {
-            'verdict_level': 'HIGH RISK' if prediction == 0 else 'LOW RISK',
-            'verdict_message': 'This content appears to be fake news' if prediction == 0 else 'This content appears to be legitimate news',
-            'risk_score': int(fake_prob),
-            'credibility_score': int(real_prob),
-            'ai_prediction': {
-                'available': True,
-                'prediction': 'Likely Fake' if prediction == 0 else 'Likely Real',
-                'confidence': int(max(fake_prob, real_prob))
-            },
-            'risk_indicators': {
-                'Content Analysis': {
-                    'score': int(fake_prob),
-                    'message': f'Rule-based analysis suggests this is {"fake" if prediction == 0 else "real"} news'
-                }
-            },
-            'linguistic_features': {
-                'word_count': len(text.split()),
-                'sentence_count': text.count('.') + text.count('!') + text.count('?'),
-                'avg_sentence_length': len(text.split()) / max(1, text.count('.') + text.count('!') + text.count('?')),
-                'caps_ratio': sum(1 for c in text if c.isupper()) / max(1, len(text)),
-                'exclamation_count': text.count('!'),
-                'question_count': text.count('?')
-            }
-        }
+        generation = get_engine().version
+        # The lookup runs in the pool too: with RESULT_CACHE_PATH it reads
+        # and writes SQLite, which must not block the event loop
+        result = await run_analysis(result_cache.get_or_compute, text, lambda: build_result(text), generation)
         
         return result
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items provided for analysis")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    
+    # Analyze the batch against one lexicon snapshot, reporting errors per item
+    results = await run_analysis(build_results, [item.text.strip() for item in request.items])
+    
+    return {'results': results}
+
+# /analyze/stream scores records this many at a time; a line longer than
+# MAX_STREAM_LINE_BYTES is reported as an error without being buffered
+STREAM_BATCH_SIZE = 64
+MAX_STREAM_LINE_BYTES = 1 << 20
+
+def parse_stream_record(line):
+    """Parse one NDJSON line into (record, error)"""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+    if not isinstance(record, dict):
+        return None, "Each line must be a JSON object"
+    if not isinstance(record.get('text'), str):
+        return None, "Missing 'text' field"
+    return record, None
+
+async def ndjson_records(chunks, max_line_bytes=MAX_STREAM_LINE_BYTES):
+    """Yield (line_number, record, error) for each non-blank line of an NDJSON byte stream"""
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line_number += 1
+            line = bytes(buffer[start:end])
+            start = end + 1
+            if oversized:
+                oversized = False
+                yield line_number, None, f"Line exceeds {max_line_bytes} bytes"
+            elif line.strip():
+                yield (line_number,) + parse_stream_record(line)
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            # Drop the rest of this line as it arrives
+            oversized = True
+            buffer.clear()
+    if oversized or buffer.strip():
+        line_number += 1
+        if oversized:
+            yield line_number, None, f"Line exceeds {max_line_bytes} bytes"
+        else:
+            yield (line_number,) + parse_stream_record(bytes(buffer))
+
+async def score_stream_batch(batch):
+    """Score parsed records and render them, with parse errors in place, as NDJSON"""
+    texts = [record['text'].strip() for _, record, error in batch if error is None]
+    try:
+        while True:
+            try:
+                scored = await analysis_executor.run(build_results, texts) if texts else []
+                break
+            except QueueFullError:
+                # Mid-stream there is no status code to send, so wait for a slot
+                await asyncio.sleep(0.05)
+    except asyncio.TimeoutError:
+        scored = [{'error': f"Analysis timed out after {analysis_executor.timeout:g}s"}] * len(texts)
+    except Exception as e:
+        scored = [{'error': str(e)}] * len(texts)
+
+    results = iter(scored)
+    lines = []
+    for line_number, record, error in batch:
+        output = {'line': line_number}
+        if record is not None and 'id' in record:
+            output['id'] = record['id']
+        output.update(next(results) if error is None else {'error': error})
+        lines.append(json.dumps(output) + '\n')
+    return ''.join(lines).encode()
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse whose iterator consumes the request body itself"""
+
+    async def __call__(self, scope, receive, send):
+        # The base class also reads receive() to watch for a disconnect,
+        # which would take body chunks away from the iterator. A disconnect
+        # still reaches the iterator as ClientDisconnect.
+        await self.stream_response(send)
+
+async def stream_results(chunks):
+    batch = []
+    try:
+        async for entry in ndjson_records(chunks):
+            batch.append(entry)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield await score_stream_batch(batch)
+                batch = []
+        if batch:
+            yield await score_stream_batch(batch)
+    except ClientDisconnect:
+        return
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: Request):
+    """
+    Score newline-delimited JSON records ({"text": ..., "id": ...}) as they arrive.
+
+    Results stream back as NDJSON in input order, one line per record, with
+    the input line number and any `id`. Malformed records get an `error`
+    line instead of ending the stream. The body is read only as fast as
+    results are sent, so clients should read the response while uploading.
+    """
+    return RequestStreamingResponse(stream_results(request.stream()), media_type='application/x-ndjson')
+
 @app.get("/health")
 async def health_check():
     return {
         'status': 'healthy',
-        'ai_model_available': True
+        'ai_model_available': True,
+        'result_cache': result_cache.get_stats(),
+        'rules': get_engine().get_stats(),
+        'executor': analysis_executor.get_stats()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,429 @@
+"""
+Near-duplicate index for reusing verdicts on lightly edited copies.
+
+Viral stories arrive as many syndicated copies that differ in a few words,
+so an exact-hash cache (result_cache.py) misses them. NearDuplicateIndex
+keeps a MinHash signature of every scored text:
+
+    words    -> overlapping `shingle_size`-word shingles, hashed by
+                combining the CRC32 of each word
+    shingles -> `num_perm` minimum hashes under random multiply-shift
+                permutations
+
+The fraction of equal signature entries estimates the Jaccard similarity
+of two texts' shingle sets. Signatures are split into bands for locality
+sensitive hashing: texts sharing any band are candidates, and a candidate
+within `threshold` similarity is a match. Band keys live in one sorted
+uint32 array per band (np.searchsorted), plus a small dict of recent
+additions merged in periodically, so memory stays compact and a lookup
+costs a few binary searches with millions of documents indexed. Merges
+sort outside the lock and swap the arrays in, so lookups never wait on one.
+
+Each document keeps its cluster (the id of the first document of its
+family) and the model verdict it was given, so AIFakeNewsDetector can
+skip the transformer for a match.
+"""
+import json
+import os
+import re
+import threading
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+_SHIFT = np.uint64(32)
+_WORD = re.compile(r'\w+')
+
+# Bump when signatures or band keys are computed differently
+INDEX_FORMAT = 1
+
+NEAR_DUPLICATE_MODES = ('blend', 'reuse')
+
+# Per-document arrays, as saved
+_ARRAYS = ('signatures', 'clusters', 'predictions', 'confidences', 'risks')
+
+NearDuplicate = namedtuple('NearDuplicate', 'document cluster similarity ai_prediction ai_confidence risk')
+
+
+def choose_bands(num_perm, threshold, min_recall=0.95):
+    """
+    (bands, rows) splitting of a signature for LSH.
+
+    Picks the most rows per band (fewest false candidates) for which a pair
+    exactly at `threshold` similarity still becomes a candidate with
+    probability min_recall.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= min_recall:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold=0.8, mode='blend', model_version='', path=None, num_perm=64,
+                 shingle_size=3, min_words=20, max_candidates=64, merge_every=65536, seed=1):
+        """
+        In-memory MinHash LSH index of scored texts.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of word shingles
+                for two texts to be near-duplicates
+            mode: 'blend' reuses the matched model verdict and combines it
+                with the new text's own rule scores; 'reuse' also reuses
+                the matched risk score
+            model_version: Identifies the model whose verdicts are stored; a
+                saved index for another version is not loaded
+            path: Optional file loaded at startup and written by save(); with
+                several processes, save(merge=True) adds each one's documents
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+            min_words: Shorter texts are neither indexed nor matched
+            max_candidates: Candidates checked per band
+            merge_every: Recent additions kept in dicts before being merged
+                into the sorted band arrays
+            seed: Seed of the hash permutations (part of the saved format)
+        """
+        if mode not in NEAR_DUPLICATE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(NEAR_DUPLICATE_MODES)}, got {mode!r}")
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.mode = mode
+        self.model_version = str(model_version)
+        self.path = path
+        self.num_perm = num_perm
+        self.shingle_size = max(1, shingle_size)
+        self.min_words = max(min_words, self.shingle_size)
+        self.max_candidates = max_candidates
+        self.merge_every = max(1, merge_every)
+        self.seed = seed
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        odd = lambda count: rng.integers(1, 1 << 63, count, dtype=np.uint64) | np.uint64(1)
+        self._shingle_multipliers = odd(self.shingle_size)
+        self._a = odd(num_perm)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._band_multipliers = odd(self.rows)
+
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._reset(0)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @classmethod
+    def from_env(cls, model_version):
+        """
+        Index configured by NEAR_DUPLICATES=1, NEAR_DUP_THRESHOLD, NEAR_DUP_MODE
+        and NEAR_DUP_PATH, or None when near-duplicate lookup is disabled.
+        """
+        if os.environ.get('NEAR_DUPLICATES') != '1':
+            return None
+        return cls(
+            threshold=float(os.environ.get('NEAR_DUP_THRESHOLD', 0.8)),
+            mode=os.environ.get('NEAR_DUP_MODE', 'blend'),
+            model_version=model_version,
+            path=os.environ.get('NEAR_DUP_PATH') or None
+        )
+
+    def _reset(self, capacity):
+        # A merge in progress for the old contents is discarded
+        self._generation += 1
+        self.size = 0
+        # Documents that are also in the file at self.path (loaded or saved)
+        self._loaded = 0
+        self.clusters_created = 0
+        self.signatures = np.empty((capacity, self.num_perm), dtype=np.uint32)
+        self.clusters = np.empty(capacity, dtype=np.uint32)
+        # -1 when the document was scored without a model prediction
+        self.predictions = np.empty(capacity, dtype=np.int8)
+        self.confidences = np.empty(capacity, dtype=np.float32)
+        self.risks = np.empty(capacity, dtype=np.float32)
+        self._sorted_keys = np.empty((self.bands, 0), dtype=np.uint32)
+        self._sorted_ids = np.empty((self.bands, 0), dtype=np.uint32)
+        self._merged = 0
+        self._pending = [{} for _ in range(self.bands)]
+        # Pending dicts of a merge in progress, searched until it completes
+        self._merging = [{} for _ in range(self.bands)]
+
+    def _reserve(self, count):
+        needed = self.size + count
+        if needed <= len(self.clusters):
+            return
+        capacity = max(needed, 2 * len(self.clusters), 1024)
+        for name in _ARRAYS:
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def signature(self, text):
+        """MinHash signature (uint32, num_perm) of text, or None if it is too short."""
+        words = _WORD.findall(text.lower())
+        if len(words) < self.min_words:
+            return None
+        word_hashes = np.fromiter((zlib.crc32(word.encode('utf-8', 'surrogatepass')) for word in words),
+                                  dtype=np.uint64, count=len(words))
+        # Repeated shingles do not change a minimum, so they are not removed;
+        # all uint64 arithmetic below wraps, and the high 32 bits are kept
+        count = len(words) - self.shingle_size + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for offset, multiplier in enumerate(self._shingle_multipliers):
+            shingles += word_hashes[offset:offset + count] * multiplier
+        shingles >>= _SHIFT
+        permuted = np.multiply.outer(shingles, self._a)
+        permuted += self._b
+        permuted >>= _SHIFT
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signatures):
+        # (n, num_perm) -> (n, bands) uint32: multiplicative hash, keeping the
+        # well-mixed high bits; uint64 arithmetic wraps, which is fine here
+        banded = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return ((banded * self._band_multipliers).sum(axis=2) >> _SHIFT).astype(np.uint32)
+
+    def query(self, signature):
+        """The most similar indexed document within the threshold, as a NearDuplicate, or None."""
+        if signature is None:
+            return None
+        keys = self._band_keys(signature[None])[0]
+        with self._lock:
+            candidates = set()
+            for band in range(self.bands):
+                key = keys[band]
+                sorted_keys = self._sorted_keys[band]
+                start = np.searchsorted(sorted_keys, key, side='left')
+                stop = min(np.searchsorted(sorted_keys, key, side='right'), start + self.max_candidates)
+                candidates.update(self._sorted_ids[band, start:stop].tolist())
+                candidates.update(self._merging[band].get(int(key), ())[:self.max_candidates])
+                candidates.update(self._pending[band].get(int(key), ())[:self.max_candidates])
+
+            if candidates:
+                documents = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+                similarities = (self.signatures[documents] == signature).mean(axis=1)
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    document = int(documents[best])
+                    prediction = int(self.predictions[document])
+                    return NearDuplicate(
+                        document=document,
+                        cluster=int(self.clusters[document]),
+                        similarity=float(similarities[best]),
+                        ai_prediction=None if prediction < 0 else prediction,
+                        ai_confidence=None if prediction < 0 else round(float(self.confidences[document]), 6),
+                        risk=round(float(self.risks[document]), 4)
+                    )
+            self.misses += 1
+            return None
+
+    def lookup(self, text):
+        """query() for a text."""
+        return self.query(self.signature(text))
+
+    def add(self, signature, ai_prediction, ai_confidence, risk, cluster=None):
+        """
+        Index a scored text.
+
+        Args:
+            signature: Result of signature(); None is ignored
+            ai_prediction: Model prediction (0 real, 1 fake) or None
+            ai_confidence: Confidence of ai_prediction
+            risk: Final risk score of the analysis
+            cluster: Cluster of the document it matched, if any
+
+        Returns the document's cluster id, or None if it was not indexed.
+        """
+        if signature is None:
+            return None
+        keys = self._band_keys(signature[None])[0].tolist()
+        with self._lock:
+            cluster = self._insert(signature, keys, -1 if ai_prediction is None else ai_prediction,
+                                   ai_confidence if ai_prediction is not None else 0, risk, cluster)
+            merge = self.size - self._merged >= self.merge_every and not self._merge_lock.locked()
+        if merge:
+            self._merge()
+        return cluster
+
+    def _insert(self, signature, keys, prediction, confidence, risk, cluster):
+        # Append one document and its band keys to the pending dicts
+        self._reserve(1)
+        document = self.size
+        if cluster is None:
+            cluster = document
+            self.clusters_created += 1
+        self.signatures[document] = signature
+        self.clusters[document] = cluster
+        self.predictions[document] = prediction
+        self.confidences[document] = confidence
+        self.risks[document] = risk
+        self.size += 1
+        for band, key in enumerate(keys):
+            self._pending[band].setdefault(key, []).append(document)
+        return cluster
+
+    def add_signatures(self, signatures, predictions=None, confidences=None, risks=None):
+        """
+        Index many signatures at once, each as its own cluster.
+
+        Args:
+            signatures: (n, num_perm) uint32 matrix
+            predictions: n model predictions, -1 for none (default -1)
+            confidences: n confidences (default 0)
+            risks: n risk scores (default 0)
+        """
+        signatures = np.asarray(signatures, dtype=np.uint32).reshape(-1, self.num_perm)
+        count = len(signatures)
+        with self._lock:
+            self._reserve(count)
+            start, stop = self.size, self.size + count
+            self.signatures[start:stop] = signatures
+            self.clusters[start:stop] = np.arange(start, stop)
+            self.predictions[start:stop] = -1 if predictions is None else predictions
+            self.confidences[start:stop] = 0 if confidences is None else confidences
+            self.risks[start:stop] = 0 if risks is None else risks
+            self.size = stop
+            self.clusters_created += count
+        self._merge()
+
+    def _merge(self):
+        # Fold documents added since the last merge into the sorted band
+        # arrays. Sorting takes time proportional to the whole index, so it
+        # runs outside self._lock on a snapshot, and lookups meanwhile find
+        # the documents being merged in self._merging
+        with self._merge_lock:
+            with self._lock:
+                if self._merged == self.size:
+                    return
+                start, stop, generation = self._merged, self.size, self._generation
+                # Rows below self.size never change; _reserve() copies instead
+                signatures = self.signatures[start:stop]
+                sorted_keys, sorted_ids = self._sorted_keys, self._sorted_ids
+                self._merging, self._pending = self._pending, [{} for _ in range(self.bands)]
+            ids = np.arange(start, stop, dtype=np.uint32)
+            keys = np.concatenate([sorted_keys, self._band_keys(signatures).T], axis=1)
+            ids = np.concatenate([sorted_ids, np.broadcast_to(ids, (self.bands, len(ids)))], axis=1)
+            order = np.argsort(keys, axis=1, kind='stable')
+            keys = np.take_along_axis(keys, order, axis=1)
+            ids = np.take_along_axis(ids, order, axis=1)
+            with self._lock:
+                if self._generation == generation:
+                    self._sorted_keys, self._sorted_ids = keys, ids
+                    self._merged = stop
+                    self._merging = [{} for _ in range(self.bands)]
+
+    def _params(self):
+        return {
+            'format': INDEX_FORMAT,
+            'model_version': self.model_version,
+            'num_perm': self.num_perm,
+            'shingle_size': self.shingle_size,
+            'seed': self.seed
+        }
+
+    def save(self, path=None, merge=False):
+        """
+        Write the index to path (default: the configured path), atomically.
+
+        Args:
+            path: Destination file
+            merge: Append the documents added since this index was loaded (or
+                last saved) to what the file holds now, instead of replacing
+                it, so processes sharing the file keep each other's documents;
+                this index then continues from the merged contents
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save the near-duplicate index to")
+        if not merge:
+            with self._lock:
+                self._write(path, {name: getattr(self, name)[:self.size] for name in _ARRAYS})
+                self._loaded = self.size
+            return
+
+        import fcntl
+        with open(f"{path}.lock", 'w') as lock_file:
+            # One process at a time reads, extends and replaces the file
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            saved = self._read(path) if os.path.exists(path) else None
+            with self._lock:
+                if saved is None:
+                    self._write(path, {name: getattr(self, name)[:self.size] for name in _ARRAYS})
+                    self._loaded = self.size
+                    return
+                combined = self._combine(saved)
+                self._write(path, combined)
+                self._adopt(combined)
+            self._merge()
+
+    def _combine(self, saved):
+        # This index's documents after the first self._loaded (which the file
+        # already holds) appended to the saved arrays, with cluster ids moved
+        base = self._loaded
+        if len(saved['clusters']) < base or not np.array_equal(saved['signatures'][:base], self.signatures[:base]):
+            # The file was replaced by an unrelated index: append everything
+            base = 0
+        offset = len(saved['clusters']) - base
+        combined = {name: np.concatenate([saved[name], getattr(self, name)[base:self.size]]) for name in _ARRAYS}
+        clusters = self.clusters[base:self.size].astype(np.int64)
+        combined['clusters'][len(saved['clusters']):] = np.where(clusters >= base, clusters + offset, clusters)
+        return combined
+
+    def _adopt(self, arrays):
+        # Continue from the merged file contents, so the next merged save
+        # appends only documents added after this one. Callers _merge() once
+        # the lock is released; until then the documents are not found
+        self._reset(len(arrays['clusters']))
+        self.size = self._loaded = len(arrays['clusters'])
+        for name in _ARRAYS:
+            getattr(self, name)[:] = arrays[name]
+        self.clusters_created = int((self.clusters == np.arange(self.size)).sum())
+
+    def _write(self, path, arrays):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            np.savez(f, params=np.array(json.dumps(self._params())), **arrays)
+        os.replace(temporary, path)
+
+    def _read(self, path):
+        # The saved arrays, or None if the file was written for other settings
+        with np.load(path) as data:
+            if json.loads(str(data['params'])) != self._params():
+                print(f"⚠️ Ignoring near-duplicate index {path}: written for another model or settings")
+                return None
+            return {name: data[name] for name in _ARRAYS}
+
+    def load(self, path):
+        """Replace the contents with a saved index; returns False if it was written for other settings."""
+        saved = self._read(path)
+        if saved is None:
+            return False
+        with self._lock:
+            self._adopt(saved)
+        self._merge()
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'documents': self.size,
+                'clusters': self.clusters_created,
+                'threshold': self.threshold,
+                'mode': self.mode,
+                'bands': self.bands,
+                'rows_per_band': self.rows,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'path': self.path
+            }
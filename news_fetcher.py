@@ -1,12 +1,138 @@
-import requests
-import feedparser
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+import hashlib
+import math
+import os
 import re
+import sys
+import threading
+from types import MappingProxyType
 from urllib.parse import urlparse
 import time
+from news_store import NewsStore
+
+# Meaningful words: 3+ letters
+WORD_RE = re.compile(r'\b[a-z]{3,}\b')
+
+COMMON_WORDS = frozenset({'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'man', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'})
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_timeout=300):
+        """
+        Stop calling a failing source for a while.
+        
+        Args:
+            failure_threshold: Consecutive failures before the circuit opens
+            reset_timeout: Seconds to wait before allowing a trial request
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    def allow_request(self):
+        """Closed and half-open circuits let a request through"""
+        return self.state != 'open'
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            # A failed half-open trial re-opens the circuit for another period
+            self.opened_at = time.monotonic()
+    
+    def to_dict(self):
+        return {'state': self.state, 'failures': self.failures}
+
+class KeywordIndex:
+    """
+    Immutable keyword index over one snapshot of the news cache.
+    
+    Built once per feed refresh and swapped in as a whole, so relevance
+    checks only tokenize the input and look words up.
+    """
+    __slots__ = ('keywords', 'doc_freq', 'num_docs', 'generation', 'fingerprint', '_max_idf')
+    
+    def __init__(self, doc_freq, num_docs, generation=0):
+        self.doc_freq = MappingProxyType(doc_freq)
+        self.keywords = frozenset(doc_freq)
+        self.num_docs = num_docs
+        self.generation = generation
+        # Content hash: equal across processes and restarts for the same news,
+        # so it can tag cached results that depend on relevance
+        content = repr((num_docs, sorted(doc_freq.items()))).encode()
+        self.fingerprint = hashlib.sha1(content).hexdigest()[:16]
+        self._max_idf = self.idf(None)
+    
+    @classmethod
+    def build(cls, articles, generation=0):
+        doc_freq = {}
+        for article in articles:
+            text = f"{article['title']} {article['summary']}".lower()
+            for word in set(WORD_RE.findall(text)) - COMMON_WORDS:
+                # Interned so every snapshot shares one copy of each keyword
+                word = sys.intern(word)
+                doc_freq[word] = doc_freq.get(word, 0) + 1
+        return cls(doc_freq, len(articles), generation)
+    
+    def idf(self, word):
+        """Smoothed inverse document frequency; unseen words get the maximum"""
+        return math.log((1 + self.num_docs) / (1 + self.doc_freq.get(word, 0))) + 1
+    
+    def score(self, text):
+        """Return (text words, matching keywords, IDF-weighted relevance 0-100)"""
+        text_words = set(WORD_RE.findall(text.lower()))
+        matches = text_words & self.keywords
+        if not text_words:
+            return text_words, matches, 0.0
+        
+        matched_weight = sum(self.idf(word) for word in matches)
+        total_weight = matched_weight + (len(text_words) - len(matches)) * self._max_idf
+        return text_words, matches, matched_weight / total_weight * 100
 
 class NewsFetcher:
-    def __init__(self):
+    def __init__(self, fetch_timeout=5, max_workers=5, entries_per_source=10,
+                 failure_threshold=3, reset_timeout=300, background_refresh=True,
+                 refresh_ahead=timedelta(minutes=5), idf_weighting=False, store=None,
+                 relevance_mode=None, semantic_top_k=3, related_articles=3,
+                 semantic_calibration=None):
+        """
+        Fetch and cache current headlines from several RSS feeds.
+        
+        Args:
+            fetch_timeout: Default per-feed timeout in seconds
+            max_workers: Number of feeds fetched in parallel
+            entries_per_source: Number of entries read from each feed per fetch
+            failure_threshold: Consecutive failures before a feed is skipped
+            reset_timeout: Seconds before a skipped feed is retried
+            background_refresh: Renew the cache from a background thread before it expires
+            refresh_ahead: How long before expiry the background refresh runs
+            idf_weighting: Report the IDF-weighted score as relevance_score so
+                common news terms count less than distinctive ones
+            store: news_store.NewsStore holding the articles (defaults to
+                NewsStore.from_env(), i.e. NEWS_STORE_PATH or in-memory)
+            relevance_mode: 'keywords' (word overlap) or 'semantic' (embedding
+                similarity to the current articles, see semantic_relevance.py);
+                defaults to RELEVANCE_MODE or 'keywords'
+            semantic_top_k: Closest articles reported in semantic mode
+            semantic_calibration: Cut points file from `python
+                semantic_relevance.py calibrate`, required in semantic mode;
+                defaults to SEMANTIC_CALIBRATION
+            related_articles: Stored articles matching the text's news
+                keywords (FTS5, bm25 ranked) reported in keyword mode; 0
+                disables the lookup
+        """
         self.news_sources = {
             'reuters': 'http://feeds.reuters.com/reuters/topNews',
             'bbc': 'http://feeds.bbci.co.uk/news/rss.xml',
@@ -14,63 +140,353 @@ class NewsFetcher:
             'npr': 'https://feeds.npr.org/1001/rss.xml',
             'cnn': 'http://rss.cnn.com/rss/edition.rss'
         }
+        # Per-source overrides of fetch_timeout
+        self.feed_timeouts = {}
+        self.fetch_timeout = fetch_timeout
+        self.max_workers = max_workers
+        self.entries_per_source = entries_per_source
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        # Articles live in the store; cached_news is the snapshot the
+        # current keyword index was built from
+        self.store = store if store is not None else NewsStore.from_env()
         self.cached_news = []
+        self.keyword_index = KeywordIndex({}, 0)
+        self.generation = 0
+        self.idf_weighting = idf_weighting
+        self.related_articles = related_articles
+        self.relevance_mode = relevance_mode or os.environ.get('RELEVANCE_MODE', 'keywords')
+        self.semantic = None
+        if self.relevance_mode == 'semantic':
+            from semantic_relevance import SemanticCalibration, SemanticIndex, TfidfSvdEncoder
+            semantic_calibration = semantic_calibration or os.environ.get('SEMANTIC_CALIBRATION')
+            if not semantic_calibration:
+                raise ValueError("relevance_mode 'semantic' needs a calibration file "
+                                 "(semantic_calibration or SEMANTIC_CALIBRATION)")
+            calibration = SemanticCalibration.from_file(semantic_calibration)
+            if not calibration.cuts:
+                raise ValueError(f"{semantic_calibration} has no calibrated encoder")
+            # TF-IDF/SVD until the detector provides its transformer encoder
+            self.semantic = SemanticIndex(TfidfSvdEncoder(), top_k=semantic_top_k, calibration=calibration)
+        elif self.relevance_mode != 'keywords':
+            raise ValueError(f"relevance_mode must be 'keywords' or 'semantic', got {self.relevance_mode!r}")
         self.last_fetch = None
         self.cache_duration = timedelta(hours=1)
+        
+        # Stale-while-revalidate: one refresh in flight at a time, shared by
+        # every caller, while readers keep getting the last good snapshot
+        self.background_refresh = background_refresh
+        self.refresh_ahead = refresh_ahead
+        self.last_refresh_attempt = None
+        self.last_refresh_error = None
+        self._refresh_lock = threading.Lock()
+        self._inflight = None
+        self._refresher = None
+        self._stop_refresher = threading.Event()
+        
+        # Per-source validators and last good entries for conditional GETs
+        self.feed_state = {}
+        self.breakers = {}
+        
+        # Pooled keep-alive connections shared by the fetch threads; imported
+        # here so the index and breaker classes stay cheap to import
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.news_sources), pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'fake-news-detector/1.0 (+feed reader)'
     
-    def fetch_current_news(self):
-        """Fetch current news from multiple sources"""
-        if self.last_fetch and datetime.now() - self.last_fetch < self.cache_duration:
-            return self.cached_news
+    def _get_breaker(self, source):
+        if source not in self.breakers:
+            self.breakers[source] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[source]
+    
+    def _fetch_feed(self, source, url):
+        """Fetch one feed, reusing the previous entries when it is unchanged"""
+        if source not in self.feed_state:
+            # Validators are shared through the store, so a 304 also holds
+            # for whichever process fetched the feed last
+            etag, last_modified = self.store.get_feed_state(source)
+            self.feed_state[source] = {'etag': etag, 'last_modified': last_modified, 'articles': []}
+        state = self.feed_state[source]
+        breaker = self._get_breaker(source)
+        if not breaker.allow_request():
+            return state['articles']
+        
+        headers = {}
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['last_modified']:
+            headers['If-Modified-Since'] = state['last_modified']
+        
+        state['last_attempt'] = datetime.now()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.feed_timeouts.get(source, self.fetch_timeout))
+            if response.status_code == 304:
+                self.store.touch_source(source)
+                breaker.record_success()
+                state['last_success'] = datetime.now()
+                state['last_error'] = None
+                return state['articles']
+            response.raise_for_status()
+            
+            import feedparser
+            feed = feedparser.parse(response.content)
+            if feed.bozo and not feed.entries:
+                raise ValueError(f"Unparseable feed: {feed.get('bozo_exception')}")
+            
+            articles = []
+            for entry in feed.entries[:self.entries_per_source]:
+                article = {
+                    'title': getattr(entry, 'title', ''),
+                    'summary': getattr(entry, 'summary', ''),
+                    'source': source,
+                    'published': getattr(entry, 'published', ''),
+                    'link': getattr(entry, 'link', ''),
+                    'guid': getattr(entry, 'id', '')
+                }
+                articles.append(article)
+            
+            self.store.upsert(articles)
+            state['etag'] = response.headers.get('ETag')
+            state['last_modified'] = response.headers.get('Last-Modified')
+            self.store.set_feed_state(source, state['etag'], state['last_modified'])
+            state['articles'] = articles
+            state['last_success'] = datetime.now()
+            state['last_error'] = None
+            breaker.record_success()
+            return articles
+        except Exception as e:
+            print(f"Error fetching from {source}: {e}")
+            state['last_error'] = str(e)
+            breaker.record_failure()
+            return state['articles']
+    
+    def _fetch_all(self):
+        """Fetch every feed in parallel and return the combined entries"""
+        sources = list(self.news_sources.items())
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(sources)))) as pool:
+            results = list(pool.map(lambda item: self._fetch_feed(*item), sources))
         
         all_articles = []
+        for articles in results:
+            all_articles.extend(articles)
+        return all_articles
+    
+    def _update_store(self):
+        """Fetch the feeds into the store, unless another process on this host just did"""
+        fresh_for = (self.cache_duration - self.refresh_ahead).total_seconds()
+        last_refresh = self.store.last_refresh()
+        if last_refresh is not None and time.time() - last_refresh < fresh_for:
+            return
         
-        for source, url in self.news_sources.items():
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        lease = max(30, 4 * self.fetch_timeout)
+        if self.store.acquire_refresh(owner, lease):
             try:
-                feed = feedparser.parse(url)
-                for entry in feed.entries[:10]:  # Get top 10 from each source
-                    article = {
-                        'title': entry.title,
-                        'summary': getattr(entry, 'summary', ''),
-                        'source': source,
-                        'published': getattr(entry, 'published', ''),
-                        'link': getattr(entry, 'link', '')
-                    }
-                    all_articles.append(article)
-                time.sleep(0.1)  # Rate limiting
-            except Exception as e:
-                print(f"Error fetching from {source}: {e}")
-                continue
-        
-        self.cached_news = all_articles
-        self.last_fetch = datetime.now()
-        return all_articles
+                self._fetch_all()
+                self.store.prune()
+                self.store.mark_refreshed()
+            finally:
+                self.store.release_refresh(owner)
+            return
+        
+        # Another process is fetching: wait for its results instead of fetching again
+        deadline = time.monotonic() + lease
+        while self.store.refresh_in_progress() and time.monotonic() < deadline:
+            time.sleep(0.1)
     
-    def get_news_keywords(self):
-        """Extract keywords from current news"""
-        articles = self.fetch_current_news()
-        keywords = set()
+    def _run_refresh(self, future):
+        self.last_refresh_attempt = datetime.now()
+        try:
+            self._update_store()
+            # Relevance uses each feed's latest entries, as before the store
+            # kept a retention window; older articles stay searchable
+            articles = self.store.articles(latest=True)
+            # Build the index first; relevance checks read only the index,
+            # so replacing the reference publishes the new snapshot atomically
+            index = KeywordIndex.build(articles, self.generation + 1)
+            if self.semantic is not None:
+                # Embeds only the articles that arrived since the last refresh;
+                # a failure keeps the previous embeddings
+                try:
+                    self.semantic.update(articles)
+                except Exception as e:
+                    print(f"Error embedding news articles: {e}")
+            self.cached_news = articles
+            self.keyword_index = index
+            self.generation = index.generation
+            last_refresh = self.store.last_refresh()
+            self.last_fetch = datetime.fromtimestamp(last_refresh) if last_refresh else datetime.now()
+            self.last_refresh_error = None
+            future.set_result(articles)
+        except Exception as e:
+            print(f"Error refreshing news cache: {e}")
+            self.last_refresh_error = str(e)
+            future.set_exception(e)
+        finally:
+            with self._refresh_lock:
+                self._inflight = None
+    
+    def refresh_async(self):
+        """Start a refresh unless one is already running; return its Future"""
+        with self._refresh_lock:
+            if self._inflight is not None:
+                return self._inflight
+            future = self._inflight = Future()
+        threading.Thread(target=self._run_refresh, args=(future,), name='news-refresh', daemon=True).start()
+        return future
+    
+    def refresh(self):
+        """Refresh the cache now, joining any refresh already in flight"""
+        try:
+            return self.refresh_async().result()
+        except Exception:
+            return self.cached_news
+    
+    def _refresh_loop(self):
+        while True:
+            if self.last_fetch is None:
+                wait = 0
+            else:
+                due = self.last_fetch + self.cache_duration - self.refresh_ahead
+                wait = max((due - datetime.now()).total_seconds(), 1)
+            if self._stop_refresher.wait(wait):
+                return
+            self.refresh()
+            if self.last_refresh_error:
+                # Back off instead of spinning while every refresh fails
+                if self._stop_refresher.wait(60):
+                    return
+    
+    def start_background_refresh(self):
+        """Start the thread that renews the cache before it expires"""
+        with self._refresh_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop_refresher.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name='news-refresher', daemon=True)
+            self._refresher.start()
+    
+    def stop_background_refresh(self):
+        self._stop_refresher.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+    
+    def fetch_current_news(self):
+        """Fetch current news from multiple sources"""
+        # Started lazily so the thread is created after any worker fork
+        if self.background_refresh:
+            self.start_background_refresh()
         
-        for article in articles:
-            text = f"{article['title']} {article['summary']}".lower()
-            # Extract meaningful words (3+ chars, not common words)
-            words = re.findall(r'\b[a-z]{3,}\b', text)
-            keywords.update(words)
+        snapshot, last_fetch = self.cached_news, self.last_fetch
+        if last_fetch and datetime.now() - last_fetch < self.cache_duration:
+            return snapshot
+        
+        if last_fetch is not None:
+            # Stale: serve the last good snapshot and revalidate in the background
+            self.refresh_async()
+            return snapshot
         
-        # Remove common words
-        common_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'man', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'}
-        return keywords - common_words
+        # Nothing cached yet: wait for the (shared) first fetch
+        return self.refresh()
+    
+    def get_refresh_status(self):
+        """Cache age, refresh outcome and per-source failures for /health"""
+        last_fetch = self.last_fetch
+        return {
+            'age_seconds': round((datetime.now() - last_fetch).total_seconds(), 1) if last_fetch else None,
+            'cache_duration_seconds': self.cache_duration.total_seconds(),
+            'cached_articles': len(self.cached_news),
+            'last_success': last_fetch.isoformat() if last_fetch else None,
+            'last_attempt': self.last_refresh_attempt.isoformat() if self.last_refresh_attempt else None,
+            'last_error': self.last_refresh_error,
+            'refreshing': self._inflight is not None,
+            'background_refresh': self._refresher is not None and self._refresher.is_alive(),
+            'sources': self.get_source_status(),
+            'store': self.store.get_stats(),
+            'semantic': self.semantic.get_stats() if self.semantic is not None else None
+        }
+    
+    def get_source_status(self):
+        """Circuit breaker state and validators for each source"""
+        status = {}
+        for source in self.news_sources:
+            state = self.feed_state.get(source, {})
+            status[source] = {
+                **self._get_breaker(source).to_dict(),
+                'cached_entries': len(state.get('articles', [])),
+                'etag': state.get('etag'),
+                'last_modified': state.get('last_modified'),
+                'last_success': state['last_success'].isoformat() if state.get('last_success') else None,
+                'last_error': state.get('last_error')
+            }
+        return status
     
-    def check_news_relevance(self, text):
+    def get_keyword_index(self):
+        """Return the keyword index for the current news snapshot"""
+        self.fetch_current_news()
+        return self.keyword_index
+    
+    def get_news_keywords(self):
+        """Extract keywords from current news"""
+        return self.get_keyword_index().keywords
+    
+    def search_news(self, text, limit=5):
+        """Stored articles that best match the text's news keywords (FTS5, bm25 ranked)"""
+        _, matches, _ = self.get_keyword_index().score(text)
+        return self.store.search(sorted(matches), limit)
+    
+    def _related_articles(self, matches):
+        """top_matches for keyword mode: stored articles containing the matched keywords"""
+        if not matches or not self.related_articles:
+            return []
+        return [
+            {'title': article['title'], 'link': article['link'], 'source': article['source'],
+             'published': article['published'], 'rank': round(article['rank'], 4)}
+            for article in self.store.search(sorted(matches), self.related_articles)
+        ]
+    
+    def check_news_relevance(self, text, index=None, semantic=None):
         """Check if text relates to current news topics"""
-        current_keywords = self.get_news_keywords()
-        text_words = set(re.findall(r'\b[a-z]{3,}\b', text.lower()))
+        if index is None:
+            index = self.get_keyword_index()
+            if self.semantic is not None:
+                semantic = self.semantic.query(text)
+        text_words, matches, weighted_score = index.score(text)
         
-        overlap = len(text_words.intersection(current_keywords))
-        relevance_score = overlap / max(len(text_words), 1) * 100
+        overlap_score = len(matches) / max(len(text_words), 1) * 100
+        relevance_score = weighted_score if self.idf_weighting else overlap_score
         
-        return {
+        result = {
             'relevance_score': relevance_score,
-            'matching_keywords': list(text_words.intersection(current_keywords)),
-            'is_news_related': relevance_score > 10
-        }
\ No newline at end of file
+            'weighted_relevance_score': weighted_score,
+            'matching_keywords': list(matches)
+        }
+        if semantic is not None:
+            # Semantic mode: the closest article's cosine similarity, mapped
+            # through the calibrated cuts onto the keyword scale, drives
+            # relevance_score (and with it is_news_related and the risk rules)
+            similarity, relevance_score, top_matches = semantic
+            result['keyword_relevance_score'] = result['relevance_score']
+            result['relevance_score'] = relevance_score
+            result['semantic_similarity'] = round(similarity, 4)
+            result['top_matches'] = top_matches
+        elif self.semantic is None:
+            # Keyword mode: articles from the whole retention window, via FTS5
+            result['top_matches'] = self._related_articles(matches)
+        # Semantic mode falls back to the keyword score until articles are
+        # embedded and for texts with no term in the encoder's vocabulary
+        result['is_news_related'] = relevance_score > 10
+        return result
+    
+    def check_news_relevance_many(self, texts):
+        """Check news relevance for several texts against one index snapshot"""
+        index = self.get_keyword_index()
+        # Semantic mode embeds the whole batch and scores it in one product
+        semantic = self.semantic.query_many(texts) if self.semantic is not None else [None] * len(texts)
+        return [self.check_news_relevance(text, index, match) for text, match in zip(texts, semantic)]
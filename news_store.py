@@ -0,0 +1,268 @@
+"""
+SQLite-backed store of news feed articles, shared by every process on a host.
+
+NewsFetcher writes each feed's entries here instead of keeping only the
+latest ones in memory. Articles are upserted by GUID (or link), stay until
+they have not been seen in any feed for `retention`, and are indexed with
+FTS5 on title and summary. The database runs in WAL mode, so readers in
+other worker processes are never blocked by the writer.
+
+A lease row makes feed fetching a per-host job: the process that takes
+the lease fetches and writes, and the others wait for it and read what it
+stored. With a file path (NEWS_STORE_PATH) the articles and the feeds'
+ETag/Last-Modified validators also survive restarts; the default
+':memory:' store is private to the process.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS articles ('
+    'id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, source TEXT, title TEXT, summary TEXT, '
+    'link TEXT, published TEXT, first_seen REAL, last_seen REAL)',
+    'CREATE INDEX IF NOT EXISTS articles_last_seen ON articles (last_seen)',
+    'CREATE INDEX IF NOT EXISTS articles_source ON articles (source, last_seen)',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    "title, summary, content='articles', content_rowid='id')",
+    # Keep the external-content FTS index in step with the table
+    'CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN '
+    'INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); END',
+    'CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN '
+    "INSERT INTO articles_fts (articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary); END",
+    'CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, summary ON articles '
+    'WHEN old.title IS NOT new.title OR old.summary IS NOT new.summary BEGIN '
+    "INSERT INTO articles_fts (articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary); "
+    'INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); END',
+    'CREATE TABLE IF NOT EXISTS feeds (source TEXT PRIMARY KEY, etag TEXT, last_modified TEXT)',
+    'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)',
+    'CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires REAL)'
+]
+
+ARTICLE_FIELDS = ('title', 'summary', 'source', 'published', 'link')
+
+
+@contextmanager
+def _transaction(db):
+    # Write transactions take the write lock up front, so concurrent
+    # writers wait on the busy timeout instead of failing mid-transaction
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    db.execute('COMMIT')
+
+
+def article_key(article):
+    """Identity of a feed entry: its GUID, else its link, else a hash of source and title."""
+    key = article.get('guid') or article.get('link')
+    if key:
+        return key
+    return 'sha1:' + hashlib.sha1(f"{article.get('source')}\0{article.get('title')}".encode()).hexdigest()
+
+
+class NewsStore:
+    def __init__(self, path=':memory:', retention=timedelta(hours=48)):
+        """
+        Persistent, deduplicated article store.
+
+        Args:
+            path: SQLite file shared by the processes of a host, or ':memory:'
+            retention: How long an article is kept after it was last seen in a feed
+        """
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._connection()
+
+    @classmethod
+    def from_env(cls):
+        """Store configured by NEWS_STORE_PATH and NEWS_RETENTION_HOURS."""
+        return cls(
+            path=os.environ.get('NEWS_STORE_PATH') or ':memory:',
+            retention=timedelta(hours=float(os.environ.get('NEWS_RETENTION_HOURS', 48)))
+        )
+
+    def _connection(self):
+        """Return this process's SQLite connection, reopening it after a fork."""
+        # SQLite connections must not be shared with a forked child
+        if self._db_pid != os.getpid():
+            import sqlite3
+            self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                with _transaction(self._db):
+                    for statement in _SCHEMA:
+                        self._db.execute(statement)
+                    self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self._db_pid = os.getpid()
+        return self._db
+
+    def upsert(self, articles, seen=None):
+        """
+        Insert new articles and refresh known ones (matched by GUID or link).
+
+        Returns the number of articles written.
+        """
+        seen = time.time() if seen is None else seen
+        rows = [
+            (article_key(article), article.get('source', ''), article.get('title', ''), article.get('summary', ''),
+             article.get('link', ''), article.get('published', ''), seen, seen)
+            for article in articles
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            db = self._connection()
+            with _transaction(db):
+                db.executemany(
+                    'INSERT INTO articles (key, source, title, summary, link, published, first_seen, last_seen) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                    'title = excluded.title, summary = excluded.summary, link = excluded.link, '
+                    'published = excluded.published, last_seen = excluded.last_seen',
+                    rows
+                )
+        return len(rows)
+
+    def touch_source(self, source, seen=None):
+        """Mark a source's most recent entries as seen again (its feed was unchanged)."""
+        seen = time.time() if seen is None else seen
+        with self._lock:
+            db = self._connection()
+            with _transaction(db):
+                db.execute(
+                    'UPDATE articles SET last_seen = ? WHERE source = ? AND '
+                    'last_seen = (SELECT MAX(last_seen) FROM articles WHERE source = ?)',
+                    (seen, source, source)
+                )
+
+    def prune(self, now=None):
+        """Delete articles not seen within the retention window; returns how many."""
+        cutoff = (time.time() if now is None else now) - self.retention.total_seconds()
+        with self._lock:
+            db = self._connection()
+            with _transaction(db):
+                return db.execute('DELETE FROM articles WHERE last_seen < ?', (cutoff,)).rowcount
+
+    def articles(self, latest=False):
+        """
+        Retained articles as dicts, most recently seen first.
+
+        Args:
+            latest: Only the entries each source's feed listed when it was
+                last fetched (or confirmed unchanged), not the whole
+                retention window
+        """
+        where = ''
+        if latest:
+            where = ('WHERE last_seen = (SELECT MAX(last_seen) FROM articles AS newest '
+                     'WHERE newest.source = articles.source) ')
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {', '.join(ARTICLE_FIELDS)} FROM articles {where}ORDER BY last_seen DESC, id DESC"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, words, limit=10):
+        """
+        Full-text search over titles and summaries.
+
+        Args:
+            words: Words of which any may match (title matches rank higher)
+            limit: Maximum number of articles
+
+        Returns article dicts, best match first, each with its bm25 `rank`.
+        """
+        # Quoted terms are literal strings to FTS5, whatever they contain
+        terms = ['"' + word.replace('"', '""') + '"' for word in dict.fromkeys(words) if word]
+        if not terms:
+            return []
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {', '.join('a.' + field for field in ARTICLE_FIELDS)}, "
+                'bm25(articles_fts, 2.0, 1.0) AS rank FROM articles_fts '
+                'JOIN articles a ON a.id = articles_fts.rowid '
+                'WHERE articles_fts MATCH ? ORDER BY rank LIMIT ?',
+                (' OR '.join(terms), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_feed_state(self, source):
+        """Stored (etag, last_modified) validators of a feed."""
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT etag, last_modified FROM feeds WHERE source = ?', (source,)
+            ).fetchone()
+        return (row['etag'], row['last_modified']) if row else (None, None)
+
+    def set_feed_state(self, source, etag, last_modified):
+        with self._lock:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO feeds (source, etag, last_modified) VALUES (?, ?, ?)',
+                (source, etag, last_modified)
+            )
+
+    def last_refresh(self):
+        """Time (epoch seconds) of the last completed refresh by any process, or None."""
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = 'last_refresh'").fetchone()
+        return row['value'] if row else None
+
+    def mark_refreshed(self, when=None):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_refresh', ?)",
+                (time.time() if when is None else when,)
+            )
+
+    def acquire_refresh(self, owner, ttl):
+        """
+        Take the host-wide refresh lease for ttl seconds.
+
+        Returns False while another owner holds an unexpired lease.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT INTO leases (name, owner, expires) VALUES ('refresh', ?, ?) "
+                'ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+                'WHERE leases.expires < ? OR leases.owner = excluded.owner',
+                (owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def release_refresh(self, owner):
+        with self._lock:
+            self._connection().execute("DELETE FROM leases WHERE name = 'refresh' AND owner = ?", (owner,))
+
+    def refresh_in_progress(self):
+        """Whether some process holds an unexpired refresh lease."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM leases WHERE name = 'refresh' AND expires >= ?", (time.time(),)
+            ).fetchone()
+        return row is not None
+
+    def get_stats(self):
+        with self._lock:
+            db = self._connection()
+            count, oldest = db.execute('SELECT COUNT(*), MIN(first_seen) FROM articles').fetchone()
+            sources = db.execute('SELECT COUNT(DISTINCT source) FROM articles').fetchone()[0]
+        return {
+            'path': self.path,
+            'articles': count,
+            'sources': sources,
+            'oldest_age_seconds': round(time.time() - oldest, 1) if oldest else None,
+            'retention_seconds': self.retention.total_seconds()
+        }
@@ -0,0 +1,72 @@
+"""
+Helpers for loading the model once in a pre-fork server master.
+
+With gunicorn's preload_app the master imports app.py, loads and warms the
+detector, then forks workers that share the weight pages copy-on-write:
+    gunicorn -c gunicorn.conf.py app:app
+
+Tensor and ONNX Runtime weights live in native buffers, so workers only
+copy the pages holding Python object headers they touch. Freezing the heap
+after loading keeps the garbage collector from writing to those headers.
+"""
+import gc
+import sys
+from contextlib import contextmanager
+
+WARM_UP_TEXTS = [
+    "The Senate passed the budget bill on Tuesday, according to officials.",
+    "SHOCKING!!! You won't believe what this celebrity said about vaccines!"
+]
+
+
+def process_memory():
+    """Memory of this process in MB from /proc/self/smaps_rollup, or None off Linux."""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line[0].isspace())
+    except OSError:
+        return None
+
+    kb = lambda name: int(fields.get(name, '0 kB').split()[0])
+    return {
+        'rss_mb': round(kb('Rss') / 1024, 1),
+        # Proportional share: shared pages are split between the processes mapping them
+        'pss_mb': round(kb('Pss') / 1024, 1),
+        'shared_mb': round((kb('Shared_Clean') + kb('Shared_Dirty')) / 1024, 1),
+        'private_mb': round((kb('Private_Clean') + kb('Private_Dirty')) / 1024, 1)
+    }
+
+
+@contextmanager
+def single_threaded():
+    """
+    Limit torch to one intra-op thread.
+
+    GNU OpenMP thread pools do not survive fork, and a child that inherits
+    one can hang in its first parallel region, so the master warms up
+    without starting the pool.
+    """
+    torch = sys.modules.get('torch')
+    if torch is None:
+        yield
+        return
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(threads)
+
+
+def warm_up(detector, texts=WARM_UP_TEXTS):
+    """Run the feature extractor and one forward pass so lazy initialization happens now."""
+    detector.feature_extractor.extract_many(texts)
+    if detector.use_pretrained:
+        # Straight to the backend: no batcher thread, no padding counters
+        detector.backend.predict_proba(list(texts))
+
+
+def freeze():
+    """Move every live object to the permanent generation before forking."""
+    gc.collect()
+    gc.freeze()
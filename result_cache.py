@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Bump when keys are computed differently, so persisted entries stop matching.
+# Keys hash the exact text: analyses depend on its raw whitespace (text
+# length, caps ratio), so a reformatted copy must not share another's result
+KEY_FORMAT = 2
+
+
+class ResultCache:
+    def __init__(self, model_version, max_entries=1024, ttl=3600, disk_path=None):
+        """
+        Content-addressed cache of analysis results.
+
+        Entries are keyed by a hash of the exact text and the model
+        version, evicted least-recently-used beyond max_entries, expire after
+        ttl seconds, and are dropped as soon as the caller's generation (e.g.
+        the news snapshot the relevance score was computed against) changes.
+
+        Args:
+            model_version: Identifies the model/rules that produced results
+            max_entries: In-memory LRU capacity
+            ttl: Maximum entry age in seconds
+            disk_path: Optional SQLite file so warm entries survive restarts
+        """
+        self.model_version = str(model_version)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Disk I/O has its own lock, so memory hits and get_stats() never wait on it
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._puts = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_path:
+            self._connection()
+
+    def _connection(self):
+        """Return this process's SQLite connection, reopening it after a fork."""
+        if self.disk_path is None:
+            return None
+        # SQLite connections must not be shared with a forked child
+        if self._db_pid != os.getpid():
+            import sqlite3
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, generation TEXT, created REAL, value TEXT)'
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    @classmethod
+    def from_env(cls, model_version):
+        """Build a cache configured by RESULT_CACHE_SIZE, RESULT_CACHE_TTL and RESULT_CACHE_PATH."""
+        return cls(
+            model_version,
+            max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 1024)),
+            ttl=float(os.environ.get('RESULT_CACHE_TTL', 3600)),
+            disk_path=os.environ.get('RESULT_CACHE_PATH') or None
+        )
+
+    def make_key(self, text):
+        digest = hashlib.sha256()
+        digest.update(f"{KEY_FORMAT}\0{self.model_version}\0".encode())
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def _is_valid(self, created, generation, current_generation):
+        return time.time() - created < self.ttl and generation == current_generation
+
+    def get(self, text, generation=None):
+        """Return the cached result for text, or None."""
+        key = self.make_key(text)
+        generation = str(generation)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, entry_generation, value = entry
+                if self._is_valid(created, entry_generation, generation):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        row = None
+        if self.disk_path is not None:
+            with self._db_lock:
+                row = self._connection().execute(
+                    'SELECT created, generation, value FROM results WHERE key = ?', (key,)
+                ).fetchone()
+        with self._lock:
+            if row is not None and self._is_valid(row[0], row[1], generation):
+                value = json.loads(row[2])
+                self._store(key, (row[0], row[1], value))
+                self.disk_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, text, value, generation=None):
+        """Cache a JSON-serializable result for text."""
+        key = self.make_key(text)
+        entry = (time.time(), str(generation), value)
+        with self._lock:
+            self._store(key, entry)
+        if self.disk_path is None:
+            return
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                'INSERT OR REPLACE INTO results (key, generation, created, value) VALUES (?, ?, ?, ?)',
+                (key, entry[1], entry[0], json.dumps(value))
+            )
+            self._puts += 1
+            # Expired rows are pruned periodically rather than on every write
+            if self._puts % 500 == 0:
+                db.execute('DELETE FROM results WHERE created < ?', (time.time() - self.ttl,))
+            db.commit()
+
+    def get_or_compute(self, text, compute, generation=None):
+        """Return the cached result for text, computing and caching it on a miss."""
+        value = self.get(text, generation)
+        if value is None:
+            value = compute()
+            if isinstance(value, dict) and 'error' not in value:
+                self.put(text, value, generation)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                db.execute('DELETE FROM results')
+                db.commit()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'model_version': self.model_version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0,
+                'disk_path': self.disk_path
+            }
@@ -0,0 +1,124 @@
+"""
+Rule-based risk scoring over a whole batch of feature vectors.
+
+score_risk() takes the N x F matrix from
+LinguisticFeatureExtractor.extract_many() (columns in FEATURE_NAMES order)
+and the news relevance score of each text. It computes every indicator
+score, the weighted overall score and the verdict levels with array
+operations. The human-readable indicator messages are only formatted
+when RiskScores.indicators(i) is asked for one item, so bulk jobs that
+need numbers never build strings.
+
+Scores are identical to the per-item dict path: the same operations run
+in the same order, elementwise.
+"""
+import numpy as np
+
+from feature_extractor import FEATURE_NAMES
+
+INDICATORS = ('sensationalism', 'sources', 'emotional', 'clickbait', 'news_relevance')
+
+# Verdicts by risk score: below 35, below 65, from 65
+VERDICT_THRESHOLDS = (35, 65)
+VERDICT_LEVELS = ('LOW RISK', 'MEDIUM RISK', 'HIGH RISK')
+VERDICT_MESSAGES = (
+    'Content appears credible and relevant to current events',
+    'Some indicators of potential misinformation or unclear content detected',
+    'Strong indicators of potential misinformation or vague content detected'
+)
+
+_COLUMN = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+
+def verdict_indices(scores):
+    """Index into VERDICT_LEVELS / VERDICT_MESSAGES for each risk score."""
+    scores = np.asarray(scores, dtype=np.float64)
+    low, high = VERDICT_THRESHOLDS
+    return (scores >= low).astype(np.intp) + (scores >= high)
+
+
+def verdict(score):
+    """(level, message) for one risk score."""
+    low, high = VERDICT_THRESHOLDS
+    index = (score >= low) + (score >= high)
+    return VERDICT_LEVELS[index], VERDICT_MESSAGES[index]
+
+
+class RiskScores:
+    """Indicator and overall scores for a batch; messages are built on demand."""
+
+    def __init__(self, features, relevance):
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        self.features = features
+        self.relevance = np.asarray(relevance, dtype=np.float64).reshape(-1)
+        column = lambda name: features[:, _COLUMN[name]]
+
+        self.source_count = column('has_quotes') + column('has_attribution') + column('has_url')
+        self.sensationalism = np.minimum(column('sensational_count') * 15 + column('exclamation_count') * 5, 100)
+        self.sources = np.where(self.source_count == 0, 80, np.where(self.source_count == 1, 50, 20)).astype(np.float64)
+        self.emotional = np.minimum(column('emotional_count') * 12 + column('caps_ratio') * 50, 100)
+        self.clickbait = np.minimum(column('clickbait_count') * 30, 100)
+        # Vague content (low relevance to current news) gets higher risk
+        self.news_relevance = np.where(self.relevance < 5, 70, np.where(self.relevance < 15, 40, 10)).astype(np.float64)
+
+        self.overall = (self.sensationalism * 0.2 + self.sources * 0.25 +
+                        self.emotional * 0.2 + self.clickbait * 0.15 + self.news_relevance * 0.2)
+
+    def __len__(self):
+        return len(self.overall)
+
+    def matrix(self):
+        """N x len(INDICATORS) indicator scores."""
+        return np.column_stack([getattr(self, name) for name in INDICATORS])
+
+    def verdict_levels(self):
+        """Verdict level of each overall score, as an array of strings."""
+        return np.array(VERDICT_LEVELS)[verdict_indices(self.overall)]
+
+    def indicators(self, i):
+        """The indicator dicts, with messages, for item i."""
+        row = self.features[i]
+        count = lambda name: int(row[_COLUMN[name]])
+        caps_ratio = float(row[_COLUMN['caps_ratio']])
+        relevance = float(self.relevance[i])
+        vague = int(self.news_relevance[i])
+        emotional = float(self.emotional[i])
+        # min(raw, 100) kept a float unless the cap applied
+        capped = row[_COLUMN['emotional_count']] * 12 + caps_ratio * 50 > 100
+        return {
+            'sensationalism': {
+                'score': int(self.sensationalism[i]),
+                'message': f"Sensational language: {count('sensational_count')} instances, {count('exclamation_count')} exclamations"
+            },
+            'sources': {
+                'score': int(self.sources[i]),
+                'message': f"Source indicators: {int(self.source_count[i])}/3 found"
+            },
+            'emotional': {
+                'score': 100 if capped else emotional,
+                'message': f"Emotional language: {count('emotional_count')} instances, {caps_ratio:.1%} caps"
+            },
+            'clickbait': {
+                'score': int(self.clickbait[i]),
+                'message': f"Clickbait patterns: {count('clickbait_count')} detected"
+            },
+            'news_relevance': {
+                'score': vague,
+                'message': f"News relevance: {relevance:.1f}% - {'Low relevance to current events' if vague > 50 else 'Related to current news'}"
+            }
+        }
+
+    def result(self, i):
+        """{'overall', 'indicators'} for item i, as the detector returns it."""
+        return {'overall': float(self.overall[i]), 'indicators': self.indicators(i)}
+
+
+def score_risk(features, relevance):
+    """
+    Score a batch of texts.
+
+    Args:
+        features: N x F matrix with columns in FEATURE_NAMES order
+        relevance: N news relevance scores (percent)
+    """
+    return RiskScores(features, relevance)
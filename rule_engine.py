@@ -0,0 +1,273 @@
+"""
+Shared rule-based scorer for the lightweight entry points.
+
+The fake and real indicator lexicons are read from rule_lexicon.json
+(override with RULE_LEXICON_PATH) and compiled into a single regex, so a
+text is scanned once however many phrases there are. Phrases match whole
+words; a trailing `*` makes a phrase match as a word prefix ("delete*"
+matches "deleted"). Edits to the lexicon file are picked up without a
+restart.
+
+Only the standard library is imported here to keep cold starts cheap.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rule_lexicon.json')
+
+
+def _normalize(text):
+    # Typographic apostrophes are matched like ASCII ones
+    return text.lower().replace('\u2019', "'").replace('\u2018', "'")
+
+
+def _trie_pattern(prefix_of):
+    """
+    Regex alternation for phrases, factored by shared prefixes.
+
+    Longer continuations are tried before a phrase ends, so the longest
+    phrase at a position wins. Whole-word phrases must end at a word
+    boundary; prefix phrases need not.
+    """
+    trie = {}
+    for key, prefix in prefix_of.items():
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = prefix
+
+    def build(node):
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if '' in node:
+            alternatives.append('' if node[''] else r'(?!\w)')
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')'
+
+    return build(trie)
+
+
+class Lexicon:
+    """Immutable compiled form of one lexicon version."""
+
+    __slots__ = ('fake', 'real', 'version', 'pattern', 'implied')
+
+    def __init__(self, fake, real):
+        entries = {}
+        for label, phrases in (('fake', fake), ('real', real)):
+            for phrase in phrases:
+                phrase = _normalize(phrase.strip())
+                prefix = phrase.endswith('*')
+                key = phrase.rstrip('*')
+                if key:
+                    entries[(label, key)] = prefix
+
+        self.fake = frozenset(key for label, key in entries if label == 'fake')
+        self.real = frozenset(key for label, key in entries if label == 'real')
+        self.version = hashlib.sha256(json.dumps(sorted(entries.items())).encode()).hexdigest()[:12]
+
+        prefix_of = {}
+        for (_, key), prefix in entries.items():
+            prefix_of[key] = prefix_of.get(key, False) or prefix
+
+        # Anchoring on a consumed non-word character (the text is scanned with
+        # a leading space) lets the regex engine skip straight to word starts,
+        # and the trie keeps the work per word start flat as the lexicon grows
+        self.pattern = re.compile(r'\W(' + _trie_pattern(prefix_of) + ')') if prefix_of else None
+
+        # A matched phrase also counts every shorter phrase inside it that
+        # would match on its own (e.g. "breaking news" implies "breaking").
+        # What follows a prefix entry in the text is unknown, so nothing
+        # ending exactly at its end can be assumed to match.
+        singles = {
+            key: re.compile(r'(?<!\w)' + re.escape(key) + ('' if prefix else r'(?!\w)'))
+            for key, prefix in prefix_of.items()
+        }
+        self.implied = {}
+        for key, prefix in prefix_of.items():
+            probe = key + ('x' if prefix else ' ')
+            self.implied[key] = frozenset(other for other, single in singles.items() if single.search(probe))
+
+    def scan(self, text):
+        """Return the set of lexicon phrases present in text."""
+        if self.pattern is None:
+            return set()
+        lower = ' ' + _normalize(text)
+        search = self.pattern.search
+        matched = []
+        match = search(lower)
+        while match:
+            matched.append(match.group(1))
+            # Restart at the phrase itself so overlapping phrases are seen
+            match = search(lower, match.start() + 1)
+        implied = self.implied
+        return set().union(*[implied[key] for key in matched])
+
+
+class RuleEngine:
+    def __init__(self, path=None, check_interval=2.0):
+        """
+        Rule-based fake/real scorer over a hot-reloadable lexicon file.
+
+        Args:
+            path: JSON file with "fake" and "real" phrase lists (defaults to
+                RULE_LEXICON_PATH or rule_lexicon.json next to this module)
+            check_interval: Minimum seconds between checks of the file's
+                modification time; 0 checks on every call, None never reloads
+        """
+        self.path = path or os.environ.get('RULE_LEXICON_PATH') or DEFAULT_LEXICON_PATH
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.reloads = 0
+        self.reload_error = None
+        self.lexicon = self._load()
+
+    def _load(self):
+        self._mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path) as f:
+            data = json.load(f)
+        return Lexicon(data.get('fake', []), data.get('real', []))
+
+    def reload(self, force=False):
+        """Recompile the lexicon if the file changed; returns True if it did."""
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                if not force and os.stat(self.path).st_mtime_ns == self._mtime:
+                    return False
+                # Readers keep using the old snapshot until the swap
+                self.lexicon = self._load()
+            except (OSError, ValueError) as e:
+                # A half-written or broken file leaves the last good lexicon in place
+                self.reload_error = str(e)
+                return False
+            self.reloads += 1
+            self.reload_error = None
+            return True
+
+    def _current(self):
+        if self.check_interval is not None and time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        return self.lexicon
+
+    @property
+    def version(self):
+        """Hash of the active lexicon, for cache keys."""
+        return self._current().version
+
+    @staticmethod
+    def _score(lexicon, found):
+        fake_matches = sorted(found & lexicon.fake)
+        real_matches = sorted(found & lexicon.real)
+        fake_score = len(fake_matches)
+        real_score = len(real_matches)
+
+        # Calculate scores
+        total_indicators = max(1, fake_score + real_score)
+        fake_probability = min(90, max(10, (fake_score / total_indicators) * 100 + 20))
+        real_probability = 100 - fake_probability
+
+        return {
+            'fake_probability': fake_probability,
+            'real_probability': real_probability,
+            'prediction': 0 if fake_probability > real_probability else 1,
+            'fake_indicators': fake_matches,
+            'real_indicators': real_matches
+        }
+
+    def analyze(self, text):
+        """Score one text; prediction is 0 for fake and 1 for real."""
+        lexicon = self._current()
+        return self._score(lexicon, lexicon.scan(text))
+
+    def analyze_many(self, texts):
+        """Score a list of texts against one lexicon snapshot."""
+        lexicon = self._current()
+        return [self._score(lexicon, lexicon.scan(text)) for text in texts]
+
+    def get_stats(self):
+        lexicon = self.lexicon
+        return {
+            'path': self.path,
+            'version': lexicon.version,
+            'fake_phrases': len(lexicon.fake),
+            'real_phrases': len(lexicon.real),
+            'reloads': self.reloads,
+            'reload_error': self.reload_error
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Shared engine, created on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RuleEngine()
+    return _engine
+
+
+def analyze_text_simple(text):
+    """Simple rule-based analysis for demo purposes"""
+    return get_engine().analyze(text)
+
+
+def build_result(text, analysis=None):
+    """Build the API response for one text from its rule-based analysis"""
+    if analysis is None:
+        analysis = analyze_text_simple(text)
+    prediction = analysis['prediction']
+    fake_prob = analysis['fake_probability']
+    real_prob = analysis['real_probability']
+
+    # Create response matching the expected format
+    return {
+        'verdict_level': 'HIGH RISK' if prediction == 0 else 'LOW RISK',
+        'verdict_message': 'This content appears to be fake news' if prediction == 0 else 'This content appears to be legitimate news',
+        'risk_score': int(fake_prob),
+        'credibility_score': int(real_prob),
+        'ai_prediction': {
+            'available': True,
+            'prediction': 'Likely Fake' if prediction == 0 else 'Likely Real',
+            'confidence': int(max(fake_prob, real_prob))
+        },
+        'risk_indicators': {
+            'Content Analysis': {
+                'score': int(fake_prob),
+                'message': f'Rule-based analysis suggests this is {"fake" if prediction == 0 else "real"} news'
+            }
+        },
+        'linguistic_features': {
+            'word_count': len(text.split()),
+            'sentence_count': text.count('.') + text.count('!') + text.count('?'),
+            'avg_sentence_length': len(text.split()) / max(1, text.count('.') + text.count('!') + text.count('?')),
+            'caps_ratio': sum(1 for c in text if c.isupper()) / max(1, len(text)),
+            'exclamation_count': text.count('!'),
+            'question_count': text.count('?')
+        }
+    }
+
+
+def build_results(texts):
+    """Build responses for a batch; empty texts get an `error` entry."""
+    results = [None] * len(texts)
+    valid = []
+    for i, text in enumerate(texts):
+        if not isinstance(text, str) or not text.strip():
+            results[i] = {'error': 'No text provided for analysis'}
+        else:
+            valid.append(i)
+    analyses = get_engine().analyze_many([texts[i] for i in valid])
+    for i, analysis in zip(valid, analyses):
+        results[i] = build_result(texts[i], analysis)
+    return results
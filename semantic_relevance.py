@@ -0,0 +1,486 @@
+"""
+Semantic news relevance: cosine similarity against embedded news articles.
+
+Keyword overlap (news_fetcher.KeywordIndex) only sees shared words. In
+semantic mode every current article (title + summary) is embedded once
+when the feeds refresh, into one contiguous float32 matrix. A request
+embeds its text once and scores it against every article with a single
+matrix-vector product; the top-k articles are returned with their links.
+
+Encoders:
+    TransformerEncoder  Mean-pooled hidden states of the detector's already
+                        loaded DistilBERT (PyTorch backends)
+    TfidfSvdEncoder     TF-IDF reduced with truncated SVD; the fallback when
+                        no transformer is loaded (or for ONNX backends)
+
+The matrix is updated incrementally: rows of expired articles are freed
+and reused, and only new articles are embedded. Similarities are computed
+around the mean article vector, which keeps DistilBERT's large shared
+component from making every text look related.
+
+Cosine similarity becomes relevance_score through cut points picked from
+labeled data, separately for each encoder:
+    python semantic_relevance.py calibrate labeled.jsonl --encoder tfidf-svd
+    RELEVANCE_MODE=semantic SEMANTIC_CALIBRATION=semantic_calibration.json
+
+Labeled JSONL has one {"text": ..., "label": ...} object per line, where the
+label is "related"/"unrelated" or 1 (related to current news) / 0.
+"""
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+from batching import MicroBatcher
+from news_store import article_key
+
+RELEVANCE_MODES = ('keywords', 'semantic')
+
+# Keyword relevance_score values the calibrated cut points map onto: below 5
+# and below 15 are the risk rules' low/medium relevance bands, above 10 is
+# is_news_related
+KEYWORD_CUTS = (5.0, 10.0, 15.0)
+
+
+def article_text(article):
+    return f"{article.get('title', '')} {article.get('summary', '')}"
+
+
+class TransformerEncoder:
+    name = 'transformer'
+
+    def __init__(self, backend, max_length=128, batch_size=16, max_wait_ms=None, max_queue_size=256):
+        """
+        Embed texts with an inference backend that has embed() (PyTorch).
+
+        Args:
+            backend: inference_backends.TorchBackend or QuantizedTorchBackend
+            max_length: Tokens embedded per text
+            batch_size: Texts per forward pass
+            max_wait_ms: When set, single texts from concurrent requests are
+                merged into one forward pass through a MicroBatcher, waiting
+                at most this long for the batch to fill
+            max_queue_size: Maximum number of texts waiting for the batcher
+        """
+        self.backend = backend
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.batcher = None
+        if max_wait_ms is not None:
+            self.batcher = MicroBatcher(self._embed_rows, max_batch_size=batch_size,
+                                        max_wait_ms=max_wait_ms, max_queue_size=max_queue_size)
+
+    def _embed_rows(self, texts):
+        return list(self.backend.embed(texts, self.max_length))
+
+    def fit(self, texts):
+        """Stateless: existing vectors never need re-encoding."""
+        return None
+
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return None
+        if len(texts) == 1 and self.batcher is not None:
+            # One request's text: share a forward pass with concurrent ones
+            return self.batcher(texts[0])[None]
+        return np.concatenate([
+            self.backend.embed(texts[start:start + self.batch_size], self.max_length)
+            for start in range(0, len(texts), self.batch_size)
+        ])
+
+    def get_stats(self):
+        return self.batcher.get_stats() if self.batcher is not None else None
+
+
+class TfidfSvdEncoder:
+    name = 'tfidf-svd'
+
+    def __init__(self, dimensions=128, refit_growth=2.0):
+        """
+        TF-IDF + truncated SVD embeddings fitted on the news articles.
+
+        Args:
+            dimensions: Embedding size (capped by the corpus size)
+            refit_growth: Refit, and re-encode every article, once the corpus
+                has grown by this factor since the last fit
+        """
+        self.dimensions = dimensions
+        self.refit_growth = refit_growth
+        self.pipeline = None
+        self.fitted_on = 0
+
+    def fit(self, texts):
+        """
+        A copy of this encoder fitted on the current articles, or None when no refit is due.
+
+        This encoder is left untouched, so queries keep using the basis of
+        the stored vectors until the index swaps in the copy with new ones.
+        """
+        texts = list(texts)
+        if self.pipeline is not None and len(texts) < self.fitted_on * self.refit_growth:
+            return None
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.pipeline import make_pipeline
+
+        tfidf = TfidfVectorizer(stop_words='english', sublinear_tf=True)
+        try:
+            features = tfidf.fit_transform(texts)
+        except ValueError:
+            # No usable vocabulary yet (e.g. no articles)
+            return None
+        components = min(self.dimensions, features.shape[0] - 1, features.shape[1] - 1)
+        if components < 1:
+            return None
+        svd = TruncatedSVD(n_components=components, random_state=0).fit(features)
+        encoder = TfidfSvdEncoder(self.dimensions, self.refit_growth)
+        encoder.pipeline = make_pipeline(tfidf, svd)
+        encoder.fitted_on = len(texts)
+        return encoder
+
+    def encode(self, texts):
+        texts = list(texts)
+        if self.pipeline is None or not texts:
+            return None
+        return self.pipeline.transform(texts).astype(np.float32)
+
+
+class SemanticCalibration:
+    def __init__(self, cuts):
+        """
+        Per-encoder cosine cut points that turn a similarity into relevance_score.
+
+        Args:
+            cuts: {encoder name: [low, related, high]}; the cosines mapped
+                onto KEYWORD_CUTS
+        """
+        self.cuts = {name: [float(cut) for cut in values] for name, values in cuts.items()}
+
+    @classmethod
+    def from_file(cls, path):
+        """Load the file written by `python semantic_relevance.py calibrate`."""
+        with open(path) as f:
+            config = json.load(f)
+        return cls({name: entry['cuts'] for name, entry in config.get('encoders', {}).items()})
+
+    def covers(self, encoder_name):
+        return encoder_name in self.cuts
+
+    def to_relevance(self, similarity, encoder_name):
+        """
+        Map a cosine similarity onto the keyword relevance_score scale.
+
+        Piecewise linear through 0 -> 0, the calibrated cuts -> KEYWORD_CUTS
+        and 1 -> 100, so every threshold on relevance_score keeps its meaning.
+        """
+        return float(np.interp(max(similarity, 0.0), [0.0, *self.cuts[encoder_name], 1.0],
+                               [0.0, *KEYWORD_CUTS, 100.0]))
+
+
+def calibrate_cuts(similarities, related):
+    """
+    Pick [low, related, high] cosine cut points from labeled similarities.
+
+    `related` is the threshold with the best balanced accuracy at separating
+    related from unrelated texts; `low` is the 5th percentile of related
+    texts (almost none fall below it) and `high` the 95th percentile of
+    unrelated texts (almost none rise above it).
+
+    Args:
+        similarities: Best cosine similarity per text (0 when none)
+        related: Boolean array, True for texts labeled related
+    """
+    similarities = np.asarray(similarities, dtype=float)
+    related = np.asarray(related, dtype=bool)
+    if related.all() or not related.any():
+        raise ValueError('Calibration needs both related and unrelated texts')
+
+    values = np.unique(similarities)
+    candidates = (values[:-1] + values[1:]) / 2 if len(values) > 1 else values
+    best_threshold, best_accuracy = None, -1.0
+    for threshold in candidates:
+        predicted = similarities > threshold
+        accuracy = ((predicted & related).sum() / related.sum() +
+                    (~predicted & ~related).sum() / (~related).sum()) / 2
+        if accuracy > best_accuracy:
+            best_threshold, best_accuracy = float(threshold), float(accuracy)
+
+    low = float(np.percentile(similarities[related], 5))
+    high = float(np.percentile(similarities[~related], 95))
+    # np.interp needs strictly increasing points inside (0, 1)
+    eps = 1e-4
+    threshold = min(max(best_threshold, 2 * eps), 1 - 2 * eps)
+    low = min(max(low, eps), threshold - eps)
+    high = max(min(high, 1 - eps), threshold + eps)
+    return {
+        'cuts': [round(low, 6), round(threshold, 6), round(high, 6)],
+        'report': {
+            'samples': int(len(related)),
+            'related': int(related.sum()),
+            'unrelated': int((~related).sum()),
+            'balanced_accuracy': round(best_accuracy, 4)
+        }
+    }
+
+
+class SemanticIndex:
+    def __init__(self, encoder, top_k=3, center=True, calibration=None):
+        """
+        Article embeddings for semantic relevance, updated as feeds refresh.
+
+        Args:
+            encoder: TransformerEncoder or TfidfSvdEncoder
+            top_k: Articles returned per query
+            center: Measure similarity around the mean article vector
+            calibration: Optional SemanticCalibration; queries then report a
+                relevance_score, and are skipped (not embedded) while the
+                current encoder has no cut points
+        """
+        self.encoder = encoder
+        self.top_k = top_k
+        self.center = center
+        self.calibration = calibration
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.valid = np.zeros(0, dtype=bool)
+        self.rows = {}
+        self.articles = []
+        self._free = []
+        self._mean = None
+        self._norms = None
+
+    def set_encoder(self, encoder, articles=()):
+        """Switch encoders; every article is embedded again."""
+        with self._lock:
+            self.encoder = encoder
+            self._clear()
+        if articles:
+            self.update(articles)
+
+    def update(self, articles):
+        """
+        Sync the matrix with the current articles.
+
+        Rows of articles no longer present are freed, and only articles not
+        yet embedded are encoded, unless the encoder was refitted.
+        """
+        articles = {article_key(article): article for article in articles}
+        with self._lock:
+            encoder = self.encoder
+        refitted = encoder.fit(article_text(article) for article in articles.values())
+        if refitted is not None:
+            # A new basis: embed everything aside, then swap encoder and
+            # vectors together so no query mixes the two bases
+            vectors = refitted.encode(article_text(article) for article in articles.values())
+            with self._lock:
+                self.encoder = refitted
+                self._clear()
+                if vectors is not None:
+                    self._place(list(articles), list(articles.values()), vectors)
+                self._refresh_statistics()
+            return
+
+        with self._lock:
+            added = [key for key in articles if key not in self.rows]
+            expired = [key for key in self.rows if key not in articles]
+        vectors = encoder.encode(article_text(articles[key]) for key in added)
+
+        with self._lock:
+            if self.encoder is not encoder:
+                # set_encoder() ran meanwhile and re-embeds on its own
+                return
+            for key in expired:
+                row = self.rows.pop(key)
+                self.valid[row] = False
+                self.articles[row] = None
+                self._free.append(row)
+            if vectors is not None:
+                self._place(added, [articles[key] for key in added], vectors)
+            self._refresh_statistics()
+
+    def _place(self, keys, articles, vectors):
+        if self.matrix.shape[1] != vectors.shape[1]:
+            self.matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        needed = len(keys) - len(self._free)
+        if needed > 0:
+            # Grow geometrically; new rows start free
+            start = len(self.matrix)
+            capacity = max(start + needed, 2 * start, 64)
+            matrix = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            matrix[:start] = self.matrix
+            self.matrix = matrix
+            self.valid = np.concatenate([self.valid, np.zeros(capacity - start, dtype=bool)])
+            self.articles.extend([None] * (capacity - start))
+            self._free.extend(range(capacity - 1, start - 1, -1))
+        rows = [self._free.pop() for _ in keys]
+        self.matrix[rows] = vectors
+        self.valid[rows] = True
+        for key, article, row in zip(keys, articles, rows):
+            self.rows[key] = row
+            self.articles[row] = {
+                'title': article.get('title', ''),
+                'link': article.get('link', ''),
+                'source': article.get('source', ''),
+                'published': article.get('published', '')
+            }
+
+    def _refresh_statistics(self):
+        # Mean of the live rows and each row's norm around it
+        if not self.rows:
+            self._mean = self._norms = None
+            return
+        if self.center:
+            self._mean = self.matrix[self.valid].mean(axis=0)
+        else:
+            self._mean = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        norms = np.linalg.norm(self.matrix - self._mean, axis=1)
+        norms[norms == 0] = np.inf
+        self._norms = norms
+
+    def query_many(self, texts):
+        """
+        Top-k similar articles for each text.
+
+        Returns, per text, (best cosine similarity, relevance_score or None
+        without a calibration, [article dicts with `similarity`]), or None
+        while no articles are embedded, while the calibration has no cut
+        points for the encoder, and for texts whose embedding is zero (no
+        term in the encoder's vocabulary).
+        """
+        texts = list(texts)
+        with self._lock:
+            encoder = self.encoder if self.rows and self._calibrated() else None
+        queries = encoder.encode(texts) if encoder is not None and texts else None
+        if queries is None:
+            return [None] * len(texts)
+
+        with self._lock:
+            # The vectors must come from the basis the queries were embedded in
+            if self.encoder is not encoder or self._norms is None or queries.shape[1] != self.matrix.shape[1]:
+                return [None] * len(texts)
+            # Centered, an empty embedding would become -mean and look related
+            empty = ~np.any(queries, axis=1)
+            centered = queries - self._mean
+            query_norms = np.linalg.norm(centered, axis=1)
+            query_norms[query_norms == 0] = np.inf
+            # One product against the whole matrix
+            scores = (self.matrix @ centered.T - (self._mean @ centered.T)) / np.outer(self._norms, query_norms)
+            scores[~self.valid] = -np.inf
+            k = min(self.top_k, len(self.rows))
+            results = []
+            for column, unknown in zip(scores.T, empty):
+                if unknown:
+                    results.append(None)
+                    continue
+                top = np.argpartition(-column, k - 1)[:k]
+                top = top[np.argsort(-column[top])]
+                matches = [{**self.articles[row], 'similarity': round(float(column[row]), 4)} for row in top]
+                similarity = float(column[top[0]])
+                relevance = None
+                if self.calibration is not None:
+                    relevance = self.calibration.to_relevance(similarity, encoder.name)
+                results.append((similarity, relevance, matches))
+            return results
+
+    def _calibrated(self):
+        return self.calibration is None or self.calibration.covers(self.encoder.name)
+
+    def query(self, text):
+        return self.query_many([text])[0]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'encoder': self.encoder.name,
+                'articles': len(self.rows),
+                'dimensions': int(self.matrix.shape[1]),
+                'capacity': len(self.matrix),
+                'top_k': self.top_k,
+                'calibrated': self.calibration is not None and self._calibrated(),
+                'cuts': self.calibration.cuts.get(self.encoder.name) if self.calibration is not None else None,
+                'embedding_batcher': self.encoder.get_stats() if hasattr(self.encoder, 'get_stats') else None
+            }
+
+
+def parse_related(value):
+    """Map "related"/"unrelated", true/false or 1/0 to a bool."""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('related', 'true', '1'):
+            return True
+        if value in ('unrelated', 'false', '0'):
+            return False
+        raise ValueError(f"Unknown label {value!r}")
+    return bool(value)
+
+
+def read_labeled(path):
+    texts, labels = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record['text'])
+                labels.append(parse_related(record['label']))
+    return texts, np.array(labels, dtype=bool)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Semantic relevance tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    cal = subparsers.add_parser('calibrate', help='Pick cosine cut points from labeled JSONL')
+    cal.add_argument('data', help='JSONL with "text" and "label" fields')
+    cal.add_argument('--output', default='semantic_calibration.json',
+                     help='Cut points are merged into this file, one entry per encoder')
+    cal.add_argument('--news-store', default=os.environ.get('NEWS_STORE_PATH') or 'news_store.db',
+                     help='Articles to compare against (fetched when the store is empty)')
+    cal.add_argument('--encoder', choices=('transformer', 'tfidf-svd'), default='tfidf-svd')
+    cal.add_argument('--backend', default='pytorch')
+    cal.add_argument('--model-path', default=None)
+
+    args = parser.parse_args()
+    if args.command == 'calibrate':
+        from news_fetcher import NewsFetcher
+        from news_store import NewsStore
+
+        texts, labels = read_labeled(args.data)
+        store = NewsStore(args.news_store)
+        if not store.articles(latest=True):
+            NewsFetcher(background_refresh=False, store=store, relevance_mode='keywords').refresh()
+        # The same snapshot the fetcher embeds: each feed's latest entries
+        articles = store.articles(latest=True)
+        if not articles:
+            parser.error(f"No news articles in {args.news_store}")
+
+        if args.encoder == 'transformer':
+            from inference_backends import load_backend
+            encoder = TransformerEncoder(load_backend(args.backend, args.model_path))
+        else:
+            encoder = TfidfSvdEncoder()
+        index = SemanticIndex(encoder)
+        index.update(articles)
+        # Texts without any known term score 0, as they would count as unrelated
+        similarities = [match[0] if match is not None else 0.0 for match in index.query_many(texts)]
+        result = calibrate_cuts(similarities, labels)
+        result['report']['articles'] = len(articles)
+
+        config = {'encoders': {}}
+        if os.path.exists(args.output):
+            with open(args.output) as f:
+                config = json.load(f)
+        config.setdefault('encoders', {})[encoder.name] = result
+        with open(args.output, 'w') as f:
+            json.dump(config, f, indent=2)
+        print(json.dumps(result, indent=2))
+        print(f"✅ Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+NewsFetcher against a local stub HTTP server serving RSS fixtures.
+
+Run with `python -m pytest tests` (or `python -m unittest discover tests`).
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_fetcher import NewsFetcher  # noqa: E402
+from news_store import NewsStore  # noqa: E402
+
+ETAG = '"fixture-v1"'
+LAST_MODIFIED = 'Mon, 05 Oct 2026 08:00:00 GMT'
+
+
+def rss_fixture(source):
+    items = ''.join(
+        f"<item><title>{source} headline {i} about the senate budget vote</title>"
+        f"<description>Summary {i} from {source}</description>"
+        f"<link>http://example.com/{source}/{i}</link><guid>{source}-{i}</guid></item>"
+        for i in range(3)
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>{source}</title>'
+            f'{items}</channel></rss>').encode()
+
+
+class StubFeeds:
+    """Stub feed server: /<source> serves a fixture, honouring ETag and Last-Modified."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.failing = set()
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                source = self.path.strip('/')
+                with stub.lock:
+                    stub.requests.append((source, dict(self.headers)))
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.delay)
+                    if source in stub.failing:
+                        self.send_response(500)
+                        self.end_headers()
+                    elif (self.headers.get('If-None-Match') == ETAG or
+                          self.headers.get('If-Modified-Since') == LAST_MODIFIED):
+                        self.send_response(304)
+                        self.end_headers()
+                    else:
+                        body = rss_fixture(source)
+                        self.send_response(200)
+                        self.send_header('Content-Type', 'application/rss+xml')
+                        self.send_header('Content-Length', str(len(body)))
+                        self.send_header('ETag', ETAG)
+                        self.send_header('Last-Modified', LAST_MODIFIED)
+                        self.end_headers()
+                        self.wfile.write(body)
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, source):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{source}"
+
+    def requests_for(self, source):
+        with self.lock:
+            return [headers for name, headers in self.requests if name == source]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class NewsFetcherStubTest(unittest.TestCase):
+    sources = ('alpha', 'beta', 'gamma', 'delta', 'epsilon')
+
+    def make_fetcher(self, stub, **kwargs):
+        fetcher = NewsFetcher(background_refresh=False, store=NewsStore(), relevance_mode='keywords', **kwargs)
+        fetcher.news_sources = {source: stub.url(source) for source in self.sources}
+        # Talk to the stub directly, whatever proxy the environment sets
+        fetcher.session.trust_env = False
+        return fetcher
+
+    def test_feeds_fetched_in_parallel(self):
+        stub = StubFeeds(delay=0.3)
+        self.addCleanup(stub.close)
+        fetcher = self.make_fetcher(stub, max_workers=5)
+
+        start = time.monotonic()
+        articles = fetcher._fetch_all()
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(len(articles), 3 * len(self.sources))
+        self.assertEqual(stub.max_active, len(self.sources))
+        # Sequential fetching would take 5 x 0.3s
+        self.assertLess(elapsed, 1.0)
+
+    def test_conditional_get_reuses_articles_on_304(self):
+        stub = StubFeeds()
+        self.addCleanup(stub.close)
+        fetcher = self.make_fetcher(stub)
+        url = stub.url('alpha')
+
+        first = fetcher._fetch_feed('alpha', url)
+        self.assertEqual([article['guid'] for article in first], ['alpha-0', 'alpha-1', 'alpha-2'])
+        self.assertNotIn('If-None-Match', stub.requests_for('alpha')[0])
+
+        second = fetcher._fetch_feed('alpha', url)
+        headers = stub.requests_for('alpha')[1]
+        self.assertEqual(headers.get('If-None-Match'), ETAG)
+        self.assertEqual(headers.get('If-Modified-Since'), LAST_MODIFIED)
+        self.assertEqual(second, first)
+        # The validators are shared through the store with other processes
+        self.assertEqual(fetcher.store.get_feed_state('alpha'), (ETAG, LAST_MODIFIED))
+        self.assertEqual(len(fetcher.store.articles()), 3)
+
+    def test_circuit_breaker_opens_and_half_opens(self):
+        stub = StubFeeds()
+        self.addCleanup(stub.close)
+        stub.failing.add('alpha')
+        fetcher = self.make_fetcher(stub, failure_threshold=2, reset_timeout=0.3)
+        url = stub.url('alpha')
+        breaker = fetcher._get_breaker('alpha')
+
+        fetcher._fetch_feed('alpha', url)
+        self.assertEqual(breaker.state, 'closed')
+        fetcher._fetch_feed('alpha', url)
+        self.assertEqual(breaker.state, 'open')
+
+        # An open circuit skips the source without a request
+        self.assertEqual(fetcher._fetch_feed('alpha', url), [])
+        self.assertEqual(len(stub.requests_for('alpha')), 2)
+
+        time.sleep(0.35)
+        self.assertEqual(breaker.state, 'half-open')
+        # A failed trial request re-opens the circuit
+        fetcher._fetch_feed('alpha', url)
+        self.assertEqual(len(stub.requests_for('alpha')), 3)
+        self.assertEqual(breaker.state, 'open')
+
+        time.sleep(0.35)
+        stub.failing.clear()
+        articles = fetcher._fetch_feed('alpha', url)
+        self.assertEqual(len(articles), 3)
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(breaker.failures, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,39 +4,26 @@ from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report
+import argparse
+import itertools
+import os
 import pickle
-import re
-
-def preprocess_text(text):
-    """Clean and preprocess text data"""
-    text = str(text).lower()
-    # Remove URLs, emails, and special characters but keep some punctuation
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text)
-    text = re.sub(r'\S*@\S*\s?', '', text)
-    text = re.sub(r'[^a-zA-Z\s.,!?]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def train_model():
-    # Load data
-    data_fake = pd.read_csv('data/Fake.csv')
-    data_true = pd.read_csv('data/True.csv')
-    
-    # Add labels
-    data_fake['label'] = 0
-    data_true['label'] = 1
-    
-    # Combine datasets
-    data = pd.concat([data_fake, data_true], ignore_index=True)
-    
-    # Remove rows with missing text
-    data = data.dropna(subset=['title', 'text'])
-    
-    # Combine title and text for better features
-    data['content'] = data['title'] + ' ' + data['text']
+import shutil
+import zlib
+from preprocessing import DEFAULT_CACHE_DIR, preprocess_csv, preprocess_many
+from linear_artifact import DEFAULT_ARTIFACT_DIR, export_artifact
+
+def train_model(workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    # Title and text of rows that have both, preprocessed on `workers`
+    # processes; cached by file hash so reruns skip this step
+    content_fake = preprocess_csv('data/Fake.csv', workers=workers, cache_dir=cache_dir)
+    content_true = preprocess_csv('data/True.csv', workers=workers, cache_dir=cache_dir)
     
-    # Preprocess text
-    data['content'] = data['content'].apply(preprocess_text)
+    # Combine datasets and add labels
+    data = pd.DataFrame({
+        'content': content_fake + content_true,
+        'label': [0] * len(content_fake) + [1] * len(content_true)
+    })
     
     # Remove very short articles
     data = data[data['content'].str.len() > 50]
@@ -78,6 +65,150 @@ def train_model():
         pickle.dump(vectorizer, f)
     
     print("Model and vectorizer saved successfully!")
+    
+    export_artifact(vectorizer, model, DEFAULT_ARTIFACT_DIR)
+    print(f"Memory-mappable artifact written to {DEFAULT_ARTIFACT_DIR}/")
+
+def export_pickles(model_path='model.pkl', vectorizer_path='vectorizer.pkl', directory=DEFAULT_ARTIFACT_DIR):
+    """Convert existing pickles into the memory-mappable artifact app_simple.py prefers"""
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    version = export_artifact(vectorizer, model, directory)
+    print(f"Artifact {version} written to {directory}/")
+
+def prepare_chunk(chunk, label):
+    """Build preprocessed content for one CSV chunk, filtered like train_model()"""
+    chunk = chunk.dropna(subset=['title', 'text'])
+    content = pd.Series(preprocess_many(chunk['title'] + ' ' + chunk['text']))
+    content = content[content.str.len() > 50]
+    return pd.DataFrame({'content': content.values, 'label': label})
+
+def is_held_out(content, test_fraction):
+    """Stable train/test assignment from a hash of the text, the same on every pass"""
+    buckets = content.map(lambda text: zlib.crc32(text.encode()) % 10000)
+    return (buckets < test_fraction * 10000).values
+
+def stream_labeled(sources, chunk_size, test_fraction, held_out, seed=None):
+    """
+    Yield shuffled (content, label) frames from CSVs read chunk by chunk.
+
+    Chunks from each source are interleaved so every batch sees every class.
+    Rows are routed to the training or the held-out stream by is_held_out().
+    """
+    readers = [(pd.read_csv(path, chunksize=chunk_size), label) for path, label in sources]
+    rng = np.random.default_rng(seed)
+    for chunks in itertools.zip_longest(*[reader for reader, _ in readers]):
+        parts = [prepare_chunk(chunk, label) for chunk, (_, label) in zip(chunks, readers) if chunk is not None]
+        frame = pd.concat(parts, ignore_index=True)
+        frame = frame[is_held_out(frame['content'], test_fraction) == held_out]
+        if seed is not None:
+            frame = frame.iloc[rng.permutation(len(frame))]
+        if len(frame):
+            yield frame
+
+def evaluate_stream(vectorizer, model, batches):
+    """Predict a held-out stream batch by batch; returns (y_true, y_pred)"""
+    y_true, y_pred = [], []
+    for batch in batches:
+        y_true.append(batch['label'].values)
+        y_pred.append(model.predict(vectorizer.transform(batch['content'])))
+    return np.concatenate(y_true), np.concatenate(y_pred)
+
+def train_streaming(sources=(('data/Fake.csv', 0), ('data/True.csv', 1)), chunk_size=10000, epochs=3,
+                    n_features=2 ** 20, tfidf=True, test_fraction=0.2, alpha=1e-6):
+    """
+    Train without holding the corpus in memory.
+
+    Text is hashed into n_features columns by a stateless HashingVectorizer
+    (optionally reweighted by IDF from one counting pass) and an
+    SGDClassifier with logistic loss is fit with partial_fit, one chunk at a
+    time, for `epochs` passes. A hash-selected test_fraction of the rows is
+    never trained on and is used for evaluation after each pass.
+
+    The saved vectorizer.pkl (a Pipeline) and model.pkl expose the same
+    transform / predict_proba interface as train_model()'s, so app_simple.py
+    and cascade.LinearScorer load them unchanged.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+
+    stream = lambda held_out, seed=None: stream_labeled(sources, chunk_size, test_fraction, held_out, seed)
+    hasher = HashingVectorizer(
+        n_features=n_features,
+        stop_words='english',
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm=None if tfidf else 'l2'
+    )
+
+    # Counting pass: class balance, and document frequencies for IDF
+    class_counts = np.zeros(2, dtype=np.int64)
+    document_frequency = np.zeros(n_features, dtype=np.int64)
+    for batch in stream(held_out=False):
+        class_counts += np.bincount(batch['label'], minlength=2)
+        if tfidf:
+            document_frequency += np.bincount(hasher.transform(batch['content']).indices, minlength=n_features)
+    n_documents = class_counts.sum()
+    print(f"Training rows: {n_documents} (fake {class_counts[0]}, real {class_counts[1]})")
+
+    steps = [('hashing', hasher)]
+    if tfidf:
+        # Same smoothed IDF as TfidfVectorizer, computed from the counts above
+        transformer = TfidfTransformer()
+        transformer.idf_ = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+        steps.append(('tfidf', transformer))
+    vectorizer = Pipeline(steps)
+
+    # partial_fit does not accept class_weight='balanced'; pass the equivalent weights
+    class_weight = {label: n_documents / (2 * max(count, 1)) for label, count in enumerate(class_counts)}
+    model = SGDClassifier(loss='log_loss', alpha=alpha, class_weight=class_weight, random_state=42)
+
+    for epoch in range(epochs):
+        for batch in stream(held_out=False, seed=epoch):
+            model.partial_fit(vectorizer.transform(batch['content']), batch['label'].values, classes=[0, 1])
+        y_test, y_pred = evaluate_stream(vectorizer, model, stream(held_out=True))
+        print(f"Epoch {epoch + 1}/{epochs}: held-out accuracy {accuracy_score(y_test, y_pred):.4f}")
+
+    print(f"Model Accuracy: {accuracy_score(y_test, y_pred):.4f}")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred))
+
+    with open('model.pkl', 'wb') as f:
+        pickle.dump(model, f)
+
+    with open('vectorizer.pkl', 'wb') as f:
+        pickle.dump(vectorizer, f)
+
+    print("Model and vectorizer saved successfully!")
+
+    # Hashed features have no vocabulary to export; don't let an older
+    # artifact shadow the new pickles in app_simple.py
+    if os.path.isdir(DEFAULT_ARTIFACT_DIR):
+        shutil.rmtree(DEFAULT_ARTIFACT_DIR)
+        print(f"Removed stale {DEFAULT_ARTIFACT_DIR}/; app_simple.py will load the pickles")
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the TF-IDF + linear fake news model')
+    parser.add_argument('--export', action='store_true',
+                        help='Only convert model.pkl and vectorizer.pkl into the memory-mappable artifact')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Out-of-core training: chunked CSVs, HashingVectorizer, SGD partial_fit')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per CSV chunk (streaming)')
+    parser.add_argument('--epochs', type=int, default=3, help='Passes over the training stream (streaming)')
+    parser.add_argument('--n-features', type=int, default=2 ** 20, help='Hashed feature columns (streaming)')
+    parser.add_argument('--no-tfidf', action='store_true', help='Skip the IDF counting pass (streaming)')
+    parser.add_argument('--test-fraction', type=float, default=0.2, help='Held-out share of rows (streaming)')
+    parser.add_argument('--workers', type=int, default=None, help='Preprocessing processes (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='Preprocess again instead of using the cache')
+    args = parser.parse_args()
+
+    if args.export:
+        export_pickles()
+    elif args.streaming:
+        train_streaming(chunk_size=args.chunk_size, epochs=args.epochs, n_features=args.n_features,
+                        tfidf=not args.no_tfidf, test_fraction=args.test_fraction)
+    else:
+        train_model(workers=args.workers, cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
\ No newline at end of file